@@ -0,0 +1,68 @@
+""" Benchmark of make_archive() on a 20k-file datapack.
+
+Compares serial compression (zip.writestr on the main thread) with parallel deflate
+(entries compressed in the thread pool, then written in sorted order), and the
+incremental rebuild reusing the previous archive entries. All outputs must be identical.
+"""
+
+# Imports
+import filecmp
+import os
+import random
+import tempfile
+import time
+
+import stouputils as stp
+
+from python_datapack.utils.archive import make_archive
+from python_datapack.utils.io import FILES_TO_WRITE
+
+# Constants
+FILES: int = 20_000
+WORDS: list[str] = ["execute", "if", "score", "@s", "run", "function", "bench:", "data", "storage", "matches", "1..", "tag", "\n"]
+
+
+def generate_pack(source: str) -> None:
+	""" Fill the write queue with a datapack of FILES mcfunction and json files """
+	random.seed(51)
+	os.makedirs(f"{source}/data", exist_ok = True)
+	FILES_TO_WRITE[f"{source}/pack.mcmeta"] = stp.super_json_dump({"pack": {"pack_format": 61, "description": "bench"}})
+	for i in range(FILES):
+		if i % 4 == 0:
+			path: str = f"{source}/data/bench/loot_table/i/item_{i}.json"
+			FILES_TO_WRITE[path] = stp.super_json_dump({"pools": [{"rolls": 1, "entries": [{"type": "minecraft:item", "name": f"minecraft:stone_{i}"}]}]})
+		else:
+			path: str = f"{source}/data/bench/function/f_{i // 100}/f_{i}.mcfunction"
+			FILES_TO_WRITE[path] = " ".join(random.choices(WORDS, k = random.randint(20, 2000)))
+
+def timed_archive(source: str, destination: str, parallel_deflate: bool, keep_previous: bool = False) -> float:
+	""" Build the archive and return the time taken """
+	if not keep_previous and os.path.exists(destination):
+		os.remove(destination)
+	start: float = time.perf_counter()
+	make_archive(source, destination, parallel_deflate = parallel_deflate)
+	return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+	with tempfile.TemporaryDirectory() as folder:
+		source: str = stp.clean_path(f"{folder}/datapack")
+		generate_pack(source)
+
+		serial_time: float = timed_archive(source, f"{folder}/serial.zip", parallel_deflate = False)
+		parallel_time: float = timed_archive(source, f"{folder}/parallel.zip", parallel_deflate = True)
+		if not filecmp.cmp(f"{folder}/serial.zip", f"{folder}/parallel.zip", shallow = False):
+			stp.error("The parallel deflate archive differs from the serial one")
+
+		# Change one file and rebuild from the previous archive
+		FILES_TO_WRITE[f"{source}/data/bench/function/f_0/f_1.mcfunction"] += "\nsay changed"
+		incremental_time: float = timed_archive(source, f"{folder}/parallel.zip", parallel_deflate = True, keep_previous = True)
+		timed_archive(source, f"{folder}/serial.zip", parallel_deflate = False)
+		if not filecmp.cmp(f"{folder}/serial.zip", f"{folder}/parallel.zip", shallow = False):
+			stp.error("The incremental archive differs from a full rebuild")
+
+		stp.info(
+			f"Serial: {serial_time:.3f}s, parallel deflate: {parallel_time:.3f}s ({serial_time / parallel_time:.1f}x faster), "
+			f"incremental: {incremental_time:.3f}s for {FILES} files on {os.cpu_count()} cores"
+		)
+
@@ -0,0 +1,99 @@
+""" Benchmark of the ingredients comparisons and caches used by the recipes and manual stages (see utils/ingredients.py).
+
+On a synthetic database (see synthetic_project.py), compares the previous string based approach (str(dict) comparisons,
+stp.simple_cache keyed on the string of the arguments including the whole config) with the interned ingredients,
+then times the recipes stage and the crafts helpers of the manual.
+
+Usage:
+	python scripts/benchmarks/ingredients.py [--items 2000]
+"""
+
+# Imports
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+import stouputils as stp
+from synthetic_project import generate_project
+
+from python_datapack.constants import RESULT_OF_CRAFTING
+from python_datapack.datapack.recipes import main as recipes_main
+from python_datapack.enhance_config import main as enhance_config_main
+from python_datapack.manual.other_utils import convert_shapeless_to_shaped
+from python_datapack.utils.ingredients import Ingredient, craft_ingredients, ingredient_cache
+from python_datapack.utils.io import FILES_TO_WRITE
+
+# Constants
+OLD_CACHE_CALLS: int = 200
+""" Number of calls of the string keyed cache (each call is proportional to the size of the database) """
+
+
+def timed(func: Callable[..., Any], *args: Any) -> float:
+	""" Get the time of a function call in seconds """
+	start: float = time.perf_counter()
+	func(*args)
+	return time.perf_counter() - start
+
+def report(name: str, old: float, new: float) -> None:
+	stp.info(f"{name}: {old * 1000:.2f}ms with strings, {new * 1000:.2f}ms with ingredients (x{old / max(new, 1e-9):.1f})")
+
+# Previous approaches
+def count_with_strings(ingredients: list[dict]) -> list[tuple[int, dict]]:
+	""" Count the unique ingredients of a shapeless recipe by comparing their string representations """
+	unique_ingredients: list[tuple[int, dict]] = []
+	for ingr in ingredients:
+		index: int = next((i for i, (_, e) in enumerate(unique_ingredients) if str(ingr) == str(e)), -1)
+		if index == -1:
+			unique_ingredients.append((1, ingr))
+		else:
+			unique_ingredients[index] = (unique_ingredients[index][0] + 1, unique_ingredients[index][1])
+	return unique_ingredients
+
+def count_with_ingredients(ingredients: list[dict]) -> list[tuple[int, dict]]:
+	counts: dict[Ingredient, int] = {}
+	for ingr in ingredients:
+		ingr = Ingredient.of(ingr)
+		counts[ingr] = counts.get(ingr, 0) + 1
+	return [(count, ingr) for ingr, count in counts.items()]
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Benchmark of the ingredients comparisons and caches")
+	parser.add_argument("--items", type = int, default = 2000, help = "Number of items of the synthetic project")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as folder:
+		config, setup_database = generate_project(folder, args.items)
+		config = enhance_config_main(config)
+		config["database"] = setup_database(config)
+		config["external_database"] = {}
+		recipes: list[dict] = [recipe for data in config["database"].values() for recipe in data.get(RESULT_OF_CRAFTING, [])]
+		ingredients: list[dict] = [ingr for recipe in recipes for ingr in craft_ingredients(recipe)]
+		stp.info(f"{len(config['database'])} items, {len(recipes)} recipes, {len(ingredients)} ingredients")
+
+		# Cache lookups with the config as first argument (the string key contains the whole database)
+		def lookup(config: dict, ingredient: dict) -> str:
+			return config["namespace"]
+		old_cache, new_cache = stp.simple_cache(lookup), ingredient_cache("namespace")(lookup)
+		sample: list[dict] = ingredients[:OLD_CACHE_CALLS]
+		old: float = timed(lambda: [old_cache(config, ingr) for ingr in sample]) / len(sample) * len(ingredients)
+		report(f"Cache lookups (estimated from {len(sample)} calls)", old, timed(lambda: [new_cache(config, ingr) for ingr in ingredients]))
+
+		# Unique ingredients of the shapeless recipes
+		shapeless: list[dict] = [recipe for recipe in recipes if recipe["type"] == "crafting_shapeless"]
+		report(
+			f"Counting the ingredients of {len(shapeless)} shapeless recipes",
+			timed(lambda: [count_with_strings(recipe["ingredients"]) for recipe in shapeless]),
+			timed(lambda: [count_with_ingredients(recipe["ingredients"]) for recipe in shapeless]),
+		)
+
+		# Shapeless crafts shown as shaped ones in the manual
+		stp.info(f"Converting {len(shapeless)} shapeless recipes to shaped: {timed(lambda: [convert_shapeless_to_shaped(x) for x in shapeless]) * 1000:.2f}ms")
+
+		# Recipes stage (files are only queued, not written)
+		config["build_datapack"] = stp.clean_path(os.path.join(folder, "build", "datapack"))
+		stp.info(f"Recipes stage: {timed(recipes_main, config):.3f}s")
+		FILES_TO_WRITE.clear()
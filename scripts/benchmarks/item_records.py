@@ -0,0 +1,84 @@
+""" Benchmark of the memory taken by the database items as dicts and as compact item records (see utils/item_record.py).
+
+On a synthetic database (see synthetic_project.py), measures with tracemalloc the memory of the items containers
+(the values are shared by both representations), the peak memory of the wholesale copies made for the JSON dumps
+(verify_database, debug_info), and the time to read the items.
+
+Usage:
+	python scripts/benchmarks/item_records.py [--items 20000]
+"""
+
+# Imports
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import stouputils as stp
+from synthetic_project import generate_project
+
+from python_datapack.enhance_config import main as enhance_config_main
+from python_datapack.utils.item_record import RECORD_SLOTS, as_dicts, compact_database
+
+# Constants
+READS: int = 5
+""" Number of times every key of every item is read to measure the access time """
+
+
+def allocated(func: Callable[[], Any]) -> tuple[Any, int, int]:
+	""" Call a function and get its result, the memory it kept allocated and its peak memory (in bytes) """
+	gc.collect()
+	tracemalloc.reset_peak()
+	before: int = tracemalloc.get_traced_memory()[0]
+	result: Any = func()
+	gc.collect()
+	current, peak = tracemalloc.get_traced_memory()
+	return result, current - before, peak - before
+
+def read_all(database: dict[str, Any]) -> float:
+	""" Get the time to read every key of every item (through get() and items()) """
+	start: float = time.perf_counter()
+	for _ in range(READS):
+		for data in database.values():
+			for key in RECORD_SLOTS:
+				data.get(key)
+			for _key, _value in data.items():
+				pass
+	return time.perf_counter() - start
+
+def mb(size: int) -> str:
+	return f"{size / 2**20:.2f}MB"
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Benchmark of the memory of the database items as dicts and as item records")
+	parser.add_argument("--items", type = int, default = 20000, help = "Number of items of the synthetic project")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as folder:
+		config, setup_database = generate_project(folder, args.items)
+		config = enhance_config_main(config)
+		tracemalloc.start()
+		database, database_size, _ = allocated(lambda: setup_database(config))
+		keys: int = sum(len(data) for data in database.values())
+		stp.info(f"{len(database)} items ({keys / len(database):.1f} keys per item): {mb(database_size)} with the values")
+
+		# Wholesale copies of the items (as verify_database and debug_info did), then the ones still needed for the dumps
+		_, _, copy_peak = allocated(lambda: {item: data.copy() for item, data in database.items()})
+		_, _, dicts_peak = allocated(lambda: as_dicts(database, exclude = ("override_model",)))
+		dicts_time: float = read_all(database)
+
+		# Items containers, replaced in place by the records
+		dicts_containers: int = sum(sys.getsizeof(data) for data in database.values())
+		saved: int = -allocated(lambda: compact_database(database))[1]
+		_, _, records_peak = allocated(lambda: as_dicts(database, exclude = ("override_model",)))
+		records_time: float = read_all(database)
+		tracemalloc.stop()
+
+	stp.info(f"Items containers: {mb(dicts_containers)} as dicts, {mb(dicts_containers - saved)} as records ({saved / len(database):.0f} bytes saved per item, {saved / database_size:.0%} of the database)")
+	stp.info(f"Peak memory of the dumps copies: {mb(copy_peak)} copying every dict, {mb(dicts_peak)} with as_dicts() on dicts, {mb(records_peak)} on records")
+	stp.info(f"Reading every key {READS} times: {dicts_time * 1000:.1f}ms with dicts, {records_time * 1000:.1f}ms with records (x{records_time / dicts_time:.1f})")
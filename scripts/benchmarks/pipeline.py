@@ -0,0 +1,152 @@
+""" Benchmark of the whole build pipeline on synthetic projects of 1k, 10k and 50k items (see synthetic_project.py).
+
+Each size is built in a fresh process, recording the time and peak memory of build_process() and the time of each stage
+from the build profile (see utils/profiling.py). The results are compared with the committed baseline (pipeline_baseline.json)
+to catch scaling regressions in any stage. The baseline depends on the machine, update it before comparing on another one.
+
+Usage:
+	python scripts/benchmarks/pipeline.py [--sizes 1000 10000 50000] [--timeout 3600] [--update-baseline]
+"""
+
+# Imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import stouputils as stp
+
+# Constants
+SIZES: tuple[int, ...] = (1_000, 10_000, 50_000)
+BASELINE: str = stp.clean_path(f"{os.path.dirname(os.path.abspath(__file__))}/pipeline_baseline.json")
+TIME_TOLERANCE: float = 1.5
+""" A stage is a regression if it takes more than this factor of its baseline time... """
+MIN_DIFFERENCE: float = 0.1
+""" ...and at least this many seconds more (to ignore the noise of the small stages) """
+MEMORY_TOLERANCE: float = 1.3
+""" The build is a regression if its peak memory is more than this factor of the baseline """
+MANUAL_MAX_ITEMS: int = 2_000
+""" Largest synthetic project built with a manual: the pages are drawn with the characters of a font limited to 0xffff indexes,
+so a manual can't hold much more than a thousand items pages (the 10k items one fails after ~1200 pages) """
+
+
+def run_size(items: int, folder: str) -> None:
+	""" Generate the synthetic project and build it (in the child process) """
+	from synthetic_project import generate_project
+
+	from python_datapack import build_process
+	config, setup_database = generate_project(folder, items, manual = items <= MANUAL_MAX_ITEMS)
+	build_process(config, setup_database)
+
+def measure(items: int, timeout: float) -> dict:
+	""" Build a synthetic project of the given size in a fresh process and get its results from the build profile
+
+	Args:
+		items	(int):		Number of items of the synthetic project
+		timeout	(float):	Maximum time of the build in seconds
+	Returns:
+		dict: The total time, peak RSS, time of each stage and if the project has a manual, or the error
+	"""
+	with tempfile.TemporaryDirectory() as folder:
+		start: float = time.perf_counter()
+		try:
+			process = subprocess.run(
+				[sys.executable, __file__, "--run", str(items), "--folder", folder],
+				stdin = subprocess.DEVNULL, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, text = True, timeout = timeout,
+			)
+		except subprocess.TimeoutExpired:
+			return {"error": f"timeout after {timeout:.0f}s"}
+		if process.returncode != 0:
+			return {"error": f"build failed: {process.stderr.strip().splitlines()[-1] if process.stderr.strip() else process.returncode}"}
+		with open(f"{folder}/build/build_profile.json") as f:
+			report: dict = json.load(f)
+
+	stages: dict[str, float] = {}
+	for span in report["spans"]:
+		if span["category"] == "stage":
+			stages[span["name"]] = round(stages.get(span["name"], 0.0) + span["wall"], 4)
+	return {
+		"process_time": round(time.perf_counter() - start, 4),
+		"build_time": round(report["total_time"], 4),
+		"peak_rss": report["peak_rss"],
+		"stages": stages,
+		"manual": items <= MANUAL_MAX_ITEMS,
+	}
+
+def compare(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+	""" Get the regressions of the results compared to the baseline """
+	regressions: list[str] = []
+	for size, result in results.items():
+		base: dict | None = baseline.get(size)
+		if not base or "error" in base:
+			stp.warning(f"No baseline for {size} items, run with --update-baseline to record one")
+			continue
+		if "error" in result:
+			regressions.append(f"{size} items: {result['error']}")
+			continue
+		if base.get("manual", False) != result["manual"]:
+			stp.warning(f"The baseline for {size} items was recorded {'with' if base.get('manual') else 'without'} a manual, run with --update-baseline to record a new one")
+			continue
+		timings: dict[str, tuple[float, float]] = {"build": (base["build_time"], result["build_time"])}
+		timings.update({name: (base["stages"][name], wall) for name, wall in result["stages"].items() if name in base["stages"]})
+		for name, (before, after) in timings.items():
+			if after > before * TIME_TOLERANCE and after - before > MIN_DIFFERENCE:
+				regressions.append(f"{size} items: '{name}' took {after:.3f}s instead of {before:.3f}s ({after / max(before, 1e-6):.1f}x)")
+		if base["peak_rss"] and result["peak_rss"] > base["peak_rss"] * MEMORY_TOLERANCE:
+			regressions.append(f"{size} items: peak memory {result['peak_rss'] / 2**20:.0f}MB instead of {base['peak_rss'] / 2**20:.0f}MB")
+	return regressions
+
+def report_scaling(results: dict[str, dict]) -> None:
+	""" Show how each stage grows with the number of items (a stage growing faster than the items doesn't scale linearly) """
+	measured: list[tuple[int, dict]] = sorted((int(size), result) for size, result in results.items() if "error" not in result)
+	for (small, before), (large, after) in zip(measured, measured[1:], strict = False):
+		growths: list[str] = [
+			f"{name} x{wall / before['stages'][name]:.1f}"
+			for name, wall in sorted(after["stages"].items(), key = lambda x: x[1], reverse = True)
+			if before["stages"].get(name, 0) > 0.001
+		]
+		stp.info(f"Scaling from {small} to {large} items (x{large / small:.0f}): " + ", ".join(growths))
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Benchmark of the whole build pipeline on synthetic projects")
+	parser.add_argument("--sizes", type = int, nargs = "+", default = list(SIZES), help = "Numbers of items to benchmark")
+	parser.add_argument("--timeout", type = float, default = 3600, help = "Maximum time of a build in seconds")
+	parser.add_argument("--update-baseline", action = "store_true", help = "Record the results as the new baseline")
+	parser.add_argument("--run", type = int, help = argparse.SUPPRESS)
+	parser.add_argument("--folder", type = str, help = argparse.SUPPRESS)
+	args = parser.parse_args()
+	if args.run:
+		run_size(args.run, args.folder)
+		sys.exit(0)
+
+	# Measure each size
+	results: dict[str, dict] = {}
+	for items in args.sizes:
+		results[str(items)] = result = measure(items, args.timeout)
+		if "error" in result:
+			stp.warning(f"{items} items: {result['error']}")
+			continue
+		slowest: str = ", ".join(f"{name} {wall:.2f}s" for name, wall in sorted(result["stages"].items(), key = lambda x: x[1], reverse = True)[:5])
+		stp.info(f"{items} items: build {result['build_time']:.2f}s, peak memory {result['peak_rss'] / 2**20:.0f}MB (slowest stages: {slowest})")
+	report_scaling(results)
+
+	# Compare with the baseline, or update it
+	baseline: dict = {}
+	if os.path.exists(BASELINE):
+		with open(BASELINE) as f:
+			baseline = json.load(f)
+	if args.update_baseline:
+		baseline.update({"python_version": sys.version.split()[0], "cpu_count": os.cpu_count()})
+		baseline["sizes"] = {**baseline.get("sizes", {}), **results}
+		with stp.super_open(BASELINE, "w") as f:
+			json.dump(baseline, f, indent = "\t")
+		stp.info(f"Baseline updated: '{BASELINE}'")
+	else:
+		regressions: list[str] = compare(results, baseline.get("sizes", {}))
+		if regressions:
+			stp.error("Scaling regressions compared to the baseline:\n" + "\n".join(regressions))
+		stp.info("No regression compared to the baseline")
@@ -0,0 +1,56 @@
+""" Benchmark of the startup time, from a fresh interpreter to build_process() (using python -X importtime).
+
+Fails if importing python_datapack takes longer than the budget (excluding stouputils, imported by everything),
+or if a heavy dependency of a stage is imported before the stage runs.
+"""
+
+# Imports
+import subprocess
+import sys
+
+import stouputils as stp
+
+# Constants
+BUDGET: float = 0.150
+""" Maximum import time of python_datapack to reach build_process() in seconds, excluding stouputils """
+RUNS: int = 5
+HEAVY_MODULES: tuple[str, ...] = ("beet", "smithed", "model_resolver", "mutagen", "watchdog")
+""" Dependencies that must only be imported when the stages using them run """
+
+
+def import_times() -> dict[str, tuple[int, int]]:
+	""" Import python_datapack in a fresh interpreter and get the self and cumulative import times of each module (in microseconds) """
+	result = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", "from python_datapack import build_process"],
+		capture_output = True, text = True, check = True,
+	)
+	times: dict[str, tuple[int, int]] = {}
+	for line in result.stderr.splitlines():
+		if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+			continue
+		self_time, cumulative, name = (x.strip() for x in line.removeprefix("import time:").split("|"))
+		times.setdefault(name, (int(self_time), int(cumulative)))
+	return times
+
+
+if __name__ == "__main__":
+	runs: list[tuple[float, float]] = []
+	for _ in range(RUNS):
+		times: dict[str, tuple[int, int]] = import_times()
+		total: float = times["python_datapack"][1] / 1e6
+		dependency: float = times.get("stouputils", (0, 0))[1] / 1e6
+		runs.append((total, total - dependency))
+	heavy: list[str] = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+
+	# Best of the runs, to ignore the noise of the first cold imports
+	total, own = min(runs, key = lambda run: run[1])
+	slowest: list[tuple[str, int]] = sorted(
+		((name, self_time) for name, (self_time, _) in times.items() if name.startswith("python_datapack")),
+		key = lambda x: x[1], reverse = True,
+	)[:5]
+	stp.info(f"Import to build_process(): {total * 1000:.1f}ms total, {own * 1000:.1f}ms excluding stouputils (budget: {BUDGET * 1000:.0f}ms)")
+	stp.info("Slowest python_datapack modules: " + ", ".join(f"{name} ({self_time / 1000:.1f}ms)" for name, self_time in slowest))
+	if heavy:
+		stp.error(f"Heavy dependencies imported at startup: {', '.join(heavy)}")
+	if own > BUDGET:
+		stp.error(f"Startup time over the budget: {own * 1000:.1f}ms > {BUDGET * 1000:.0f}ms")
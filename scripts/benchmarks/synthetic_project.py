@@ -0,0 +1,196 @@
+""" Generator of a synthetic project to benchmark the build pipeline at scale (see pipeline.py).
+
+The project has a configuration, textures, sounds, and a database of N items built through
+generate_everything_about_these_materials() and friends (custom blocks, ores, equipments and ingredients),
+completed with custom items carrying M extra recipes of each recipe type.
+With a manual, the renders of the blocks and the vanilla items textures are pre-generated (plain images, as cached by
+cache_manual_assets), so the manual is built without OpenGL nor network access, which aren't part of the measured pipeline.
+"""
+
+# Imports
+import io
+import os
+from collections.abc import Callable
+
+import stouputils as stp
+from PIL import Image
+
+from python_datapack.constants import (
+	CUSTOM_BLOCK_VANILLA,
+	CUSTOM_ITEM_VANILLA,
+	PULVERIZING,
+	RESULT_OF_CRAFTING,
+	USED_FOR_CRAFTING,
+	VANILLA_BLOCK,
+)
+from python_datapack.utils.database_helper import (
+	DEFAULT_ORE,
+	EquipmentsConfig,
+	add_item_model_component,
+	add_item_name_and_lore_if_missing,
+	add_private_custom_data_for_namespace,
+	add_smithed_ignore_vanilla_behaviours_convention,
+	generate_everything_about_these_materials,
+)
+from python_datapack.utils.ingredients import CRAFTING_RECIPES_TYPES, FURNACES_RECIPES_TYPES, craft_ingredients, ingr_repr
+
+# Constants
+NAMESPACE: str = "synthetic"
+MATERIAL_TEXTURES: tuple[str, ...] = (
+	"{m}_block", "{m}_ore", "deepslate_{m}_ore", "raw_{m}_block", "raw_{m}", "{m}_ingot", "{m}_nugget", "{m}_dust",
+	"{m}_helmet", "{m}_chestplate", "{m}_leggings", "{m}_boots", "{m}_sword", "{m}_pickaxe", "{m}_axe", "{m}_shovel", "{m}_hoe",
+	"{m}_layer_1", "{m}_layer_2",
+)
+""" Textures of a material, each one (except the armor layers) giving an item to generate_everything_about_this_material() """
+ITEMS_PER_MATERIAL: int = len(MATERIAL_TEXTURES) - 2
+RECIPES_TYPES: tuple[str, ...] = (*CRAFTING_RECIPES_TYPES, *FURNACES_RECIPES_TYPES, PULVERIZING)
+MANUAL_BLOCKS: tuple[str, ...] = ("heavy_workbench",)
+MANUAL_VANILLA_ITEMS: tuple[str, ...] = ("oak_log", "crafting_table", "smooth_stone")
+""" Block added by the manual (when smithed crafter is used) and the vanilla items of its recipe """
+
+
+def png_bytes(seed: int, size: int = 16) -> bytes:
+	""" Get a plain texture (16x16 by default), slightly different for each seed """
+	buffer: io.BytesIO = io.BytesIO()
+	Image.new("RGBA", (size, size), (seed % 256, (seed // 256) % 256, 128, 255)).save(buffer, "PNG")
+	return buffer.getvalue()
+
+def generate_assets(assets_folder: str, materials: list[str], items: list[str], sounds: int, manual: bool = False) -> None:
+	""" Write the textures of the materials and custom items (and the manual), the sounds and the pack icon """
+	textures: str = f"{assets_folder}/textures"
+	os.makedirs(textures, exist_ok = True)
+	names: list[str] = [name.format(m = material) for material in materials for name in MATERIAL_TEXTURES] + items + (["manual"] if manual else [])
+	for i, name in enumerate(names):
+		with open(f"{textures}/{name}.png", "wb") as f:
+			f.write(png_bytes(i))
+	with open(f"{assets_folder}/original_icon.png", "wb") as f:
+		f.write(png_bytes(0))
+
+	# Sounds are only copied to the resource pack, so their content doesn't matter
+	os.makedirs(f"{assets_folder}/sounds", exist_ok = True)
+	for i in range(sounds):
+		with open(f"{assets_folder}/sounds/synthetic_{i // 4}_{i % 4}.ogg", "wb") as f:
+			f.write(os.urandom(1024))
+
+def extra_recipe(recipe_type: str, i: int, materials: list[str]) -> dict:
+	""" Get the i-th extra recipe of a type, consuming the ingots of the materials
+
+	Every 10 recipes, a shapeless recipe only uses vanilla ingredients (a vanilla recipe, unlocked by get_all_recipes and unlock_recipes)
+	and a smelting recipe gives a vanilla item (its result loot table is in the "minecraft" folder of the recipes loot tables).
+	"""
+	ingot: dict = ingr_repr(f"{materials[i % len(materials)]}_ingot", NAMESPACE)
+	other: dict = ingr_repr(f"{materials[(i + 1) % len(materials)]}_nugget", NAMESPACE)
+	if recipe_type == "crafting_shaped":
+		return {"type": recipe_type, "result_count": 1, "category": "misc", "shape": ["XY", "YX"], "ingredients": {"X": ingot, "Y": other}}
+	if recipe_type == "crafting_shapeless" and i % 10 == 0:
+		sticks: list[dict] = [ingr_repr("minecraft:stick")] * (i // 10 % 8 + 1)
+		return {"type": recipe_type, "result_count": 1, "category": "misc", "ingredients": [*sticks, ingr_repr("minecraft:iron_nugget")]}
+	if recipe_type == "crafting_shapeless":
+		return {"type": recipe_type, "result_count": 1, "category": "misc", "ingredients": [ingot, other, ingr_repr("minecraft:stick")]}
+	if recipe_type == "smelting" and i % 10 == 1:
+		return {"type": recipe_type, "result_count": 2, "category": "misc", "experience": 0.1, "cookingtime": 100, "ingredient": ingot,
+			"result": ingr_repr("minecraft:diamond")}
+	if recipe_type in FURNACES_RECIPES_TYPES:
+		return {"type": recipe_type, "result_count": 1, "category": "misc", "experience": 0.1, "cookingtime": 100, "ingredient": ingot}
+	return {"type": recipe_type, "result_count": 2, "category": "misc", "ingredient": ingot}
+
+def generate_manual_renders(manual_path: str, namespace: str, database: dict[str, dict], size: int) -> None:
+	""" Write the renders of the blocks and the textures of the used vanilla items, as cached by the manual (see manual/iso_renders.py) """
+	renders: dict[str, set[str]] = {namespace: {item for item, data in database.items() if data.get("id") == CUSTOM_BLOCK_VANILLA}, "minecraft": set()}
+	renders[namespace].update(MANUAL_BLOCKS)
+	renders["minecraft"].update(MANUAL_VANILLA_ITEMS)
+	for data in database.values():
+		for recipe in data.get(RESULT_OF_CRAFTING, []) + data.get(USED_FOR_CRAFTING, []):
+			for ingr in [*craft_ingredients(recipe), recipe.get("result", {})]:
+				if "item" in ingr:
+					renders["minecraft"].add(ingr["item"].split(":")[1])
+	render: bytes = png_bytes(0, size)
+	for render_namespace, names in renders.items():
+		os.makedirs(f"{manual_path}/items/{render_namespace}", exist_ok = True)
+		for name in names:
+			with open(f"{manual_path}/items/{render_namespace}/{name}.png", "wb") as f:
+				f.write(render)
+
+def generate_project(
+	folder: str, items: int, recipes_per_type: int | None = None, sounds: int | None = None, manual: bool = False
+) -> tuple[dict, Callable[[dict], dict]]:
+	""" Generate a synthetic project in a folder
+
+	Args:
+		folder				(str):		Folder of the project (assets and build folders)
+		items				(int):		Number of items in the database (rounded to the materials size)
+		recipes_per_type	(int|None):	Number of extra recipes of each type (default: items / 20)
+		sounds				(int|None):	Number of sounds (default: items / 20)
+		manual				(bool):		If True, the project has a manual (with pre-generated renders, see generate_manual_renders())
+	Returns:
+		tuple[dict, Callable]: The configuration and the setup_database function to give to build_process()
+	"""
+	folder = stp.clean_path(os.path.abspath(folder))
+	recipes_per_type = items // 20 if recipes_per_type is None else recipes_per_type
+	sounds = items // 20 if sounds is None else sounds
+	materials: list[str] = [f"synth{i}" for i in range(max(1, items // (ITEMS_PER_MATERIAL * 2)))]
+	custom_items: list[str] = [f"gadget_{i}" for i in range(max(0, items - len(materials) * ITEMS_PER_MATERIAL))]
+	generate_assets(f"{folder}/assets", materials, custom_items, sounds, manual)
+
+	config: dict = {
+		"build_folder": f"{folder}/build",
+		"author": "Synthetic",
+		"project_name": "Synthetic Pack",
+		"version": "1.0.0",
+		"namespace": NAMESPACE,
+		"description": "Synthetic project for benchmarks",
+		"ignore_unset": True,
+		"assets_folder": f"{folder}/assets",
+		"libs_folder": "",
+		"merge_libs": False,
+		"build_copy_destinations": ([], []),
+		"database_debug": f"{folder}/build/database_debug.json",
+		"enable_translations": False,
+		"dependencies": {},
+		"source_lore": [{"text": "Synthetic", "italic": True, "color": "blue"}],
+		"has_manual": manual,
+	}
+	if manual:
+		config.update({
+			"manual_path": f"{folder}/manual",
+			"manual_overrides": "",
+			"manual_high_resolution": True,
+			"cache_manual_assets": True,
+			"cache_manual_pages": False,
+			"manual_debug": f"{folder}/build/manual_debug.json",
+			"manual_name": "Synthetic Manual",
+			"max_items_per_row": 5,
+			"max_rows_per_page": 5,
+			"opengl_resolution": 256,
+			"manual_first_page_text": [{"text": "Synthetic manual", "color": "#505050"}],
+			"debug_mode": False,
+		})
+
+	def setup_database(config: dict) -> dict:
+		database: dict[str, dict] = {}
+		generate_everything_about_these_materials(config, database, {
+			f"{material}_ingot": EquipmentsConfig(DEFAULT_ORE.IRON, 250 + i, {"attack_damage": 0.5, "armor": 0.2})
+			for i, material in enumerate(materials)
+		})
+		for data in database.values():
+			if data["id"] == CUSTOM_BLOCK_VANILLA:
+				data[VANILLA_BLOCK] = data.get(VANILLA_BLOCK, {"id": "minecraft:iron_block", "apply_facing": False})
+
+		# Custom items carrying the extra recipes of each type
+		for item in custom_items:
+			database[item] = {"id": CUSTOM_ITEM_VANILLA, RESULT_OF_CRAFTING: []}
+		for recipe_type in RECIPES_TYPES:
+			for i in range(recipes_per_type if custom_items else 0):
+				database[custom_items[(i * len(RECIPES_TYPES) + RECIPES_TYPES.index(recipe_type)) % len(custom_items)]][RESULT_OF_CRAFTING].append(
+					extra_recipe(recipe_type, i, materials)
+				)
+
+		add_item_model_component(config, database)
+		add_item_name_and_lore_if_missing(config, database)
+		add_private_custom_data_for_namespace(config, database)
+		add_smithed_ignore_vanilla_behaviours_convention(database)
+		if manual:
+			generate_manual_renders(config["manual_path"], config["namespace"], database, config["opengl_resolution"])
+		return database
+
+	return config, setup_database
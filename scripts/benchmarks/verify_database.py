@@ -0,0 +1,67 @@
+""" Benchmark of the database verification: serial, in a process pool, and incremental (see verify_database.py).
+
+On a synthetic database (see synthetic_project.py), times the checks of every item serially and in a process pool,
+then the whole verification stage without cache, with the cache of the previous build, and after changing a few items.
+
+Usage:
+	python scripts/benchmarks/verify_database.py [--items 20000] [--changed 0.01]
+"""
+
+# Imports
+import argparse
+import copy
+import os
+import tempfile
+import time
+
+import stouputils as stp
+from synthetic_project import generate_project
+
+from python_datapack import verify_database
+from python_datapack.enhance_config import main as enhance_config_main
+from python_datapack.utils.jobs import Job, run_jobs
+
+
+def timed_stage(config: dict, database: dict) -> float:
+	""" Get the time of the verification stage on a copy of the database (the stage modifies the custom blocks) """
+	config["database"] = copy.deepcopy(database)
+	start: float = time.perf_counter()
+	verify_database.main(config)
+	return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description = "Benchmark of the database verification")
+	parser.add_argument("--items", type = int, default = 20000, help = "Number of items of the synthetic project")
+	parser.add_argument("--changed", type = float, default = 0.01, help = "Ratio of items changed between the incremental builds")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as folder:
+		config, setup_database = generate_project(folder, args.items)
+		config = enhance_config_main(config)
+		database: dict = setup_database(config)
+		items: list = list(database.items())
+		namespace: str = config["namespace"]
+		stp.info(f"{len(database)} items")
+
+		# Checks of every item, serially and in a process pool
+		start: float = time.perf_counter()
+		verify_database.verify_items(items, namespace)
+		serial: float = time.perf_counter() - start
+		start = time.perf_counter()
+		hashes = [verify_database.item_hash(item, data) for item, data in items]
+		hashing: float = time.perf_counter() - start
+		workers: int = os.cpu_count() or 1
+		size: int = (len(items) + workers - 1) // workers
+		start = time.perf_counter()
+		run_jobs([Job(f"verify_{i}", verify_database.verify_items, items[i * size:(i + 1) * size], namespace) for i in range(workers)], mode = "processes", verbose = False)
+		pool: float = time.perf_counter() - start
+		stp.info(f"Checks of every item: {serial:.3f}s serially, {pool:.3f}s in a pool of {workers} processes (hashing every item: {hashing:.3f}s)")
+
+		# Verification stage without cache, with the cache of the previous build, and after changing some items
+		cold: float = timed_stage(config, database)
+		warm: float = timed_stage(config, database)
+		for item, data in items[::max(1, round(1 / args.changed))]:
+			database[item] = {**data, "max_stack_size": 16}
+		changed: float = timed_stage(config, database)
+		stp.info(f"Verification stage: {cold:.3f}s without cache, {warm:.3f}s with the cache, {changed:.3f}s after changing {args.changed:.0%} of the items")
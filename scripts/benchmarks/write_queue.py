@@ -0,0 +1,62 @@
+""" Benchmark of the write queue on a 10k-item database.
+
+Compares the previous string-based write queue (copy on every append/prepend,
+parse/merge/dump on every JSON append) with the current write_file() implementation.
+"""
+
+# Imports
+import json
+import time
+
+import stouputils as stp
+
+from python_datapack.utils.io import FILES_TO_WRITE, super_merge_dict, write_file
+
+# Constants
+ITEMS: int = 10_000
+FUNCTIONS: str = "build/datapack/data/bench/function"
+SHAPED_PATH: str = f"{FUNCTIONS}/calls/smithed_crafter/shaped_recipes.mcfunction"
+STATS_PATH: str = f"{FUNCTIONS}/_stats_custom_blocks.mcfunction"
+TAG_PATH: str = "build/datapack/data/bench/tags/function/signals.json"
+
+
+def string_queue(lines: list[str], tags: list[str]) -> dict[str, str]:
+	""" Previous behaviour: every append copies the whole string, every JSON append parses and dumps the whole file """
+	queue: dict[str, str] = {SHAPED_PATH: "", STATS_PATH: "", TAG_PATH: ""}
+	for line, tag in zip(lines, tags, strict=True):
+		queue[SHAPED_PATH] += line
+		queue[STATS_PATH] = line + queue[STATS_PATH]
+		if queue[TAG_PATH]:
+			merged: dict = super_merge_dict(json.loads(queue[TAG_PATH]), json.loads(tag))
+			queue[TAG_PATH] = stp.super_json_dump(merged)
+		else:
+			queue[TAG_PATH] = tag
+	return queue
+
+def write_queue(lines: list[str], tags: list[str]) -> dict[str, str]:
+	""" Current behaviour: chunked text entries and live JSON entries, joined/dumped once """
+	for line, tag in zip(lines, tags, strict=True):
+		write_file(SHAPED_PATH, line)
+		write_file(STATS_PATH, line, prepend = True)
+		write_file(TAG_PATH, tag)
+	return {path: FILES_TO_WRITE[path] for path in (SHAPED_PATH, STATS_PATH, TAG_PATH)}
+
+
+if __name__ == "__main__":
+	lines: list[str] = [
+		f'execute if score @s smithed.data matches 0 store result score @s smithed.data if data storage smithed.crafter:input recipe{{0:[{{"Slot":0b,"id":"minecraft:stone"}}]}} run loot replace block ~ ~ ~ container.16 loot bench:i/item_{i}\n'
+		for i in range(ITEMS)
+	]
+	tags: list[str] = [stp.super_json_dump({"values": [f"bench:item_{i}/signal"]}) for i in range(ITEMS)]
+
+	start: float = time.perf_counter()
+	expected: dict[str, str] = string_queue(lines, tags)
+	string_time: float = time.perf_counter() - start
+
+	start = time.perf_counter()
+	result: dict[str, str] = write_queue(lines, tags)
+	queue_time: float = time.perf_counter() - start
+
+	if result != expected:
+		stp.error("The write queue output differs from the string based output")
+	stp.info(f"String queue: {string_time:.3f}s, write queue: {queue_time:.3f}s ({string_time / queue_time:.1f}x faster) for {ITEMS} items")
@@ -9,18 +9,71 @@ import stouputils as stp
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
 
-# Main function imports
+# Main function imports (the stages are imported when they run, see lazy())
+from . import daemon
 from .__memory__ import PythonDatapackConfig  # noqa: F401
-from .compatibilities.main import main as compatibilities_main
-from .datapack.main import main as datapack_main
-from .datapack.recipes import main as recipes_main
-from .debug_info import main as debug_info_main
-from .enhance_config import main as enhance_config_main
-from .finalyze import main as finalyze_main
-from .initialize import main as initialize_main
-from .manual.main import main as manual_main
-from .resource_pack.main import main as resource_pack_main
-from .verify_database import main as verify_database_main
+from .utils.item_record import compact_database
+from .utils.profiling import PROFILER, profile
+from .utils.stages import BuildCancelled, Stage, lazy, run_stages
+
+
+# Build stages (in the order they would run sequentially, see run_stages())
+RP: str = "{build_resource_pack}/assets"
+DP: str = "{build_datapack}/data"
+FUNCTIONS: str = "{build_datapack}/data/{namespace}/function"
+BUILD_STAGES: list[Stage] = [
+	# Generate resource pack
+	Stage("sounds", lazy(".resource_pack.sounds"),
+		inputs = ["{assets_folder}/sounds/"],
+		outputs = [f"{RP}/{{namespace}}/sounds"],
+		condition = lambda config: config.get("assets_folder")),
+	Stage("item_models", lazy(".resource_pack.item_models"),
+		inputs = ["database", "{assets_folder}/textures/"],
+		outputs = ["rendered_item_models", f"{RP}/{{namespace}}/models/", f"{RP}/{{namespace}}/items/", f"{RP}/{{namespace}}/textures/"],
+		condition = lambda config: config.get("assets_folder")),
+	Stage("textures_power_of_2", lazy(".resource_pack.power_of_2"),
+		inputs = [f"{RP}/{{namespace}}/textures/"],
+		condition = lambda config: config.get("assets_folder")),
+	Stage("resource_pack_files", lazy(".resource_pack.main", "write_resource_pack_files"),
+		inputs = [f"{RP}/"],
+		condition = lambda config: config.get("assets_folder")),
+
+	# Generate custom recipes if any
+	Stage("recipes", lazy(".datapack.recipes"),
+		inputs = ["database", "external_database", "official_libs"],
+		outputs = ["official_libs", f"{DP}/{{namespace}}/recipe/", f"{FUNCTIONS}/calls/", f"{FUNCTIONS}/_give_all.mcfunction",
+			f"{FUNCTIONS}/utils/get_all_recipes.mcfunction", f"{FUNCTIONS}/advancements/unlock_recipes.mcfunction",
+			f"{DP}/{{namespace}}/advancement/unlock_recipes.json", f"{DP}/{{namespace}}/loot_table/recipes/",
+			f"{DP}/smithed.crafter/", f"{DP}/simplenergy/", f"{DP}/furnace_nbt_recipes/"],
+		condition = lambda config: config.get("database")),
+
+	# Generate manual
+	Stage("manual", lazy(".manual.main"),
+		inputs = ["database", "official_libs", "rendered_item_models", f"{RP}/", "{assets_folder}/", "{manual_overrides}/"],
+		outputs = ["database", "rendered_item_models", f"{RP}/{{namespace}}/", f"{FUNCTIONS}/v{{version}}/load/"],
+		condition = lambda config: config.get("has_manual") is True),
+
+	# Generate datapack
+	Stage("loading", lazy(".datapack.loading"),
+		inputs = ["database"],
+		outputs = [f"{FUNCTIONS}/v{{version}}/load/", f"{DP}/{{namespace}}/tags/function/enumerate.json", f"{DP}/{{namespace}}/tags/function/resolve.json"]),
+	Stage("custom_blocks", lazy(".datapack.custom_blocks"),
+		inputs = ["database", "official_libs"],
+		outputs = ["official_libs", f"{FUNCTIONS}/custom_blocks/", f"{FUNCTIONS}/_stats_custom_blocks.mcfunction", f"{FUNCTIONS}/calls/common_signals/",
+			f"{FUNCTIONS}/v{{version}}/tick_2.mcfunction", f"{FUNCTIONS}/v{{version}}/second.mcfunction", f"{FUNCTIONS}/v{{version}}/second_5.mcfunction",
+			f"{DP}/{{namespace}}/predicate/", f"{DP}/{{namespace}}/tags/block/", f"{DP}/{{namespace}}/advancement/custom_block_head/",
+			f"{DP}/smithed.custom_block/", f"{DP}/common_signals/"],
+		condition = lambda config: config.get("database")),
+	Stage("loot_tables", lazy(".datapack.loot_tables"),
+		inputs = ["database", "external_database"],
+		outputs = [f"{DP}/{{namespace}}/loot_table/", f"{FUNCTIONS}/_give_all.mcfunction"],
+		condition = lambda config: config.get("database")),
+
+	# Special compatibilities with featured datapacks
+	Stage("compatibilities", lazy(".compatibilities.main"),
+		inputs = ["database"],
+		outputs = [f"{FUNCTIONS}/calls/simpledrawer/", f"{DP}/simpledrawer/", f"{DP}/enchantplus/"]),
+]
 
 
 # Functions
@@ -33,7 +86,7 @@ def basic_key_check(config: dict, key: str, value_type: type, hint: str, valid:
 	return bool_return
 
 def check_config_format(config: dict) -> bool:
-	KNOWN_KEYS: list[str] = ["build_folder","author","project_name", "version", "namespace", "description", "ignore_unset", "merge_folder", "assets_folder", "libs_folder", "build_copy_destinations", "debug_mode", "database_debug", "cmd_cache", "enable_translations", "merge_libs", "dependencies", "source_lore", "has_manual", "manual_path", "manual_overrides", "manual_high_resolution", "cache_manual_assets", "cache_manual_pages", "manual_debug", "manual_name", "max_items_per_row", "max_rows_per_page", "opengl_resolution", "manual_first_page_text"]
+	KNOWN_KEYS: list[str] = ["build_folder","author","project_name", "version", "namespace", "description", "ignore_unset", "merge_folder", "assets_folder", "libs_folder", "build_copy_destinations", "debug_mode", "database_debug", "cmd_cache", "enable_translations", "merge_libs", "dependencies", "source_lore", "has_manual", "manual_path", "manual_overrides", "manual_high_resolution", "cache_manual_assets", "cache_manual_pages", "manual_debug", "manual_name", "max_items_per_row", "max_rows_per_page", "opengl_resolution", "manual_first_page_text", "compression_policy", "jobs_mode", "stages_mode", "profile_trace", "compact_database"]
 	valid: bool = True
 	valid = basic_key_check(config, "build_folder", str, "Folder where the final datapack and resource pack are built", valid)
 	valid = basic_key_check(config, "author", str, "Author(s) name(s) displayed in pack.mcmeta, also used to add convention.debug tag to the players of the same name(s) <-- showing additionnal displays like datapack loading", valid)
@@ -53,6 +106,16 @@ def check_config_format(config: dict) -> bool:
 	valid = basic_key_check(config, "merge_libs", bool, "Make new zip of merged libraries with the datapack and resource pack using Smithed Weld", valid)
 	valid = basic_key_check(config, "dependencies", dict, "Automagically, the datapack will check for the presence of dependencies and their minimum required versions at runtime\nThe url is used when the dependency is not found to suggest where to get it\nThe version dict key contains the minimum required version of the dependency in [major, minor, patch] format\nThe main key is the dependency namespace to check for\nThe name can be whatever you want, it's just used in messages", valid)
 	valid = basic_key_check(config, "source_lore", list, "Appended lore to any custom item, can be an empty string to disable", valid)
+	if config.get("jobs_mode", None) is not None:
+		valid = basic_key_check(config, "jobs_mode", str, "How the datapack and resource pack archiving/welding chains run: \"threads\" (default), \"processes\" or \"sequential\"", valid)
+	if config.get("stages_mode", None) is not None:
+		valid = basic_key_check(config, "stages_mode", str, "How the build stages run: \"threads\" (default, independent stages run concurrently) or \"sequential\"", valid)
+	if config.get("profile_trace", None) is not None:
+		valid = basic_key_check(config, "profile_trace", bool, "Save a Chrome trace of the build (build_trace.json in the build folder, readable by chrome://tracing, Perfetto or speedscope)", valid)
+	if config.get("compact_database", None) is not None:
+		valid = basic_key_check(config, "compact_database", bool, "Store the items of the database as compact records instead of dicts, to save memory on very large databases (see utils/item_record.py)", valid)
+	if config.get("compression_policy", None) is not None:
+		valid = basic_key_check(config, "compression_policy", dict, "Compression policy of the archives, ex: {\"extensions\": {\".png\": \"stored\", \".ogg\": \"stored\"}, \"min_size\": 64, \"auto_detect\": True}", valid)
 	has_manual: bool|None = config.get("has_manual", None)
 	if has_manual is not None:
 		valid = basic_key_check(config, "has_manual", bool, "Do the program generate a manual/guide? (WARNING: if an item is malformed in the database, the server log will be flooded on load by the manual hiding the malformed item)", True)
@@ -75,6 +138,18 @@ def check_config_format(config: dict) -> bool:
 	return valid is True
 
 
+def enable_console_colors() -> None:
+	""" Enable the ANSI colors in the Windows 10+ console, by setting the console mode instead of spawning a shell (os.system("color")) """
+	if os.name != "nt":
+		return
+	import ctypes
+	kernel32 = ctypes.windll.kernel32	# type: ignore
+	handle = kernel32.GetStdHandle(-11)	# STD_OUTPUT_HANDLE
+	mode = ctypes.c_uint32()
+	if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+		kernel32.SetConsoleMode(handle, mode.value | 0x0004)	# ENABLE_VIRTUAL_TERMINAL_PROCESSING
+
+
 def build_process(config: dict, setup_database: Callable|None = None, setup_external_database: Callable|None = None, user_code: Callable|None = None):
 	""" Main function of the datapack build process
 	Args:
@@ -83,8 +158,14 @@ def build_process(config: dict, setup_database: Callable|None = None, setup_exte
 		setup_external_database	(Callable|None):	Function that will setup the external database (if you need an item in a craft), same format as first
 		user_code				(Callable|None):	Function that will be called after the datapack has been generated, can be used to add custom code to generated some parts of the datapack
 	"""
+	from .debug_info import main as debug_info_main
+	from .enhance_config import main as enhance_config_main
+	from .finalyze import main as finalyze_main
+	from .initialize import main as initialize_main
+	from .verify_database import main as verify_database_main
+
 	# Enable colors in Windows 10 console
-	os.system("color")
+	enable_console_colors()
 
 	# Check config format
 	valid = check_config_format(config)
@@ -96,54 +177,53 @@ def build_process(config: dict, setup_database: Callable|None = None, setup_exte
 
 	# Get start time &
 	START_TIME: float = time.perf_counter()
+	PROFILER.reset()
 	stp.info("Starting build process...")
 
 	# Try to build the datapack
 	try:
+		with profile("build"):
 
-		# Initialize build process
-		initialize_main(config)
-
-		# Generate items/blocks database and verify the format
-		config["database"] = setup_database(config) if setup_database else {}
-		config["external_database"] = setup_external_database(config) if setup_external_database else {}
-		if config.get("database"):
-			verify_database_main(config)
+			# Initialize build process
+			with profile("initialize", "stage"):
+				initialize_main(config)
 
-		# Prepare debug info
-		debug_info_main(config)
+			# Generate items/blocks database and verify the format
+			with profile("setup_database", "stage"):
+				config["database"] = setup_database(config) if setup_database else {}
+				if config.get("compact_database"):
+					compact_database(config["database"])
+				config["external_database"] = setup_external_database(config) if setup_external_database else {}
+			if config.get("database"):
+				with profile("verify_database", "stage"):
+					verify_database_main(config)
 
-		# Generate resource pack
-		if config.get("assets_folder"):
-			resource_pack_main(config)
+			# Prepare debug info
+			debug_info_main(config)
 
-		# Generate custom recipes if any
-		if config.get("database"):
-			recipes_main(config)
+			# Generate resource pack, recipes, manual, datapack and compatibilities (independent stages run concurrently)
+			run_stages(BUILD_STAGES, config, mode = config.get("stages_mode", "threads"), changed = daemon.CHANGED_PATHS)
 
-		# Generate manual
-		if config.get("has_manual") is True:
-			manual_main(config)
-
-		# Generate datapack
-		datapack_main(config)
-
-		# Special compatibilities with featured datapacks
-		compatibilities_main(config)
-
-		# Finalyze build process
-		finalyze_main(config, user_code)
+			# Finalyze build process
+			with profile("finalyze", "stage"):
+				finalyze_main(config, user_code)
 
 		# Total time
 		TOTAL_TIME: float = time.perf_counter() - START_TIME
 		stp.info(f"Build finished in {TOTAL_TIME:.5f} seconds")
 
+		# Save the build profile (and the Chrome trace if enabled) to track performance across versions
+		trace_path: str = f"{config['build_folder']}/build_trace.json" if config.get("profile_trace") is True else ""
+		PROFILER.save(f"{config['build_folder']}/build_profile.json", trace_path)
+
 	# Catch any exception
 	except Exception as e:
 
-		# Write all files to debug
-		from .utils.io import write_all_files
-		write_all_files()
+		# Write all files to debug (unless the build has been cancelled by the watcher, a new one is coming)
+		if not isinstance(e, BuildCancelled):
+			from .utils.io import write_all_files, write_build_manifest
+			write_all_files()
+			write_build_manifest(config["build_manifest"], [config["build_datapack"], config["build_resource_pack"]])
 
 		# Re-raise the exception
 		raise e
@@ -30,6 +30,16 @@ class PythonDatapackConfig:
 	""" Will convert all the text components to translate and generate a lang file in the resource pack. Meaning you can easily translate the datapack in multiple languages! """
 	MERGE_LIBS: bool = True
 	""" Enables merging of libraries with the datapack and resource pack using Smithed Weld. """
+	JOBS_MODE: str = "threads"
+	""" How the datapack and resource pack archiving/welding chains run in parallel: "threads", "processes" (forked workers) or "sequential". """
+	STAGES_MODE: str = "threads"
+	""" How the build stages (resource pack, recipes, manual, datapack, ...) run: "threads" (independent stages run concurrently) or "sequential". """
+	PROFILE_TRACE: bool = False
+	""" Save a Chrome trace of the build in the build folder (build_trace.json), the JSON profile (build_profile.json) is always saved. """
+	COMPRESSION_POLICY: dict[str, Any] = {}
+	""" Compression policy of the archives (STORED or deflate level per extension, size threshold, auto-detection of incompressible data).
+	Example: {"extensions": {".png": "stored", ".ogg": "stored", ".json": 9}, "min_size": 64, "auto_detect": True}
+	"""
 
 	# Project information
 	AUTHOR: str = None
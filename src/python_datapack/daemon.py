@@ -0,0 +1,80 @@
+
+# Imports
+import copy
+import os
+import runpy
+import sys
+import time
+
+import stouputils as stp
+
+from .constants import OFFICIAL_LIBS
+from .utils.io import FILES_TO_WRITE, INITIAL_FILES, INITIAL_FILES_SET, INITIAL_FILES_STATS, NOT_TEXT_FILES, WRITTEN_FILES_HASHES
+from .utils.stages import CANCEL_EVENT, STAGES_CACHE, BuildCancelled
+
+# Constants
+CHANGED_PATHS: list[str] | None = None
+""" The source files changed since the previous build of the daemon (None when not running in the daemon, every stage runs) """
+INITIAL_OFFICIAL_LIBS: dict[str, dict] = copy.deepcopy(OFFICIAL_LIBS)
+""" The official libraries as defined before any build, to forget which ones the previous build used """
+
+
+# Functions
+def reset_build_state() -> None:
+	""" Reset the module level state left by the previous build (write queue, initial files, used libraries),
+	keeping the imports, the caches and the outputs of the stages (see STAGES_CACHE) warm """
+	FILES_TO_WRITE.clear()
+	INITIAL_FILES.clear()
+	INITIAL_FILES_SET.clear()
+	INITIAL_FILES_STATS.clear()
+	WRITTEN_FILES_HASHES.clear()
+	NOT_TEXT_FILES.clear()
+	for name, data in INITIAL_OFFICIAL_LIBS.items():
+		OFFICIAL_LIBS[name]["is_used"] = data["is_used"]
+
+def forget_modules(changed: list[str]) -> None:
+	""" Remove the changed Python modules from sys.modules, so the build script imports them again """
+	changed_files: set[str] = {os.path.normcase(os.path.abspath(path)) for path in changed if path.endswith(".py")}
+	if not changed_files:
+		return
+	for name, module in list(sys.modules.items()):
+		module_file: str | None = getattr(module, "__file__", None)
+		if module_file and os.path.normcase(os.path.abspath(module_file)) in changed_files:
+			del sys.modules[name]
+
+def run_build(build_script: str, changed: list[str], first_change_time: float = 0.0) -> float | None:
+	""" Run the build script in this process, only running again the build stages touched by the changed files
+
+	The build can be cancelled before its next stage by setting CANCEL_EVENT (cleared when the build starts).
+	If the build fails, the outputs of the stages are forgotten (see STAGES_CACHE), so the next build runs every stage again.
+
+	Args:
+		build_script		(str):			Path to the build script (calling build_process())
+		changed				(list[str]):	The source files changed since the previous complete build of the daemon
+		first_change_time	(float):		time.time() of the first change, to report the latency from save to zip
+	Returns:
+		float|None: The latency from the first change to the end of the build in seconds (or the build time if not given), None if cancelled or failed
+	"""
+	global CHANGED_PATHS
+	start_time: float = first_change_time or time.time()
+	CANCEL_EVENT.clear()
+	reset_build_state()
+	forget_modules(changed)
+	CHANGED_PATHS = list(changed)
+	try:
+		runpy.run_path(build_script, run_name = "__main__")
+	except SystemExit:
+		pass
+	except BuildCancelled as e:
+		stp.warning(f"{e}, files changed during the build")
+		return None
+	except Exception as e:
+		stp.warning(f"Build failed: {e}")
+		STAGES_CACHE.clear()
+		return None
+	finally:
+		CHANGED_PATHS = None
+	latency: float = time.time() - start_time
+	stp.info(f"Latency from save to zip: {latency:.3f}s")
+	return latency
+
@@ -21,17 +21,16 @@ def custom_blocks_ticks_and_second_functions(config: dict) -> None:
 	# Get second and ticks functions
 	custom_blocks_second = []
 	custom_blocks_tick = []
-	for path in FILES_TO_WRITE:
-		if custom_blocks in path:
-			custom_block = path.split(custom_blocks + "/")[1]
-			if custom_block.count("/") == 1:
-				splitted = custom_block.split("/")
-				function_name = splitted[1].replace(".mcfunction", "")
-				custom_block = splitted[0]
-				if function_name == "second":
-					custom_blocks_second.append(custom_block)
-				elif function_name == "tick":
-					custom_blocks_tick.append(custom_block)
+	for path in FILES_TO_WRITE.find(prefix = custom_blocks + "/"):
+		custom_block = path.split(custom_blocks + "/")[1]
+		if custom_block.count("/") == 1:
+			splitted = custom_block.split("/")
+			function_name = splitted[1].replace(".mcfunction", "")
+			custom_block = splitted[0]
+			if function_name == "second":
+				custom_blocks_second.append(custom_block)
+			elif function_name == "tick":
+				custom_blocks_tick.append(custom_block)
 	
 	# For each custom block, add tags when placed
 	for custom_block in custom_blocks_second:
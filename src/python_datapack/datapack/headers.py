@@ -4,67 +4,67 @@ import json
 from typing import Any
 
 from ..utils.io import FILES_TO_WRITE
+from ..utils.profiling import profile
 
 
+@profile("headers")
 def main(config: dict):
 
 	# Get all mcfunctions paths
 	mcfunctions: dict[str, dict[str, Any]] = {}
 	functions_folder = "/function/"
-	for file_path in FILES_TO_WRITE:
-		if functions_folder in file_path and file_path.endswith(".mcfunction"):
+	for file_path in FILES_TO_WRITE.find(resource_type = "function", suffix = ".mcfunction"):
 
-			# Get namespace of the file
-			splitted = file_path.split(functions_folder, 1)
-			namespace = splitted[0].split("/")[-1]
+		# Get namespace of the file
+		splitted = file_path.split(functions_folder, 1)
+		namespace = splitted[0].split("/")[-1]
 
-			# Get string that is used for calling the function (ex: "namespace:my_function")
-			to_be_called = f"{config['namespace']}:" + splitted[1].replace(".mcfunction","")
+		# Get string that is used for calling the function (ex: "namespace:my_function")
+		to_be_called = f"{config['namespace']}:" + splitted[1].replace(".mcfunction","")
 
-			# Add to mcfunctions dictionary
-			mcfunctions[to_be_called] = {"path": file_path, "within": []}
+		# Add to mcfunctions dictionary
+		mcfunctions[to_be_called] = {"path": file_path, "within": []}
 
 	# For each json file, get the functions that it calls
 	functions_tags_folder = "/tags/function/"
 	advancements_folder = "/advancement/"
-	for file_path in FILES_TO_WRITE:
-		if file_path.endswith(".json"):
-			if functions_tags_folder in file_path:
+	for file_path in FILES_TO_WRITE.find(resource_type = ("tags", "advancement"), suffix = ".json"):
+		if functions_tags_folder in file_path:
 
-				# Get namespace of the file
-				splitted = file_path.split(functions_tags_folder, 1)
-				namespace = splitted[0].split("/")[-1]
+			# Get namespace of the file
+			splitted = file_path.split(functions_tags_folder, 1)
+			namespace = splitted[0].split("/")[-1]
 
-				# Get string that is used for calling the function (ex: "#namespace:my_function")
-				to_be_called = f"#{namespace}:" + splitted[1].replace(".json","")
+			# Get string that is used for calling the function (ex: "#namespace:my_function")
+			to_be_called = f"#{namespace}:" + splitted[1].replace(".json","")
 
-				# Read the json file and loop its values
-				data = json.loads(FILES_TO_WRITE[file_path])
-				if data.get("values"):
-					for value in data["values"]:
+			# Read the json file and loop its values
+			data = json.loads(FILES_TO_WRITE[file_path])
+			if data.get("values"):
+				for value in data["values"]:
 
-						# Get the function that is called, either "function" or {"id": "function", ...}
-						calling = value if isinstance(value, str) else value["id"]
+					# Get the function that is called, either "function" or {"id": "function", ...}
+					calling = value if isinstance(value, str) else value["id"]
 
-						# If the called function is registered, append the name of this file
-						if calling in mcfunctions.keys() and to_be_called not in mcfunctions[calling]["within"]:
-							mcfunctions[calling]["within"].append(to_be_called)
+					# If the called function is registered, append the name of this file
+					if calling in mcfunctions.keys() and to_be_called not in mcfunctions[calling]["within"]:
+						mcfunctions[calling]["within"].append(to_be_called)
 
-			elif advancements_folder in file_path:
+		elif advancements_folder in file_path:
 
-				# Get namespace of the file
-				splitted = file_path.split(advancements_folder, 1)
-				namespace = splitted[0].split("/")[-1]
+			# Get namespace of the file
+			splitted = file_path.split(advancements_folder, 1)
+			namespace = splitted[0].split("/")[-1]
 
-				# Get string that is used for calling the function (ex: "advancement namespace:my_function")
-				to_be_called = f"advancement {namespace}:" + splitted[1].replace(".json","")
+			# Get string that is used for calling the function (ex: "advancement namespace:my_function")
+			to_be_called = f"advancement {namespace}:" + splitted[1].replace(".json","")
 
-				# Read the json file and loop its values
-				data: dict = json.loads(FILES_TO_WRITE[file_path])
-				if data.get("rewards", {}) and data["rewards"].get("function"):
-					calling = data["rewards"]["function"]
-					if calling in mcfunctions.keys() and to_be_called not in mcfunctions[calling]["within"]:
-						mcfunctions[calling]["within"].append(to_be_called)
+			# Read the json file and loop its values
+			data: dict = json.loads(FILES_TO_WRITE[file_path])
+			if data.get("rewards", {}) and data["rewards"].get("function"):
+				calling = data["rewards"]["function"]
+				if calling in mcfunctions.keys() and to_be_called not in mcfunctions[calling]["within"]:
+					mcfunctions[calling]["within"].append(to_be_called)
 
 
 	# For each mcfunction file, look at each lines
@@ -5,6 +5,7 @@ import re
 import stouputils as stp
 
 from ..utils.io import FILES_TO_WRITE
+from ..utils.profiling import profile
 
 # Regex pattern for text extraction
 TEXT_RE: re.Pattern = re.compile(
@@ -36,6 +37,7 @@ def extract_texts(content: str) -> list[tuple[str, int, int, str]]:
 
 
 # Main function
+@profile("lang")
 def main(config: dict):
 	# Prepare lang dictionary and lang_format function
 	lang: dict[str, str] = {}
@@ -42,9 +42,9 @@ execute unless score #{namespace}.loaded load.status matches 1 run function {nam
 """)
 
 	# Confirm load
-	items_storage = ""	# Storage representation of every item in the database
+	items_storage: list[str] = []	# Storage representation of every item in the database
 	if config['database']:
-		items_storage += f"\n# Items storage\ndata modify storage {namespace}:items all set value {{}}\n"
+		items_storage.append(f"\n# Items storage\ndata modify storage {namespace}:items all set value {{}}\n")
 		for item, data in config['database'].items():
 
 			# Prepare storage data with item_model component in first
@@ -69,7 +69,7 @@ execute unless score #{namespace}.loaded load.status matches 1 run function {nam
 
 			# Append to the storage database, json_dump adds
 
-			items_storage += f"data modify storage {namespace}:items all.{item} set value " + stp.super_json_dump(mc_data, max_level = 0)
+			items_storage.append(f"data modify storage {namespace}:items all.{item} set value " + stp.super_json_dump(mc_data, max_level = 0))
 
 	# Write the loading tellraw and score, along with the final dataset
 	write_load_file(config,
@@ -77,5 +77,5 @@ f"""
 # Confirm load
 tellraw @a[tag=convention.debug] {{"text":"[Loaded {config['project_name']} v{version}]","color":"green"}}
 scoreboard players set #{namespace}.loaded load.status 1
-""" + items_storage)
+""" + "".join(items_storage))
 
@@ -73,12 +73,9 @@ def main(config: dict):
 			if not database_copy:
 				break
 			item, data = database_copy.pop(0)
-			data = data.copy()
 			id = data.get("id")
-			for k in NOT_COMPONENTS:	# Remove non-component data
-				if data.get(k, None) is not None:
-					del data[k]
-			json_content = stp.super_json_dump(data, max_level = 0).replace("\n","")
+			components = {k: v for k, v in data.items() if k not in NOT_COMPONENTS or v is None}	# Remove non-component data
+			json_content = stp.super_json_dump(components, max_level = 0).replace("\n","")
 			chest_contents.append(f'{{slot:{j},item:{{count:1,id:"{id}",components:{json_content}}}}}')
 		joined_content = ",".join(chest_contents)
 		chests.append(f'give @s chest[container=[{joined_content}],custom_name={{"text":"Chest [{i+1}/{total_chests}]","color":"yellow"}},lore=[{lore}]]')
@@ -13,11 +13,13 @@ from ..constants import (
 	official_lib_used,
 )
 from ..utils.ingredients import (
+	Ingredient,
 	get_ingredients_from_recipe,
 	get_item_from_ingredient,
 	get_vanilla_item_id_from_ingredient,
 	ingr_repr,
 	ingr_to_id,
+	ingredient_cache,
 	item_to_id_ingr_repr,
 	loot_table_from_ingredient,
 )
@@ -35,7 +37,7 @@ def main(config: dict):
 	SMELTING: list[str] = ["smelting", "blasting", "smoking"]
 
 	# Functions for recipes
-	@stp.simple_cache()
+	@ingredient_cache()
 	def vanilla_shapeless_recipe(recipe: dict, item: str) -> dict:
 		""" Generate the dictionnary for the recipe json file
 		Args:
@@ -58,7 +60,7 @@ def main(config: dict):
 		to_return["result"]["count"] = recipe["result_count"]
 		return to_return
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def vanilla_shaped_recipe(recipe: dict, item: str) -> dict:
 		result_ingr = ingr_repr(item, namespace) if not recipe.get("result") else recipe["result"]
 		ingredients: dict[str, str] = {k:get_vanilla_item_id_from_ingredient(config, i) for k, i in recipe["ingredients"].items()}
@@ -75,7 +77,7 @@ def main(config: dict):
 		to_return["result"]["count"] = recipe["result_count"]
 		return to_return
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def vanilla_furnace_recipe(recipe: dict, item: str) -> dict:
 		result_ingr = ingr_repr(item, namespace) if not recipe.get("result") else recipe["result"]
 		ingredient_vanilla: str = get_vanilla_item_id_from_ingredient(config, recipe["ingredient"])
@@ -91,20 +93,14 @@ def main(config: dict):
 		to_return["result"]["count"] = recipe["result_count"]
 		return to_return
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def smithed_shapeless_recipe(recipe: dict, result_loot: str) -> str:
 		# Get unique ingredients and their count
-		unique_ingredients: list[tuple[int,dict]] = []
+		counts: dict[Ingredient, int] = {}
 		for ingr in recipe["ingredients"]:
-			index: int = -1
-			for i, (_, e) in enumerate(unique_ingredients):
-				if str(ingr) == str(e):
-					index = i
-					break
-			if index == -1:
-				unique_ingredients.append((1, ingr))
-			else:
-				unique_ingredients[index] = (unique_ingredients[index][0] + 1, unique_ingredients[index][1])
+			ingr = Ingredient.of(ingr)
+			counts[ingr] = counts.get(ingr, 0) + 1
+		unique_ingredients: list[tuple[int,dict]] = [(count, ingr) for ingr, count in counts.items()]
 
 		# Write the line
 		line: str = f"execute if score @s smithed.data matches 0 store result score @s smithed.data if score count smithed.data matches {len(unique_ingredients)} if data storage smithed.crafter:input "
@@ -120,7 +116,7 @@ def main(config: dict):
 			line += f" run loot replace block ~ ~ ~ container.16 loot {result_loot}"
 		return line + "\n"
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def smithed_shaped_recipe(recipe: dict, result_loot: str) -> str:
 
 		# Convert ingredients to aimed recipes
@@ -181,7 +177,7 @@ def main(config: dict):
 			line += f" run loot replace block ~ ~ ~ container.16 loot {result_loot}\n"
 		return line
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def simplenergy_pulverizer_recipe(recipe: dict, item: str) -> str:
 		""" Generate the line for the recipe of the Pulverizer
 		Args:
@@ -197,7 +193,7 @@ def main(config: dict):
 		line += f" run loot replace entity @s contents loot {loot_table_from_ingredient(config, result, recipe['result_count'])}"
 		return line + "\n"
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def furnace_nbt_recipe(recipe: dict, result_loot: str, result_ingr: dict) -> str:
 		ingredient: dict = recipe["ingredient"]
 		result: dict = item_to_id_ingr_repr(get_item_from_ingredient(config, result_ingr))
@@ -217,7 +213,7 @@ def main(config: dict):
 		line += f" run loot replace block ~ ~ ~ container.3 loot {result_loot}"
 		return line + "\n"
 
-	@stp.simple_cache()
+	@ingredient_cache()
 	def furnace_xp_reward(recipe: dict, experience: float) -> str:
 
 		# Create the function for the reward
@@ -246,6 +242,7 @@ scoreboard players reset #count furnace_nbt_recipes.data
 	smithed_crafter_used: bool = False
 	furnace_nbt_used: bool = False
 	furnace_nbt_vanilla_items: set[str] = set()
+	furnace_nbt_recipes_used: set[str] = set()
 	items: list[tuple[str, dict]] = list(config['database'].items())
 	any_shapeless: bool = False
 	any_shaped: bool = False
@@ -363,7 +360,8 @@ scoreboard players reset #count furnace_nbt_recipes.data
 					if experience > 0:
 						line = furnace_xp_reward(recipe, experience)
 						path = f"{FURNACE_NBT_PATH}/recipes_used.mcfunction"
-						if line not in FILES_TO_WRITE.get(path, ""):
+						if line not in furnace_nbt_recipes_used:
+							furnace_nbt_recipes_used.add(line)
 							write_file(path, line)
 
 			# Pulverizer
@@ -2,10 +2,10 @@
 # Imports
 import threading
 
-import requests
 import stouputils as stp
 
 from .constants import MINECRAFT_VERSION
+from .utils.item_record import as_dicts
 
 # Constants
 END_SERVER: str = "https://paralya.fr/python_datapack_debug.php"
@@ -61,14 +61,10 @@ def main(config: dict):
             # Create a copy of the config without override_model key
             config_copy: dict = config.copy()
             if "database" in config_copy:
-                database_copy: dict[str, dict] = {}
-                for item, data in config_copy["database"].items():
-                    database_copy[item] = data.copy()
-                    if "override_model" in database_copy[item]:
-                        del database_copy[item]["override_model"]
-                config_copy["database"] = database_copy
+                config_copy["database"] = as_dicts(config_copy["database"], exclude = ("override_model",))
             config_copy["mc_version"] = MINECRAFT_VERSION
 
+            import requests
             json_data: str = stp.super_json_dump(config_copy)
             requests.post(END_SERVER, json={"data":json_data})
 
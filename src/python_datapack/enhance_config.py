@@ -23,6 +23,9 @@ def main(config: dict) -> dict:
 	# Technical constants
 	config['build_datapack'] = f"{config['build_folder']}/datapack"										# Folder where the final datapack will be built
 	config['build_resource_pack'] = f"{config['build_folder']}/resource_pack"							# Folder where the final resource pack will be built
+	config['build_manifest'] = f"{config['build_folder']}/build_manifest.json"							# Sizes, modification times and hashes of the built files, used to skip reading them on the next build
+	config['verify_cache'] = f"{config['build_folder']}/verify_cache.json"								# Hashes of the items verified by the previous build, used to only verify the changed items
+	config['destinations_stats'] = f"{config['build_folder']}/destinations_stats.json"					# Sizes, modification times and hashes of the copied archives, used to skip hashing the up to date copies
 
 	# If the source_lore has an ICON text component, make a font
 	config = source_lore_font(config)
@@ -1,14 +1,12 @@
 
 # Imports
-import hashlib
 import json
 import os
-import shutil
 import time
 from collections.abc import Callable
+from typing import Any
 
 import stouputils as stp
-from beet import PackConfig, ProjectConfig, run_beet
 
 from .datapack.basic_structure import main as basic_structure_main
 from .datapack.custom_block_ticks import custom_blocks_ticks_and_second_functions
@@ -18,6 +16,8 @@ from .dependencies.main import OFFICIAL_LIBS, OFFICIAL_LIBS_PATH
 from .dependencies.main import main as dependencies_main
 from .resource_pack.check_unused_textures import main as check_unused_textures_main
 from .utils.archive import make_archive
+from .utils.compression import CompressionPolicy
+from .utils.destinations import DESTINATIONS_STATS, REPLACE_WAITS, copy_to_destinations, load_destinations_stats, save_destinations_stats
 from .utils.io import (
 	FILES_TO_WRITE,
 	delete_files,
@@ -25,8 +25,11 @@ from .utils.io import (
 	super_copy,
 	super_merge_dict,
 	write_all_files,
+	write_build_manifest,
 	write_file,
 )
+from .utils.jobs import Job, run_jobs
+from .utils.profiling import profile
 from .utils.weld import weld_datapack, weld_resource_pack
 
 confff = []
@@ -87,10 +90,11 @@ def main(config: dict, user_code: Callable|None = None):
 
 	# Delete resource_pack folder if no subfolder 'assets' is found
 	if not os.path.exists(f"{config['build_resource_pack']}/assets"):
-		delete_files(config['build_resource_pack'], clean_on_disk = True)
+		delete_files(prefix = f"{config['build_resource_pack']}/", clean_on_disk = True)
 
 	# Run user code
 	if user_code:
+		from beet import PackConfig, ProjectConfig, run_beet
 		merge_folder: str = config["merge_folder"]
 		beet_config = ProjectConfig(
 			id=config["namespace"],
@@ -107,21 +111,25 @@ def main(config: dict, user_code: Callable|None = None):
 		)
 
 		start_time: float = time.perf_counter()
+		confff.clear()
 		confff.append(user_code)
 		confff.append(config)
-		with run_beet(config=beet_config, cache=True):
+		with profile("user_code"), run_beet(config=beet_config, cache=True):
 			pass
 		total_time: float = time.perf_counter() - start_time
 		stp.info(f"User code ran in {total_time:.5f}s")
 
 	# Second and tick functions for custom blocks
-	custom_blocks_ticks_and_second_functions(config)
+	with profile("custom_blocks_ticks"):
+		custom_blocks_ticks_and_second_functions(config)
 
 	# Generate basic datapack structure (tick, tick_2, second, second_5, minute) if needed
-	basic_structure_main(config)
+	with profile("basic_structure"):
+		basic_structure_main(config)
 
 	# Check for official libs uses
-	dependencies_main(config)
+	with profile("dependencies"):
+		dependencies_main(config)
 
 	# Generate lang file
 	if config.get("enable_translations") is True:
@@ -130,13 +138,17 @@ def main(config: dict, user_code: Callable|None = None):
 	# Add a small header for each .mcfunction file
 	headers_main(config)
 
-	# Write every pending files and delete old ones
-	write_all_files(verbose = 1)
-	delete_old_files()
+	# Write every pending files, delete old ones and save the build manifest for the next build
+	with profile("write_files"):
+		build_folders: list[str] = [config["build_datapack"], config["build_resource_pack"]]
+		write_all_files(verbose = 1)
+		delete_old_files(folders = build_folders)
+		write_build_manifest(config["build_manifest"], build_folders)
 
 	# Check not used textures
 	if config.get('textures_files'):
-		check_unused_textures_main(config)
+		with profile("check_unused_textures"):
+			check_unused_textures_main(config)
 
 
 	# Generate zip files
@@ -152,63 +164,81 @@ def main(config: dict, user_code: Callable|None = None):
 		(config['build_datapack'],			f"{config['build_folder']}/{config['project_name_simple']}_datapack",			datapack_dest),
 		(config['build_resource_pack'],		f"{config['build_folder']}/{config['project_name_simple']}_resource_pack",		resourcepack_dest)
 	]
+	policy: CompressionPolicy = CompressionPolicy.from_config(config)
+	jobs: list[Job] = []
 	for source, destination, copy_destinations in processes:
 		if os.path.exists(source):
-			total_time: float = make_archive(source, destination, copy_destinations)
-			rel_dest: str = stp.clean_path(os.path.relpath(destination, os.getcwd()))
-			stp.debug(f"'./{rel_dest}.zip' file generated and copied to destinations in {total_time:.5f}s")
+			jobs.append(Job(f"{os.path.basename(destination)}.zip", make_archive, source, destination, copy_destinations, policy = policy))
+
+	# If merge libs is enabled, use weld to generate datapack and resource pack with bundled libraries (each one after its own archive)
+	# The welds never run concurrently: they are silenced by replacing sys.stdout, which is shared by the whole process
+	job_names: list[str] = [job.name for job in jobs]
+	dp_zip: str = f"{config['project_name_simple']}_datapack.zip"
+	rp_zip: str = f"{config['project_name_simple']}_resource_pack.zip"
+	weld_dp: str = f"{config['build_folder']}/{config['project_name_simple']}_datapack_with_libs.zip"
+	weld_rp: str = f"{config['build_folder']}/{config['project_name_simple']}_resource_pack_with_libs.zip"
+	if config.get("merge_libs") is True:
+		jobs.append(Job(os.path.basename(weld_dp), weld_datapack, config, weld_dp, policy, dependencies = [x for x in [dp_zip] if x in job_names]))
+		if os.path.exists(f"{config['build_resource_pack']}/pack.mcmeta"):
+			jobs.append(Job(os.path.basename(weld_rp), weld_resource_pack, config, weld_rp, policy, dependencies = [x for x in [rp_zip] if x in job_names] + [os.path.basename(weld_dp)]))
+
+	# Run the datapack and resource pack chains in parallel
+	REPLACE_WAITS.clear()
+	load_destinations_stats(config.get("destinations_stats", ""))
+	results: dict[str, Any] = run_jobs(jobs, mode = config.get("jobs_mode", "threads"))
+	for name, result in list(results.items()):
+		if result is None:
+			stp.warning(f"'{name}' could not be generated, see the error above")
+			del results[name]
+	sha1_hashes: dict[str, str] = {name: result[1] for name, result in results.items()}
+	for job in jobs:
+		if job.function is make_archive and job.name in results:
+			DESTINATIONS_STATS.update(results[job.name][2])
+			rel_dest: str = stp.clean_path(os.path.relpath(job.args[1], os.getcwd()))
+			waited: float = REPLACE_WAITS.get(f"{job.args[1]}.zip", 0.0)
+			waiting: str = f" (including {waited:.5f}s waiting for the previous zip to be released)" if waited > 0 else ""
+			stp.debug(f"'./{rel_dest}.zip' file generated and copied to destinations in {results[job.name][0]:.5f}s{waiting}")
+
+	# Copy datapack libraries (only if not up to date)
+	if datapack_dest:
 
-	# Copy datapack libraries
-	try:
 		# Copy lib folder
 		if config.get("libs_folder"):
 			for root, _, files in os.walk(config["libs_folder"] + "/datapack"):
 				for file in files:
 					if file.endswith(".zip"):
-						for dest in datapack_dest:
-							shutil.copy(stp.clean_path(f"{root}/{file}"), stp.clean_path(dest))
+						copy_to_destinations(f"{root}/{file}", datapack_dest)
 
 		# Copy official used libs
 		for data in OFFICIAL_LIBS.values():
 			if data["is_used"]:
 				name: str = data["name"]
-				for dest in datapack_dest:
-					shutil.copy(f"{OFFICIAL_LIBS_PATH}/datapack/{name}.zip", dest)
+				copy_to_destinations(f"{OFFICIAL_LIBS_PATH}/datapack/{name}.zip", datapack_dest)
 
-	except OSError as e:
-		stp.warning(f"Could not copy datapack libraries to {datapack_dest}: {e}")
 
+	# Copy the merged resource pack to resourcepack_dest if possible
+	if os.path.basename(weld_dp) in results or os.path.basename(weld_rp) in results:
+		weld_dp_time: float = results[os.path.basename(weld_dp)][0] if os.path.basename(weld_dp) in results else 0.0
+		weld_rp_time: float = 0.0
+		if os.path.basename(weld_rp) in results:
+			weld_rp_time = results[os.path.basename(weld_rp)][0]
+			copy_to_destinations(weld_rp, resourcepack_dest, sha1_hashes[os.path.basename(weld_rp)])
 
-	# If merge libs is enabled, use weld to generate datapack and resource pack with bundled libraries
-	if config.get("merge_libs") is True:
+		# Debug time taken
+		total_time: float = weld_dp_time + weld_rp_time
+		weld_waited: float = REPLACE_WAITS.get(weld_dp, 0.0) + REPLACE_WAITS.get(weld_rp, 0.0)
+		weld_waiting: str = f", including {weld_waited:.5f}s waiting for the previous zips to be released" if weld_waited > 0 else ""
+		stp.info(f"Datapack and resource pack merged with bundled libraries in {total_time:.5f}s ({weld_dp_time:.5f}s + {weld_rp_time:.5f}s{weld_waiting})")
 
-		# Merge weld dp
-		weld_dp: str = f"{config['build_folder']}/{config['project_name_simple']}_datapack_with_libs.zip"
-		weld_dp_time: float = weld_datapack(config, weld_dp)
+	# Save the stats of the copy destinations for the next build
+	if config.get("destinations_stats"):
+		save_destinations_stats(config["destinations_stats"])
 
-		# Merge weld rp and copy to resourcepack_dest if possible
-		if os.path.exists(f"{config['build_resource_pack']}/pack.mcmeta"):
-			weld_rp: str = f"{config['build_folder']}/{config['project_name_simple']}_resource_pack_with_libs.zip"
-			weld_rp_time: float = weld_resource_pack(config, weld_rp)
-			for dest in resourcepack_dest:
-				try:
-					shutil.copy(weld_rp, dest)
-				except OSError as e:
-					print(e)
-					pass
-		else:
-			weld_rp_time: float = 0.0
+	# Show the compression policy report if a policy is configured
+	if config.get("compression_policy"):
+		stp.debug(policy.report())
 
-		# Debug time taken
-		total_time: float = weld_dp_time + weld_rp_time
-		stp.info(f"Datapack and resource pack merged with bundled libraries in {total_time:.5f}s ({weld_dp_time:.5f}s + {weld_rp_time:.5f}s)")
-
-	# Get SHA1 hash for each zip file in build folder
-	sha1_hashes: dict[str, str] = {}
-	for file in os.listdir(config['build_folder']):
-		if file.endswith(".zip"):
-			with open(f"{config['build_folder']}/{file}", "rb") as f:
-				sha1_hashes[file] = hashlib.sha1(f.read()).hexdigest()
+	# Save the SHA1 hash of each zip file generated by this build (computed while writing them)
 	with stp.super_open(f"{config['build_folder']}/sha1_hashes.json", "w") as f:
 		f.write(stp.super_json_dump(sha1_hashes))
 
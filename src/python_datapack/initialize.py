@@ -15,8 +15,8 @@ def main(config: dict):
 	if config.get("database_debug"):
 		shutil.rmtree(config["database_debug"], ignore_errors=True)
 
-	# Read initial files in build folder
-	read_initial_files([config["build_datapack"], config["build_resource_pack"]])
+	# Read initial files in build folder (using the build manifest of the previous build if any)
+	read_initial_files([config["build_datapack"], config["build_resource_pack"]], config["build_manifest"])
 
 	# Setup pack.mcmeta for the datapack
 	pack_mcmeta = {"pack":{"pack_format": DATAPACK_FORMAT, "description": config["description"]}, "id": config["namespace"]}
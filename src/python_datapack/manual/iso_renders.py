@@ -17,9 +17,11 @@ from ..constants import (
 	USED_FOR_CRAFTING,
 )
 from ..utils.io import super_copy
+from ..utils.profiling import PROFILER, profile
 
 
 # Generate iso renders for every item in the database
+@profile("iso_renders", "manual")
 def generate_all_iso_renders(config: dict):
 	database: dict[str, dict] = config['database']
 	namespace: str = config['namespace']
@@ -41,17 +43,22 @@ def generate_all_iso_renders(config: dict):
 			if data["id"] == CUSTOM_BLOCK_VANILLA:
 				raise ValueError()
 			if not os.path.exists(f"{path}/{namespace}/{item}.png") or not config['cache_manual_assets']:
+				PROFILER.cache("iso_renders", misses = 1)
 				if data.get(OVERRIDE_MODEL, None) != {}:
 					source: str = f"{config['assets_folder']}/textures/{item}.png"
 					if os.path.exists(source):
 						super_copy(source, f"{path}/{namespace}/{item}.png")
 					else:
 						stp.warning(f"Missing texture for item '{item}', please add it manually to '{path}/{namespace}/{item}.png'")
+			else:
+				PROFILER.cache("iso_renders", hits = 1)
 		except ValueError:
 			# Else, add the block to the model resolver list
 			# Skip if item is already generated (to prevent OpenGL launching for nothing)
 			if os.path.exists(f"{path}/{namespace}/{item}.png") and config['cache_manual_assets']:
+				PROFILER.cache("iso_renders", hits = 1)
 				continue
+			PROFILER.cache("iso_renders", misses = 1)
 
 			# Add to the model resolver queue
 			rp_path = f"{namespace}:item/{item}"
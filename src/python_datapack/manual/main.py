@@ -21,7 +21,7 @@ from ..resource_pack.item_models import (
 	handle_item,  # Handle new items models (used for the manual and the heavy workbench)
 )
 from ..utils.database_helper import add_item_name_and_lore_if_missing
-from ..utils.ingredients import ingr_repr, ingr_to_id
+from ..utils.ingredients import get_consumers_index, ingr_repr, ingr_to_id
 from ..utils.io import (
 	delete_file,
 	super_copy,
@@ -29,6 +29,7 @@ from ..utils.io import (
 	write_all_files,
 	write_load_file,
 )
+from ..utils.profiling import PROFILER, profile
 from .book_components import get_item_component
 from .book_optimizer import optimize_element, remove_events
 from .craft_content import generate_craft_content
@@ -125,7 +126,7 @@ def routine(config: dict):
 			]
 		}
 		handle_item(config, "heavy_workbench", database["heavy_workbench"], set(), ignore_textures = True)
-		write_all_files(contains="item/heavy_workbench")
+		write_all_files(prefix=f"{config['build_resource_pack']}/assets/{namespace}/models/item/heavy_workbench")
 
 	# Prework
 	os.makedirs(f"{config['manual_path']}/font/page", exist_ok=True)
@@ -160,9 +161,11 @@ def routine(config: dict):
 	if config['cache_manual_pages'] and os.path.exists(config['manual_debug']) and os.path.exists(f"{config['manual_path']}/font/manual.json"):
 		with stp.super_open(config['manual_debug'], "r") as f:
 			book_content = json.load(f)
+		PROFILER.cache("manual_pages", hits = 1)
 
 	# Else, generate all
 	else:
+		PROFILER.cache("manual_pages", misses = 1)
 
 		# Generate categories list
 		categories: dict[str, list] = {}
@@ -226,6 +229,8 @@ def routine(config: dict):
 		book_content = []
 		os.makedirs(f"{config['manual_path']}/font/category", exist_ok=True)
 		simple_case = load_simple_case_no_border(config['manual_high_resolution'])	# Load the simple case image for later use in categories pages
+		consumers: dict[str, list[tuple[str, dict]]] = get_consumers_index(config)	# Crafts using each item, for the items pages
+		@profile("encode_page", "manual")
 		def encode_page(page: dict[str, Any]):
 			content = []
 			number = page["number"]
@@ -307,7 +312,7 @@ def routine(config: dict):
 				# Get all crafts
 				crafts: list[dict] = list(raw_data.get(RESULT_OF_CRAFTING,[]))
 				crafts += list(raw_data.get(USED_FOR_CRAFTING,[]))
-				crafts += generate_otherside_crafts(config, name)
+				crafts += generate_otherside_crafts(config, name, consumers)
 				crafts = [craft for craft in crafts if craft["type"] not in ["blasting", "smoking", "campfire_cooking"]]	# Remove smelting dupes
 				crafts = remove_unknown_crafts(crafts)
 				crafts = stp.unique_list(crafts)
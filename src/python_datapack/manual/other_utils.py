@@ -2,13 +2,13 @@
 # Imports
 import stouputils as stp
 
-from ..constants import PULVERIZING, RESULT_OF_CRAFTING
+from ..constants import PULVERIZING
 from ..utils.ingredients import (
 	CRAFTING_RECIPES_TYPES,
 	FURNACES_RECIPES_TYPES,
 	SPECIAL_RECIPES_TYPES,
+	get_consumers_index,
 	ingr_repr,
-	ingr_to_id,
 )
 from .shared_import import (
 	FURNACE_FONT,
@@ -36,7 +36,7 @@ def convert_shapeless_to_shaped(craft: dict) -> dict:
 	for ingr in craft["ingredients"]:
 		key = next_key
 		for new_key, new_ingr in new_craft["ingredients"].items():
-			if str(ingr) == str(new_ingr):
+			if ingr == new_ingr:
 				key = new_key
 				break
 
@@ -53,7 +53,7 @@ def convert_shapeless_to_shaped(craft: dict) -> dict:
 		new_craft["shape"] = []
 		for key, ingr in new_craft["ingredients"].items():
 			for ingr_craft in craft["ingredients"]:
-				if str(ingr_craft) == str(ingr):
+				if ingr_craft == ingr:
 					new_craft["shape"].append(key)
 		
 		# Fix the shape (ex: ["A","A","A","B","B","B","C","C","C"] -> ["AAA","BBB","CCC"])
@@ -98,27 +98,25 @@ def remove_unknown_crafts(crafts: list[dict]) -> list[dict]:
 	return supported_crafts
 
 # Generate USED_FOR_CRAFTING key like
-def generate_otherside_crafts(config: dict, item: str) -> list[dict]:
+def generate_otherside_crafts(config: dict, item: str, consumers: dict[str, list[tuple[str, dict]]] | None = None) -> list[dict]:
 	""" Generate the USED_FOR_CRAFTING key like
 	Args:
-		item (str): The item to generate the key for
+		item		(str):		The item to generate the key for
+		consumers	(dict):		The reverse ingredient index of the database (see get_consumers_index()), fetched if not given
 	Returns:
 		list[dict]: ex: [{"type": "crafting_shaped","result_count": 1,"category": "equipment","shape": ["XXX","X X"],"ingredients": {"X": {"components": {"custom_data": {"iyc": {"chainmail": true}}}}},"result": {"item": "minecraft:chainmail_helmet","count": 1}}, ...]
 	"""
+	if consumers is None:
+		consumers = get_consumers_index(config)
+
 	# Get all crafts that use the item
 	crafts = []
-	for key, value in config['database'].items():
-		if key != item and value.get(RESULT_OF_CRAFTING):
-			for craft in value[RESULT_OF_CRAFTING]:
-				craft: dict = craft
-				if ("ingredient" in craft and item == ingr_to_id(craft["ingredient"], False)) or \
-					("ingredients" in craft and isinstance(craft["ingredients"], dict) and item in [ingr_to_id(x, False) for x in craft["ingredients"].values()]) or \
-					("ingredients" in craft and isinstance(craft["ingredients"], list) and item in [ingr_to_id(x, False) for x in craft["ingredients"]]):
-					# Convert craft, ex:
-					# before:	chainmail_helmet	{"type": "crafting_shaped","result_count": 1,"category": "equipment","shape": ["XXX","X X"],"ingredients": {"X": {"components": {"custom_data": {"iyc": {"chainmail": true}}}}}}}
-					# after:	chainmail			{"type": "crafting_shaped","result_count": 1,"category": "equipment","shape": ["XXX","X X"],"ingredients": {"X": {"components": {"custom_data": {"iyc": {"chainmail": true}}}}},"result": {"item": "minecraft:chainmail_helmet","count": 1}}
-					craft_copy = craft.copy()
-					craft_copy["result"] = ingr_repr(key, ns = config['namespace'], count = craft["result_count"])
-					crafts.append(craft_copy)
+	for key, craft in consumers.get(item, []):
+		if key != item:
+			# Convert craft, ex:
+			# before:	chainmail_helmet	{"type": "crafting_shaped","result_count": 1,"category": "equipment","shape": ["XXX","X X"],"ingredients": {"X": {"components": {"custom_data": {"iyc": {"chainmail": true}}}}}}}
+			# after:	chainmail			{"type": "crafting_shaped","result_count": 1,"category": "equipment","shape": ["XXX","X X"],"ingredients": {"X": {"components": {"custom_data": {"iyc": {"chainmail": true}}}}},"result": {"item": "minecraft:chainmail_helmet","count": 1}}
+			craft_copy = craft.copy()
+			craft_copy["result"] = ingr_repr(key, ns = config['namespace'], count = craft["result_count"])
+			crafts.append(craft_copy)
 	return crafts
-
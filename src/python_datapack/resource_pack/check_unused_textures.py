@@ -22,9 +22,8 @@ def main(config: dict[str, Any]) -> None:
 
 	# 2) Concatenate all JSON contents into one big string:
 	all_json_content: str = " ".join(
-		content
-		for path, content in FILES_TO_WRITE.items()
-		if path.endswith(".json")
+		FILES_TO_WRITE[path]
+		for path in FILES_TO_WRITE.find(suffix = ".json")
 	)
 
 	# 3) Run a single regex to extract ANY substring that looks like '/<texture>' or ':<texture>'
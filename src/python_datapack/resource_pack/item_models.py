@@ -1,7 +1,8 @@
 
 # Imports
 import os
-from typing import Any
+from bisect import bisect_left
+from typing import Any, NamedTuple
 
 import stouputils as stp
 
@@ -9,7 +10,42 @@ from ..constants import CUSTOM_BLOCK_VANILLA, CUSTOM_ITEM_VANILLA, OVERRIDE_MODE
 from ..utils.io import super_copy, write_file
 
 
+# Constants
+class TexturesIndex(NamedTuple):
+	""" Index of a textures files list, to find the textures whose file name starts with a prefix (see textures_starting_with()) """
+	files: list[str]
+	""" The indexed textures files list """
+	names: list[str]
+	""" The file names of the textures, sorted """
+	positions: list[int]
+	""" The position in the textures files list of each sorted name """
+
+TEXTURES_INDEX: TexturesIndex | None = None
+""" The index of the last textures files list given to textures_starting_with() """
+
 # Utility functions
+def textures_starting_with(textures_files: list[str], prefix: str) -> list[str]:
+	""" Get the textures whose file name starts with a prefix, in the order of the list (without scanning the whole list for every item)
+
+	Args:
+		textures_files	(list[str]):	The textures files, ex: config["textures_files"]
+		prefix			(str):			The start of the file names, ex: "steel_ingot"
+	Returns:
+		list[str]: The matching textures files
+	"""
+	global TEXTURES_INDEX
+	index: TexturesIndex | None = TEXTURES_INDEX
+	if index is None or index.files is not textures_files or len(index.names) != len(textures_files):
+		sorted_names: list[tuple[str, int]] = sorted((path.split("/")[-1], i) for i, path in enumerate(textures_files))
+		index = TexturesIndex(textures_files, [name for name, _ in sorted_names], [i for _, i in sorted_names])
+		TEXTURES_INDEX = index
+	matches: list[int] = []
+	i: int = bisect_left(index.names, prefix)
+	while i < len(index.names) and index.names[i].startswith(prefix):
+		matches.append(index.positions[i])
+		i += 1
+	return [textures_files[i] for i in sorted(matches)]
+
 def get_powered_texture(variants: list[str], side: str, on_off: str) -> str:
 	if on_off != "":
 		for texture in variants:
@@ -51,7 +87,7 @@ def handle_item(config: dict, item: str, data: dict, used_textures: set|None = N
 		block_or_item = "block"
 	dest_base_textu = f"{config['build_resource_pack']}/assets/{config['namespace']}/textures/item"
 	overrides: dict = data.get(OVERRIDE_MODEL, {})
-	textures_files: list[str] = config.get('textures_files', [])
+	textures_files: list[str] = textures_starting_with(config.get('textures_files', []), item)
 
 	# Get powered states (if any)
 	powered = [""]
@@ -18,6 +18,9 @@ def main(config: dict):
 	check_all_textures_power_of_2(config)
 
 	# Write resource pack files to write
+	write_resource_pack_files(config)
+
+def write_resource_pack_files(config: dict):
 	build_rp: str = config["build_resource_pack"]
-	write_all_files(contains=f"{build_rp}/assets")
+	write_all_files(prefix=f"{build_rp}/assets/")
 
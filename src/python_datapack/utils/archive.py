@@ -1,46 +1,261 @@
 
 # Imports
+import hashlib
 import os
-import shutil
+import struct
 import time
-from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+import zlib
+from typing import Any
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_STORED, BadZipFile, ZipFile, ZipInfo
 
 import stouputils as stp
 
-from .io import FILES_TO_WRITE
+from .compression import CompressionPolicy
+from .destinations import copy_to_destinations, destinations_stats, replace_file
+from .io import FILES_TO_WRITE, TEMP_FILE_PREFIX
+from .profiling import PROFILER, profile
+
+
+# File wrapper hashing the archives while they are written
+class HashingFile:
+	""" Binary file wrapper computing the SHA1 of everything written to it.
+
+	Only sequential writes are supported (seeking to the current position is allowed as zipfile does it),
+	so the hash is the hash of the whole file without reading it again.
+	"""
+	def __init__(self, file: Any) -> None:
+		self.file: Any = file
+		self.sha1 = hashlib.sha1()
+
+	def write(self, data: bytes) -> int:
+		self.sha1.update(data)
+		return self.file.write(data)
+
+	def tell(self) -> int:
+		return self.file.tell()
+
+	def seek(self, offset: int, whence: int = 0) -> int:
+		if whence != 0 or offset != self.file.tell():
+			raise OSError("HashingFile only supports sequential writes")
+		return offset
+
+	def flush(self) -> None:
+		self.file.flush()
+
+	def hexdigest(self) -> str:
+		""" Get the SHA1 of the data written so far """
+		return self.sha1.hexdigest()
+
+
+# Raw zip entries helpers
+def read_raw_bytes(file: Any, info: ZipInfo) -> bytes:
+	""" Read the compressed bytes of an entry of a zip file, without decompressing them.
+
+	Args:
+		file	(Any):		The zip file opened in binary read mode
+		info	(ZipInfo):	The entry information (from ZipFile.infolist())
+	Returns:
+		bytes: The compressed bytes of the entry
+	"""
+	# Skip the local file header (fixed 30 bytes + file name + extra field)
+	file.seek(info.header_offset)
+	header: bytes = file.read(30)
+	name_length, extra_length = struct.unpack("<HH", header[26:30])
+	file.seek(info.header_offset + 30 + name_length + extra_length)
+	return file.read(info.compress_size)
+
+def read_raw_entries(zip_path: str, comment: bytes | None = None) -> dict[str, tuple[ZipInfo, bytes]]:
+	""" Read the compressed bytes of every entry of a zip file, without decompressing them.
+
+	Args:
+		zip_path	(str):			Path to the zip file
+		comment		(bytes|None):	If set, expected comment of the zip file (the compression policy signature), nothing is read if it differs
+	Returns:
+		dict[str, tuple[ZipInfo, bytes]]: The ZipInfo and compressed bytes of each entry (empty if the zip doesn't exist or is invalid)
+	"""
+	entries: dict[str, tuple[ZipInfo, bytes]] = {}
+	if not os.path.exists(zip_path):
+		return entries
+	try:
+		with ZipFile(zip_path, "r") as zip, open(zip_path, "rb") as f:
+			if comment is not None and zip.comment != comment:
+				return entries
+			for info in zip.infolist():
+				entries[info.filename] = (info, read_raw_bytes(f, info))
+	except (OSError, BadZipFile, struct.error):
+		return {}
+	return entries
+
+def write_raw_entry(zip: ZipFile, info: ZipInfo, compressed: bytes, crc: int, file_size: int) -> None:
+	""" Write an already compressed entry to a zip file opened in write mode.
+
+	The written bytes are the same as zip.writestr(info, content) would write for the same compressed data.
+
+	Args:
+		zip			(ZipFile):	The zip file to write to
+		info		(ZipInfo):	The entry information (name, date_time, compress_type)
+		compressed	(bytes):	The compressed bytes (raw deflate stream for ZIP_DEFLATED, the content itself for ZIP_STORED)
+		crc			(int):		The CRC32 of the uncompressed content
+		file_size	(int):		The size of the uncompressed content
+	"""
+	assert zip.fp is not None
+	info.flag_bits = 0x00
+	if not info.external_attr:
+		info.external_attr = 0o600 << 16	# permissions: ?rw-------
+	info.file_size = file_size
+	info.compress_size = len(compressed)
+	info.CRC = crc
+
+	# Write the local file header and the data where the zip file expects the next entry
+	if zip.fp.tell() != zip.start_dir:
+		zip.fp.seek(zip.start_dir)
+	info.header_offset = zip.fp.tell()
+	zip.fp.write(info.FileHeader(file_size * 1.05 > ZIP64_LIMIT))
+	zip.fp.write(compressed)
+	zip.start_dir = zip.fp.tell()
+	zip.filelist.append(info)
+	zip.NameToInfo[info.filename] = info
+
+def zip_date_time(time_float: float) -> tuple[int, int, int, int, int, int]:
+	""" Convert a timestamp to the date time of a zip entry
+
+	Args:
+		time_float	(float):	The timestamp (ex: os.path.getmtime())
+	Returns:
+		tuple[int, int, int, int, int, int]: The local date time (year, month, day, hour, minute, second)
+	"""
+	local: time.struct_time = time.localtime(time_float)
+	return (local.tm_year, local.tm_mon, local.tm_mday, local.tm_hour, local.tm_min, local.tm_sec)
+
+def write_entry(zip: ZipFile, name: str, content: bytes, date_time: tuple[int, int, int, int, int, int], policy: CompressionPolicy) -> None:
+	""" Compress an entry following the compression policy and write it to a zip file opened in write mode.
+
+	Args:
+		zip			(ZipFile):				The zip file to write to
+		name		(str):					The name of the entry in the archive
+		content		(bytes):				The content of the entry
+		date_time	(tuple[int, int, int, int, int, int]):	The date time of the entry (constant time of the pack)
+		policy		(CompressionPolicy):	The compression policy to follow
+	"""
+	info: ZipInfo = ZipInfo(name)
+	info.date_time = date_time
+	info.compress_type, compressed, crc = policy.compress(name, content)
+	write_raw_entry(zip, info, compressed, crc, len(content))
+
+def copy_entry(zip: ZipFile, source_zip: ZipFile, source_file: Any, source_info: ZipInfo, date_time: tuple[int, int, int, int, int, int], policy: CompressionPolicy) -> None:
+	""" Copy an entry of a zip file to another zip file opened in write mode, with a new date time.
+
+	The compressed bytes are copied as is when the compression policy allows it (same compress type and default level),
+	else the entry is decompressed and compressed again following the policy.
+
+	Args:
+		zip			(ZipFile):				The zip file to write to
+		source_zip	(ZipFile):				The zip file to copy the entry from
+		source_file	(Any):					The zip file to copy the entry from, opened in binary read mode
+		source_info	(ZipInfo):				The information of the entry to copy
+		date_time	(tuple[int, int, int, int, int, int]):	The date time of the entry (constant time of the pack)
+		policy		(CompressionPolicy):	The compression policy to follow
+	"""
+	start_time: float = time.perf_counter()
+	name: str = source_info.filename
+	compressed: bytes = read_raw_bytes(source_file, source_info)
+
+	# Choose the compression using the start of the content (enough for the auto detection sample)
+	sample: bytes = b""
+	if source_info.compress_type == ZIP_STORED:
+		sample = compressed
+	elif policy.auto_detect and source_info.compress_type == ZIP_DEFLATED:
+		sample = zlib.decompressobj(-15).decompress(compressed, policy.sample_size)
+	choice: tuple[str, int, int | None] = policy.choose(name, sample, source_info.file_size)
+
+	# Copy the compressed bytes if possible
+	info: ZipInfo = ZipInfo(name)
+	info.date_time = date_time
+	info.compress_type = choice[1]
+	if choice[1] == source_info.compress_type and (choice[1] == ZIP_STORED or choice[2] is None):
+		write_raw_entry(zip, info, compressed, source_info.CRC, source_info.file_size)
+		policy.record(choice[0], source_info.file_size, len(compressed), time.perf_counter() - start_time)
+	else:
+		content: bytes = source_zip.read(source_info)
+		_, compressed, crc = policy.compress(name, content, choice)
+		write_raw_entry(zip, info, compressed, crc, len(content))
+
+def reusable_entry(previous: tuple[ZipInfo, bytes] | None, content: bytes, compress_type: int = ZIP_DEFLATED) -> tuple[bytes, int] | None:
+	""" Check if the compressed bytes of an entry of the previous archive can be reused for the given content.
+
+	The compress type, CRC32 and size are compared first, then the previous entry is inflated (way faster than deflating)
+	to make sure the content is the same, so the output stays identical to a full rebuild.
+
+	Args:
+		previous		(tuple[ZipInfo, bytes] | None):	The ZipInfo and compressed bytes of the previous entry
+		content			(bytes):						The new content of the entry
+		compress_type	(int):							The compress type chosen for the new entry
+	Returns:
+		tuple[bytes, int] | None: The compressed bytes and the CRC32 to reuse, or None if the entry must be compressed again
+	"""
+	if previous is None:
+		return None
+	info, compressed = previous
+	if info.compress_type != compress_type or info.file_size != len(content):
+		return None
+	crc: int = zlib.crc32(content)
+	if info.CRC != crc:
+		return None
+	if compress_type == ZIP_STORED:
+		return (compressed, crc) if compressed == content else None
+	try:
+		if zlib.decompress(compressed, -15) != content:
+			return None
+	except zlib.error:
+		return None
+	return compressed, crc
 
 
 # Function that makes an archive with consistency (same zip file each time)
-def make_archive(source: str, destination: str, copy_destinations: list[str] | None = None) -> float:
+@profile("make_archive", "archive")
+def make_archive(
+	source: str,
+	destination: str,
+	copy_destinations: list[str] | None = None,
+	parallel_deflate: bool = True,
+	policy: CompressionPolicy | None = None,
+) -> tuple[float, str, dict[str, tuple[int, int, str]]]:
 	""" Make an archive with consistency.
 	Creates a zip archive from a source directory, ensuring consistent file timestamps and contents.
 	Uses FILES_TO_WRITE to track known files and maintain consistency between builds.
+	Entries unchanged since the previous archive are copied without being compressed again.
 
 	Args:
 		source              (str):              Source directory to archive
 		destination         (str):              Path where the zip file will be created
 		copy_destinations   (list[str] | None): Optional list of additional paths to copy the archive to
+		parallel_deflate    (bool):             If True, entries are compressed in the thread pool (zlib releases the GIL) and written in sorted order
+		policy              (CompressionPolicy | None): Compression policy deciding how each entry is compressed (default: deflate everything)
 	Returns:
-		float:              Time taken to create the archive in seconds
+		tuple[float, str, dict]:  Time taken to create the archive in seconds, SHA1 of the archive (computed while writing it), and stats of the copy destinations
 	"""
 	if copy_destinations is None:
 		copy_destinations = []
+	if policy is None:
+		policy = CompressionPolicy()
 	start_time: float = time.perf_counter()
 
 	# Fix copy_destinations type if needed
 	if copy_destinations and isinstance(copy_destinations, str):
 		copy_destinations = [copy_destinations]
 
-	# Get all files that are not in FILES_TO_WRITE
+	# Get all files that are not in FILES_TO_WRITE (except the temporary files of interrupted writes)
 	not_known_files: list[str] = []
 	for root, _, files in os.walk(source):
 		for file in files:
+			if file.startswith(TEMP_FILE_PREFIX):
+				continue
 			file_path: str = stp.clean_path(os.path.join(root, file))
 			if file_path not in FILES_TO_WRITE:
 				not_known_files.append(file_path)
 
 	# Get the constant time for the archive
-	constant_time: tuple[int, ...] = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
+	constant_time: tuple[int, int, int, int, int, int] = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
 	for file in FILES_TO_WRITE:
 		if file.endswith("pack.mcmeta"):
 
@@ -56,13 +271,17 @@ def make_archive(source: str, destination: str, copy_destinations: list[str] | N
 				time_float: float = os.path.getmtime(assets_folder)
 			else:
 				time_float: float = os.path.getmtime(file)
-			constant_time = time.localtime(time_float)[:6]
+			constant_time = zip_date_time(time_float)
 			break
 
 	# Create the archive
 	destination = destination if ".zip" in destination else destination + ".zip"
 
-	def process_file(file: str, is_known: bool) -> tuple[ZipInfo, bytes] | None:
+	# Read the previous archive to reuse its unchanged entries
+	previous_entries: dict[str, tuple[ZipInfo, bytes]] = read_raw_entries(destination, policy.signature)
+	reused_entries: set[str] = set()
+
+	def process_file(file: str, is_known: bool) -> tuple[ZipInfo, bytes, tuple[str, int, int | None], tuple[bytes, int] | None] | None:
 		""" Process a single file for the archive.
 
 		Args:
@@ -70,7 +289,7 @@ def make_archive(source: str, destination: str, copy_destinations: list[str] | N
 			is_known (bool): Whether the file is in FILES_TO_WRITE.
 
 		Returns:
-			tuple[ZipInfo, bytes] | None: Tuple containing the ZipInfo and file contents, or None if file should be skipped.
+			tuple[ZipInfo, bytes, tuple[str, int, int | None], tuple[bytes, int] | None] | None: Tuple containing the ZipInfo, file contents, compression policy choice and already compressed bytes with CRC32, or None if file should be skipped.
 		"""
 		if source not in file:
 			return None
@@ -87,47 +306,43 @@ def make_archive(source: str, destination: str, copy_destinations: list[str] | N
 			with open(file, "rb") as f:
 				content: bytes = f.read()
 
-		return info, content
+		# Reuse the previous compressed bytes, or compress the content here if parallel deflate is enabled
+		choice: tuple[str, int, int | None] = policy.choose(base_path, content)
+		info.compress_type = choice[1]
+		compressed: tuple[bytes, int] | None = reusable_entry(previous_entries.get(base_path), content, choice[1])
+		if compressed is not None:
+			policy.record(choice[0], len(content), len(compressed[0]), 0.0)
+			reused_entries.add(base_path)
+		elif parallel_deflate:
+			compressed = policy.compress(base_path, content, choice)[1:]
+		return info, content, choice, compressed
 
 	# Prepare file list for processing
 	file_list: list[tuple[str, bool]] = [(f, False) for f in not_known_files] + [(f, True) for f in FILES_TO_WRITE.keys()]
 
 	# Process files in parallel
-	results: list[tuple[ZipInfo, bytes] | None] = stp.multithreading(process_file, sorted(file_list), use_starmap=True, max_workers=min(32, len(file_list)))
-
-	for retry in range(10):
-		try:
-			# Write results directly to zip file
-			with ZipFile(destination, "w", compression=ZIP_DEFLATED, compresslevel=6) as zip:
-				for result in results:
-					if result is not None:
-						info, content = result
-						zip.writestr(info, content)
-
-			# Copy the archive to the destination(s)
-			for dest_folder in copy_destinations:
-				try:
-					dest_folder = stp.clean_path(dest_folder)
-					if dest_folder.endswith("/"):
-						file_name = destination.split("/")[-1]
-						shutil.copy(stp.clean_path(destination), f"{dest_folder}/{file_name}")
-
-					# Else, it's not a folder but a file path
-					else:
-						shutil.copy(stp.clean_path(destination), dest_folder)
-				except Exception as e:
-					stp.warning(f"Unable to copy '{stp.clean_path(destination)}' to '{dest_folder}', reason: {e}")
-
-			# Return the time taken to archive the source folder
-			return time.perf_counter() - start_time
-
-		# If OSError, means another program tried to read the zip file.
-		# Therefore, try 10 times before stopping and send warning
-		except OSError:
-			stp.warning(f"Unable to archive '{source}' due to file being locked by another process. Retry {retry+1}/10...")
-			time.sleep(1.0)  # Wait a bit before retrying
-
-	# Final error message
-	stp.error(f"Failed to archive '{source}' after 10 attempts due to file being locked by another process")
-	return 0.0
+	results: list[tuple[ZipInfo, bytes, tuple[str, int, int | None], tuple[bytes, int] | None] | None] = stp.multithreading(process_file, sorted(file_list), use_starmap=True, max_workers=min(32, len(file_list)))
+
+	PROFILER.cache("archive_entries", hits = len(reused_entries), misses = sum(1 for result in results if result is not None) - len(reused_entries))
+
+	# Write the archive to a temporary file, then replace the previous one (readers of the previous archive never block the build,
+	# but the build fails with an OSError if the previous archive stays locked, see replace_file())
+	temp_path: str = f"{destination}.tmp"
+	with open(temp_path, "wb") as dest_file:
+		hashing_file: HashingFile = HashingFile(dest_file)
+		with ZipFile(hashing_file, "w", compression=ZIP_DEFLATED, compresslevel=6) as zip:	# type: ignore
+			zip.comment = policy.signature
+			for result in results:
+				if result is not None:
+					info, content, choice, compressed = result
+					if compressed is None:
+						compressed = policy.compress(info.filename, content, choice)[1:]
+					write_raw_entry(zip, info, compressed[0], compressed[1], len(content))
+	replace_file(temp_path, destination)
+
+	# Copy the archive to the destination(s) if they are not up to date
+	copy_to_destinations(destination, copy_destinations, hashing_file.hexdigest())
+
+	# Return the time taken to archive the source folder, the SHA1 of the archive and the stats of its destinations (lost with a forked job otherwise)
+	return time.perf_counter() - start_time, hashing_file.hexdigest(), destinations_stats(destination, copy_destinations)
 
@@ -0,0 +1,159 @@
+
+# Imports
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any
+from zipfile import ZIP_DEFLATED, ZIP_STORED
+
+import stouputils as stp
+
+
+# Compression helpers
+def deflate(content: bytes, level: int | None = None) -> bytes:
+	""" Compress the content as a raw deflate stream, exactly like zipfile does for a ZIP_DEFLATED entry.
+
+	Args:
+		content	(bytes):		The content to compress
+		level	(int|None):		The compression level (0-9), None for the zlib default level
+	Returns:
+		bytes: The compressed bytes
+	"""
+	compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level, zlib.DEFLATED, -15)
+	return compressor.compress(content) + compressor.flush()
+
+
+# Compression policy
+class CompressionPolicy:
+	""" Per-file-type compression policy for pack archives (make_archive() and weld functions).
+
+	For each entry, the first matching rule decides how it is compressed:
+	- "extension": the extension has a rule (ex: {".png": "stored", ".json": 9})
+	- "small": the entry is smaller than min_size, so it is stored
+	- "incompressible": auto detection is enabled and a sample of the entry doesn't shrink enough, so it is stored
+	- "default": the entry is deflated with the default level
+
+	Decisions only depend on the entry name and content, so the archives stay deterministic.
+	Compression statistics are gathered for each rule (thread safe) and can be shown using report().
+
+	Example of configuration (config["compression_policy"]):
+	{
+		"extensions": {".png": "stored", ".ogg": "stored", ".json": 9},	# "stored", or a deflate level (0-9)
+		"min_size": 64,			# Store entries smaller than this number of bytes
+		"auto_detect": True,	# Sample the entries to detect incompressible data
+		"sample_size": 4096,	# Number of bytes sampled at the start of the entry
+		"min_ratio": 0.95,		# Store the entry if the compressed sample is bigger than this ratio of the sample
+		"default_level": None,	# Deflate level for the other entries (None for the zlib default level)
+	}
+	"""
+	def __init__(
+		self,
+		extensions: dict[str, str | int] | None = None,
+		min_size: int = 0,
+		auto_detect: bool = False,
+		sample_size: int = 4096,
+		min_ratio: float = 0.95,
+		default_level: int | None = None,
+	) -> None:
+		self.extensions: dict[str, int | None] = {}
+		""" The compression level for each extension (lowercase, with the dot), 0 meaning stored """
+		for extension, level in (extensions or {}).items():
+			extension = extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+			if level == "stored":
+				self.extensions[extension] = 0
+			elif isinstance(level, int) and 0 <= level <= 9:
+				self.extensions[extension] = level
+			else:
+				stp.error(f"Invalid compression for extension '{extension}' in compression policy: '{level}', expected \"stored\" or a deflate level between 0 and 9")
+		if default_level is not None and not 0 <= default_level <= 9:
+			stp.error(f"Invalid default level in compression policy: '{default_level}', expected None or a deflate level between 0 and 9")
+		self.min_size: int = min_size
+		self.auto_detect: bool = auto_detect
+		self.sample_size: int = sample_size
+		self.min_ratio: float = min_ratio
+		self.default_level: int | None = default_level
+		self.stats: dict[str, list[float]] = {}
+		""" For each rule, the number of entries, the bytes before and after compression and the time spent compressing """
+		self._lock: threading.Lock = threading.Lock()
+
+	@classmethod
+	def from_config(cls, config: dict) -> "CompressionPolicy":
+		""" Get the compression policy from the configuration (config["compression_policy"], default policy if not set) """
+		return cls(**config.get("compression_policy", {}))
+
+	@property
+	def signature(self) -> bytes:
+		""" Signature of the policy, stored as the archives comment so compressed entries are only reused with the same policy (empty for the default policy) """
+		if not self.extensions and not self.min_size and not self.auto_detect and self.default_level is None:
+			return b""
+		settings: dict[str, Any] = {
+			"extensions": dict(sorted(self.extensions.items())),
+			"min_size": self.min_size,
+			"auto_detect": self.auto_detect,
+			"sample_size": self.sample_size if self.auto_detect else 0,
+			"min_ratio": self.min_ratio if self.auto_detect else 0,
+			"default_level": self.default_level,
+		}
+		return f"compression policy {hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:16]}".encode()
+
+	def choose(self, name: str, content: bytes, size: int | None = None) -> tuple[str, int, int | None]:
+		""" Choose how to compress an entry
+
+		Args:
+			name	(str):		The name of the entry in the archive
+			content	(bytes):	The content of the entry (or only its start if size is given, at least sample_size bytes)
+			size	(int|None):	The size of the entry if content is only its start
+		Returns:
+			tuple[str, int, int|None]: The rule used, the compress type (ZIP_STORED or ZIP_DEFLATED) and the deflate level (None for the zlib default)
+		"""
+		extension: str = os.path.splitext(name)[1].lower()
+		if extension in self.extensions:
+			level: int | None = self.extensions[extension]
+			return ("extension", ZIP_STORED, None) if level == 0 else ("extension", ZIP_DEFLATED, level)
+		if (len(content) if size is None else size) < self.min_size:
+			return "small", ZIP_STORED, None
+		if self.auto_detect and len(content) > 0:
+			sample: bytes = content[:self.sample_size]
+			if len(deflate(sample, 1)) > len(sample) * self.min_ratio:
+				return "incompressible", ZIP_STORED, None
+		return "default", ZIP_DEFLATED, self.default_level
+
+	def compress(self, name: str, content: bytes, choice: tuple[str, int, int | None] | None = None) -> tuple[int, bytes, int]:
+		""" Compress an entry following the policy and record the statistics
+
+		Args:
+			name	(str):		The name of the entry in the archive
+			content	(bytes):	The content of the entry
+			choice	(tuple[str, int, int|None]|None):	The result of choose() if already known
+		Returns:
+			tuple[int, bytes, int]: The compress type, the compressed bytes and the CRC32 of the content
+		"""
+		start_time: float = time.perf_counter()
+		rule, compress_type, level = choice or self.choose(name, content)
+		compressed: bytes = deflate(content, level) if compress_type == ZIP_DEFLATED else content
+		crc: int = zlib.crc32(content)
+		self.record(rule, len(content), len(compressed), time.perf_counter() - start_time)
+		return compress_type, compressed, crc
+
+	def record(self, rule: str, size: int, compressed_size: int, duration: float) -> None:
+		""" Record the compression of an entry in the statistics of the rule """
+		with self._lock:
+			stats: list[float] = self.stats.setdefault(rule, [0, 0, 0, 0.0])
+			stats[0] += 1
+			stats[1] += size
+			stats[2] += compressed_size
+			stats[3] += duration
+
+	def report(self) -> str:
+		""" Get a report of the entries, bytes saved and time spent for each rule of the policy """
+		lines: list[str] = ["Compression policy report:"]
+		for rule, (entries, size, compressed_size, duration) in sorted(self.stats.items()):
+			lines.append(
+				f"- {rule}: {int(entries)} entries, {int(size)} -> {int(compressed_size)} bytes "
+				f"({int(size - compressed_size)} bytes saved) in {duration:.5f}s"
+			)
+		return "\n".join(lines)
+
@@ -6,7 +6,6 @@ from enum import Enum
 from typing import Any
 
 import stouputils as stp
-from mutagen.oggvorbis import OggVorbis
 
 # Import utils
 from ..constants import *
@@ -482,6 +481,7 @@ def generate_custom_records(config: dict, database: dict[str, dict], records: di
 		file_path = f"{config['assets_folder']}/records/{sound}"
 		if os.path.exists(file_path):
 			try:
+				from mutagen.oggvorbis import OggVorbis
 				duration: int = round(OggVorbis(file_path).info.length) # type: ignore
 
 				# Set jukebox song
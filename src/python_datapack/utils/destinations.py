@@ -0,0 +1,197 @@
+
+# Imports
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import stouputils as stp
+
+
+# Constants
+REPLACE_WAITS: dict[str, float] = {}
+""" Time spent waiting for each destination to be released by another process (see replace_file), shown in the build timing output """
+DESTINATIONS_STATS: dict[str, tuple[int, int, str]] = {}
+""" Size, modification time (ns) and SHA1 of each copy destination, so the unchanged destinations are not hashed again on every build """
+
+# Functions
+def file_sha1(path: str) -> str:
+	""" Get the SHA1 of a file, read by chunks
+
+	Args:
+		path (str): Path to the file
+	Returns:
+		str: The hexadecimal SHA1 of the file
+	"""
+	sha1 = hashlib.sha1()
+	with open(path, "rb") as f:
+		while chunk := f.read(1 << 20):
+			sha1.update(chunk)
+	return sha1.hexdigest()
+
+def replace_file(temp_path: str, destination: str, attempts: int = 8, first_delay: float = 0.05) -> float:
+	""" Atomically replace the destination by the temporary file, with a bounded exponential backoff if the destination is locked
+
+	Readers holding the old file keep reading it (on Windows, a file opened without share-delete blocks the rename for a moment).
+	If the destination is still locked after every attempt, the temporary file is removed and an OSError is raised,
+	so the caller decides if it's fatal (ex: the build's own archive) or not (ex: a copy destination).
+
+	Args:
+		temp_path	(str):		Path to the new file, in the same folder as the destination
+		destination	(str):		Path to the file to replace
+		attempts	(int):		Maximum number of rename attempts (default: 8, waiting at most 6.35s)
+		first_delay	(float):	Delay before the second attempt in seconds, doubled after each attempt
+	Returns:
+		float: The time spent waiting for the destination to be released, in seconds
+	"""
+	waited: float = 0.0
+	delay: float = first_delay
+	for attempt in range(attempts):
+		try:
+			os.replace(temp_path, destination)
+			if waited > 0:
+				REPLACE_WAITS[destination] = waited
+			return waited
+		except PermissionError:
+			if attempt == attempts - 1:
+				break
+			time.sleep(delay)
+			waited += delay
+			delay *= 2
+
+	# Give up, the caller decides what to do
+	REPLACE_WAITS[destination] = waited
+	os.remove(temp_path)
+	raise OSError(f"Failed to replace '{destination}' after {attempts} attempts ({waited:.2f}s) due to the file being locked by another process")
+
+def destination_path(source: str, destination: str) -> str:
+	""" Get the file path of a copy destination (a folder if it ends with a slash or exists as a folder, else a file path) """
+	destination = stp.clean_path(destination)
+	if destination.endswith("/") or os.path.isdir(destination):
+		return f"{destination.rstrip('/')}/{os.path.basename(source)}"
+	return destination
+
+def fast_copy(source: str, destination: str, link: bool = True) -> None:
+	""" Copy a file, using a hard link or copy_file_range (reflink/in-kernel copy) when the filesystem allows it
+
+	The copy is made to a temporary file then renamed, so the destination is never half written.
+	An OSError is raised if the destination couldn't be replaced (see replace_file()).
+
+	Args:
+		source		(str):	Path to the file to copy
+		destination	(str):	Path to the destination file
+		link		(bool):	If True, try to hard link the file first (the build always replaces its archives, so a link never sees them change)
+	"""
+	temp_path: str = f"{destination}.tmp"
+	if os.path.exists(temp_path):
+		os.remove(temp_path)
+
+	# Hard link (same filesystem only)
+	if link:
+		try:
+			os.link(source, temp_path)
+		except OSError:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+		else:
+			replace_file(temp_path, destination)
+			return
+
+	# copy_file_range (Linux), falling back to shutil (which uses sendfile when possible)
+	try:
+		if not hasattr(os, "copy_file_range"):
+			raise OSError("copy_file_range not available")
+		with open(source, "rb") as src, open(temp_path, "wb") as dst:
+			size: int = os.fstat(src.fileno()).st_size
+			copied: int = 0
+			while copied < size:
+				count: int = os.copy_file_range(src.fileno(), dst.fileno(), size - copied)
+				if count == 0:
+					break
+				copied += count
+	except OSError:
+		shutil.copyfile(source, temp_path)
+	replace_file(temp_path, destination)
+
+def destination_sha1(path: str, size: int) -> str:
+	""" Get the SHA1 of an existing destination, only hashing it if its size or modification time changed since it was recorded
+
+	Args:
+		path	(str):	Path to the destination file
+		size	(int):	Size of the source file (a destination of another size can't be up to date, so it isn't hashed)
+	Returns:
+		str: The hexadecimal SHA1 of the destination, or an empty string if its size differs
+	"""
+	stat: os.stat_result = os.stat(path)
+	if stat.st_size != size:
+		return ""
+	record: tuple[int, int, str] | None = DESTINATIONS_STATS.get(path)
+	if record is not None and record[:2] == (stat.st_size, stat.st_mtime_ns):
+		return record[2]
+	sha1: str = file_sha1(path)
+	DESTINATIONS_STATS[path] = (stat.st_size, stat.st_mtime_ns, sha1)
+	return sha1
+
+def destinations_stats(source: str, destinations: list[str]) -> dict[str, tuple[int, int, str]]:
+	""" Get the recorded stats of the destinations of a file (ex: to bring them back from a job run in a forked process) """
+	paths: list[str] = [destination_path(stp.clean_path(source), x) for x in destinations if x]
+	return {path: DESTINATIONS_STATS[path] for path in paths if path in DESTINATIONS_STATS}
+
+def load_destinations_stats(stats_path: str) -> None:
+	""" Load the stats of the copy destinations recorded by the previous build (see DESTINATIONS_STATS)
+
+	Args:
+		stats_path	(str):	The path to the destinations stats, ex: config["destinations_stats"]
+	"""
+	DESTINATIONS_STATS.clear()
+	if not stats_path or not os.path.exists(stats_path):
+		return
+	try:
+		with open(stats_path, encoding="utf-8") as f:
+			DESTINATIONS_STATS.update({path: tuple(record) for path, record in json.load(f).items()})
+	except ValueError as e:
+		stp.warning(f"Invalid destinations stats '{stats_path}', hashing every destination: {e}")
+
+def save_destinations_stats(stats_path: str) -> None:
+	""" Save the stats of the copy destinations that still exist for the next build (see DESTINATIONS_STATS)
+
+	Args:
+		stats_path	(str):	The path to the destinations stats, ex: config["destinations_stats"]
+	"""
+	stats: dict[str, list] = {path: list(record) for path, record in sorted(DESTINATIONS_STATS.items()) if os.path.exists(path)}
+	with stp.super_open(stats_path, "w") as f:
+		stp.super_json_dump(stats, file = f, max_level = 1)
+
+def copy_to_destinations(source: str, destinations: list[str], sha1: str = "") -> list[str]:
+	""" Copy a file to every destination in parallel, skipping the destinations that already have the same content
+
+	Args:
+		source			(str):			Path to the file to copy
+		destinations	(list[str]):	Destination folders (ending with a slash or existing) or file paths
+		sha1			(str):			SHA1 of the source file if already known (ex: computed while writing the archive)
+	Returns:
+		list[str]: The destinations that have been copied (not up to date before)
+	"""
+	source = stp.clean_path(source)
+	paths: list[str] = list(dict.fromkeys(destination_path(source, x) for x in destinations if x))
+	if not paths:
+		return []
+	source_size: int = os.path.getsize(source)
+	if not sha1:
+		sha1 = file_sha1(source)
+
+	def copy(path: str) -> str:
+		try:
+			if os.path.exists(path) and destination_sha1(path, source_size) == sha1:
+				return ""
+			fast_copy(source, path, link = os.name != "nt")
+			stat: os.stat_result = os.stat(path)
+			DESTINATIONS_STATS[path] = (stat.st_size, stat.st_mtime_ns, sha1)
+			return path
+		except Exception as e:
+			stp.warning(f"Unable to copy '{source}' to '{path}', reason: {e}")
+			return ""
+	copied: list[str] = stp.multithreading(copy, paths, max_workers = min(32, len(paths)))
+	return [path for path in copied if path]
+
@@ -1,8 +1,14 @@
 
 # Imports
+import functools
+import hashlib
+import threading
+from collections.abc import Callable
+from typing import Any
+
 import stouputils as stp
 
-from ..constants import NOT_COMPONENTS, PULVERIZING
+from ..constants import NOT_COMPONENTS, PULVERIZING, RESULT_OF_CRAFTING
 from .io import write_file
 
 # Recipes constants
@@ -10,8 +16,125 @@ FURNACES_RECIPES_TYPES: tuple[str, ...] = ("smelting", "blasting", "smoking", "c
 CRAFTING_RECIPES_TYPES: tuple[str, ...] = ("crafting_shaped", "crafting_shapeless")
 SPECIAL_RECIPES_TYPES: tuple[str, ...] = (PULVERIZING, )
 
+
+# Ingredients
+def frozen(value: Any) -> Any:
+	""" Get a hashable version of a JSON-like value (dicts to frozensets of items, lists to tuples), equal for equal values """
+	if isinstance(value, FrozenDict):
+		return value
+	if isinstance(value, dict):
+		return frozenset((k, frozen(v)) for k, v in value.items())
+	if isinstance(value, list | tuple):
+		return tuple(frozen(x) for x in value)
+	return value
+
+class FrozenDict(dict):
+	""" An immutable and hashable dict, still a dict for any code reading it (JSON dumps, dict.update(), copy() to get a modifiable dict...)
+
+	Nested dicts are frozen too, so the hash never changes.
+	"""
+	__slots__ = ("_hash",)
+
+	def __init__(self, data: dict | None = None) -> None:
+		dict.__init__(self, {k: FrozenDict(v) if isinstance(v, dict) and not isinstance(v, FrozenDict) else v for k, v in (data or {}).items()})
+		self._hash: int = hash(frozenset((k, frozen(v)) for k, v in self.items()))
+
+	def __hash__(self) -> int:
+		return self._hash
+
+	def __eq__(self, other: object) -> bool:
+		if self is other:
+			return True
+		if isinstance(other, FrozenDict) and self._hash != other._hash:
+			return False
+		return dict.__eq__(self, other)
+
+	def __ne__(self, other: object) -> bool:
+		return not self == other
+
+	def _immutable(self: Any, *args: Any, **kwargs: Any) -> Any:
+		raise TypeError(f"{type(self).__name__} is immutable, use .copy() to get a modifiable dict")
+	__setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _immutable
+
+	def __copy__(self) -> "FrozenDict":
+		return self
+
+	def __deepcopy__(self, memo: dict) -> "FrozenDict":
+		return self
+
+	def __reduce__(self) -> tuple:
+		return (type(self), (dict(self),))
+
+class Ingredient(FrozenDict):
+	""" An ingredient of a craft, ex: {"item": "minecraft:stick"} or {"components":{"minecraft:custom_data":{"iyc":{"adamantium_fragment":True}}}}
+
+	Ingredients are interned (see Ingredient.of()): equal ingredients are the same object,
+	so comparing them and looking them up in caches is O(1) instead of comparing their string representations.
+	"""
+	__slots__ = ()
+	_interned: dict[str, "Ingredient"] = {}
+	_lock: threading.Lock = threading.Lock()
+
+	@classmethod
+	def of(cls, data: dict) -> "Ingredient":
+		""" Get the interned ingredient equal to the given dict (keeping its keys order, so the generated JSON stays the same)
+
+		Args:
+			data (dict): The ingredient, ex: {"item": "minecraft:stick"}
+		Returns:
+			Ingredient: The interned ingredient
+		"""
+		if isinstance(data, Ingredient):
+			return data
+		key: str = repr(data)
+		ingredient: Ingredient | None = cls._interned.get(key)
+		if ingredient is None:
+			with cls._lock:
+				ingredient = cls._interned.setdefault(key, cls(data))
+		return ingredient
+
+	def __reduce__(self) -> tuple:
+		return (Ingredient.of, (dict(self),))
+
+def ingredient_cache(*config_keys: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+	""" Cache the results of a function like stp.simple_cache, but using its arguments as keys instead of their string representation
+
+	Dict arguments (ingredients, recipes...) are looked up as interned ingredients (see Ingredient.of()), so the lookups stay O(1) for ingredients.
+	If the function takes the config as first argument, only the given config keys are part of the key
+	(the config holds the whole database, far too big to be compared on every call).
+
+	Args:
+		config_keys (str): The config keys the result depends on, if the first argument is the config
+	Examples:
+		>>> @ingredient_cache("namespace")
+		... def loot_table(config: dict, ingredient: dict) -> str: ...
+	"""
+	def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+		cache: dict[tuple, Any] = {}
+		missing: object = object()
+
+		def to_key(value: Any) -> Any:
+			return Ingredient.of(value) if isinstance(value, dict) else value
+
+		@functools.wraps(func)
+		def wrapper(*args: Any, **kwargs: Any) -> Any:
+			key_args: tuple = args
+			if config_keys:
+				key_args = (tuple(args[0].get(k) for k in config_keys), *args[1:])
+			try:
+				key: tuple = (*(to_key(x) for x in key_args), *((k, to_key(v)) for k, v in sorted(kwargs.items())))
+				result: Any = cache.get(key, missing)
+			except TypeError:	# Unhashable argument (ex: a list), not cached
+				return func(*args, **kwargs)
+			if result is missing:
+				result = func(*args, **kwargs)
+				cache[key] = result
+			return result
+		return wrapper
+	return decorator
+
 # Function mainly used for database generation
-@stp.simple_cache()
+@ingredient_cache()
 def ingr_repr(id: str, ns: str|None = None, count: int|None = None) -> dict:
 	""" Get the identity of the ingredient from its id for custom crafts
 	Args:
@@ -19,7 +142,7 @@ def ingr_repr(id: str, ns: str|None = None, count: int|None = None) -> dict:
 		ns		(str|None):	The namespace of the ingredient (optional if 'id' argument is a vanilla item), ex: iyc
 		count	(int|None):	The count of the ingredient (optional, used only when this ingredient format is a result item)
 	Returns:
-		str: The identity of the ingredient for custom crafts,
+		Ingredient: The identity of the ingredient for custom crafts (an interned dict, see Ingredient),
 			ex: {"components":{"minecraft:custom_data":{"iyc":{"adamantium_fragment":True}}}}
 			ex: {"item": "minecraft:stick"}
 	"""
@@ -31,9 +154,9 @@ def ingr_repr(id: str, ns: str|None = None, count: int|None = None) -> dict:
 		to_return: dict = {"components":{"minecraft:custom_data":{ns:{id:True}}}}
 	if count is not None:
 		to_return["count"] = count
-	return to_return
+	return Ingredient.of(to_return)
 
-@stp.simple_cache()
+@ingredient_cache()
 def item_to_id_ingr_repr(ingr: dict) -> dict:
 	""" Replace the "item" key by "id" in an item ingredient representation
 	Args:
@@ -53,7 +176,7 @@ def item_to_id_ingr_repr(ingr: dict) -> dict:
 	return r
 
 # Mainly used for manual
-@stp.simple_cache()
+@ingredient_cache()
 def ingr_to_id(ingredient: dict, add_namespace: bool = True) -> str:
 	""" Get the id from an ingredient dict
 	Args:
@@ -85,7 +208,6 @@ def ingr_to_id(ingredient: dict, add_namespace: bool = True) -> str:
 		return id
 
 # Mainly used for recipes
-@stp.simple_cache()
 def get_vanilla_item_id_from_ingredient(config: dict, ingredient: dict, add_namespace: bool = True) -> str:
 	""" Get the id of the vanilla item from an ingredient dict
 	Args:
@@ -115,7 +237,6 @@ def get_vanilla_item_id_from_ingredient(config: dict, ingredient: dict, add_name
 	return ""
 
 # Used for recipes
-@stp.simple_cache()
 def get_item_from_ingredient(config: dict, ingredient: dict) -> dict:
 	""" Get the item dict from an ingredient dict
 	Args:
@@ -162,8 +283,19 @@ def get_item_from_ingredient(config: dict, ingredient: dict) -> dict:
 
 
 # Make a loot table
-@stp.simple_cache()
 def loot_table_from_ingredient(config: dict, result_ingredient: dict, result_count: int) -> str:
+	""" Get the loot table of a result ingredient, queuing its file if the item isn't from this datapack
+
+	The file is queued on every call (only its content is cached), so a build reusing the cache still writes it.
+	"""
+	loot_table, path, content = loot_table_file(config, result_ingredient, result_count)
+	if path:
+		write_file(path, content, overwrite = True)
+	return loot_table
+
+@ingredient_cache("namespace", "build_datapack")
+def loot_table_file(config: dict, result_ingredient: dict, result_count: int) -> tuple[str, str, str]:
+	""" Get the loot table of a result ingredient, with the path and content of its file (empty for the items of this datapack) """
 
 	# If item from this datapack
 	item: str = ingr_to_id(result_ingredient)
@@ -172,7 +304,7 @@ def loot_table_from_ingredient(config: dict, result_ingredient: dict, result_cou
 		loot_table = f"{config['namespace']}:i/{item}"
 		if result_count > 1:
 			loot_table += f"_x{result_count}"
-		return loot_table
+		return loot_table, "", ""
 	
 	namespace, item = item.split(":")
 	loot_table = f"{config['namespace']}:recipes/{namespace}/{item}"
@@ -189,8 +321,7 @@ def loot_table_from_ingredient(config: dict, result_ingredient: dict, result_cou
 		file: dict = {"pools":[{"rolls":1,"entries":[{"type":"minecraft:item","name":f"{namespace}:{item}"}] }] }
 	if result_count > 1:
 		file["pools"][0]["entries"][0]["functions"] = [{"function": "minecraft:set_count","count": result_count}]
-	write_file(path, stp.super_json_dump(file, max_level = 9))
-	return loot_table
+	return loot_table, path, stp.super_json_dump(file, max_level = 9)
 
 @stp.simple_cache()
 def get_ingredients_from_recipe(recipe: dict) -> list[str]:
@@ -220,3 +351,41 @@ def get_ingredients_from_recipe(recipe: dict) -> list[str]:
 		ingredients.append(recipe["template"])
 	return ingredients
 
+
+# Reverse ingredient index
+CONSUMERS_INDEX: dict[str, Any] = {}
+""" The crafts consuming each ingredient of the last indexed database, with the hash of this database (see get_consumers_index()) """
+CONSUMERS_INDEX_LOCK: threading.Lock = threading.Lock()
+
+def craft_ingredients(craft: dict) -> list[dict]:
+	""" Get the ingredients of a craft (the "ingredient" of furnaces and pulverizers, the "ingredients" list or dict of crafting tables) """
+	ingredients: list[dict] = [craft["ingredient"]] if "ingredient" in craft else []
+	if isinstance(craft.get("ingredients"), dict):
+		ingredients += list(craft["ingredients"].values())
+	elif isinstance(craft.get("ingredients"), list):
+		ingredients += craft["ingredients"]
+	return ingredients
+
+def get_consumers_index(config: dict) -> dict[str, list[tuple[str, dict]]]:
+	""" Get the reverse ingredient index of the database: the crafts consuming each ingredient
+
+	The index is built in a single pass over the crafts of the database,
+	and kept until the database changes (ex: between the builds of the daemon if the database is the same).
+
+	Args:
+		config (dict): The config dict
+	Returns:
+		dict[str, list[tuple[str, dict]]]: For each ingredient id without namespace (ex: "adamantium_fragment"),
+			the crafts consuming it in database order, as (result item, craft) tuples
+	"""
+	database: dict[str, dict] = config['database']
+	database_hash: str = hashlib.sha1(repr(database).encode()).hexdigest()
+	with CONSUMERS_INDEX_LOCK:
+		if CONSUMERS_INDEX.get("hash") != database_hash:
+			index: dict[str, list[tuple[str, dict]]] = {}
+			for item, data in database.items():
+				for craft in data.get(RESULT_OF_CRAFTING) or []:
+					for ingredient_id in dict.fromkeys(ingr_to_id(x, False) for x in craft_ingredients(craft)):
+						index.setdefault(ingredient_id, []).append((item, craft))
+			CONSUMERS_INDEX.update(hash = database_hash, index = index)
+		return CONSUMERS_INDEX["index"]
@@ -23,6 +23,7 @@ def delete_file(file_path: str, clean_on_disk: bool = True) -> bool:
 	if file_path in FILES_TO_WRITE:
 		del FILES_TO_WRITE[file_path]
 		deleted = True
+	WRITTEN_FILES_HASHES.pop(file_path, None)
 	if is_in_initial_files(file_path):
 		remove_initial_file(file_path)
 
@@ -36,56 +37,81 @@ def delete_file(file_path: str, clean_on_disk: bool = True) -> bool:
 		stp.warning(f"Couldn't delete the file '{file_path}', it doesn't exists")
 	return deleted
 
-def delete_files(contains: str = "", clean_on_disk: bool = True) -> list[str]:
+def delete_files(contains: str = "", clean_on_disk: bool = True, prefix: str = "") -> list[str]:
 	""" Delete all the files that contains the given string
 
 	Args:
 		contains		(str):	The string that the path must contain
 		clean_on_disk	(bool):	If the files should be deleted on disk (default: True)
+		prefix			(str):	If set, the string that the path must start with (only this folder is walked on disk)
 	"""
 	contains = stp.clean_path(contains)
+	prefix = stp.clean_path(prefix)
 	deleted_files: list[str] = []
-	files_to_delete: list[str] = list(FILES_TO_WRITE.keys())
+	files_to_delete: list[str] = FILES_TO_WRITE.find(prefix = prefix, contains = contains)
+	build_folder: str = ""
+	if clean_on_disk and not prefix:
+		has_data: list[str] = FILES_TO_WRITE.find(contains = "datapack/data/")
+		if len(has_data) != 0:
+			build_folder = os.path.dirname(has_data[0].split("datapack/data/")[0])
 
 	# Delete all the files
-	for file_path in [x for x in files_to_delete if contains in x]:
+	for file_path in files_to_delete:
 		if delete_file(file_path, clean_on_disk):
 			deleted_files.append(file_path)
 
 	# If clean_on_disk is true, add the files present on disk to the list
 	if clean_on_disk:
 
-		# Get the build folder by searching the data folder
-		has_data: list[str] = [x for x in files_to_delete if "datapack/data/" in x]
-		if len(has_data) != 0:
-			build_folder: str = os.path.dirname(has_data[0].split("datapack/data/")[0])
+		# Walk the prefix folder, or the build folder found by searching the data folder
+		if prefix:
+			build_folder = prefix.rstrip("/") if os.path.isdir(prefix) else os.path.dirname(prefix)
+		if build_folder:
 
 			# Add all the files that contains the string to the list
 			files: list[str] = [stp.clean_path(f"{root}/{path}") for root, _, files in os.walk(build_folder) for path in files]
 			for file_path in files:
-				if contains in file_path:
+				if contains in file_path and file_path.startswith(prefix):
 					if os.path.isfile(file_path) and delete_file(file_path, clean_on_disk):
 						deleted_files.append(file_path)
 
 	return deleted_files
 
-def delete_old_files(contains: str = ""):
+def delete_old_files(contains: str = "", prefix: str = "", folders: list[str] | None = None):
 	""" Delete all the files that are not in the write queue and contains the given string
 
+	The folders left empty are deleted too, without going up above the prefix folder (if set) or the given build folders.
+
 	Args:
-		contains (str): If set, only delete the files that contains this string in their path
+		contains	(str):			If set, only delete the files that contains this string in their path
+		prefix		(str):			If set, only delete the files whose path starts with this string
+		folders		(list[str]):	The build folders, kept even if empty, ex: [config["build_datapack"], config["build_resource_pack"]]
 	"""
 	contains = stp.clean_path(contains)
+	prefix = stp.clean_path(prefix)
+	deleted_in: set[str] = set()
 	for file_path in INITIAL_FILES_SET:
-		if contains not in file_path:
+		if contains not in file_path or not file_path.startswith(prefix):
 			continue
 
 		# If the file is not in the write queue, delete it
 		if file_path not in FILES_TO_WRITE and os.path.exists(file_path):
 			os.remove(file_path)
-
-	# Delete empty folders
-	for root, _, _ in os.walk(".", topdown=False):
-		if not os.listdir(root):
-			os.rmdir(root)
-
+			deleted_in.add(os.path.dirname(file_path))
+
+	# Get the folders to stop at (the prefix folder, or the build folders)
+	roots: list[str]
+	if prefix:
+		roots = [prefix.rstrip("/") if os.path.isdir(prefix) else os.path.dirname(prefix)]
+	else:
+		roots = [stp.clean_path(folder).rstrip("/") for folder in (folders or [])]
+	def is_below_roots(folder: str) -> bool:
+		if not roots:
+			return folder not in ("", ".", "/")
+		return any(folder.startswith(f"{root}/") for root in roots)
+
+	# Delete the folders left empty, going up from the deepest ones along the deleted files paths
+	for folder in sorted(deleted_in, key=lambda x: x.count("/"), reverse=True):
+		while is_below_roots(folder) and os.path.isdir(folder) and not os.listdir(folder):
+			os.rmdir(folder)
+			folder = os.path.dirname(folder)
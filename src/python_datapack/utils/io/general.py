@@ -1,17 +1,333 @@
 
+import bisect
+import hashlib
+import json
 import os
 import shutil
-from typing import Literal
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Any, Literal
 
 import stouputils as stp
 
+
+# Write queue
+class JsonFileEntry:
+	""" JSON file in the write queue, kept as a live object so appending doesn't parse and dump the whole file each time.
+
+	Merging follows super_merge_dict() rules but is done in place, and lists keep track of
+	their already seen values so appending to big lists (ex: function tags) stays linear.
+	The string view is only computed when needed (cached until the next merge).
+	"""
+	__slots__ = ("data", "digest", "seen", "text")
+
+	def __init__(self, text: str = "") -> None:
+		self.data: dict | None = None
+		""" The parsed content, None until a merge happened """
+		self.seen: dict[int, tuple[list, set[str] | None]] = {}
+		""" For each merged list (by id), the list and the string representation of its values (None if it contains a dict) """
+		self.text: str | None = text
+		""" The string view of the content, None when it needs to be dumped again """
+		self.digest: tuple[str, int] | None = None
+		""" The content hash and size of the file as written (see content_digest()), None when it needs to be computed again """
+
+	def merge(self, content: str) -> None:
+		""" Merge the given JSON content into the entry
+
+		Args:
+			content (str): The JSON content to merge
+		"""
+		# If the entry is still empty, just keep the content as is
+		self.digest = None
+		if self.data is None and not self.text:
+			self.text = content
+			return
+
+		# Else, merge both dictionnaries
+		if self.data is None:
+			self.data = json.loads(self.text)	# type: ignore
+		self._merge_dict(self.data, json.loads(content))	# type: ignore
+		self.text = None
+
+	def _merge_dict(self, dict1: dict, dict2: dict) -> None:
+		for key, value in dict2.items():
+
+			# If both values are dict, merge recursively
+			if key in dict1 and isinstance(dict1[key], dict) and isinstance(value, dict):
+				self._merge_dict(dict1[key], value)
+
+			# Else if both values are lists, merge them (unique values if there is no dict in it)
+			elif key in dict1 and isinstance(dict1[key], list) and isinstance(value, list):
+				self._merge_list(dict1[key], value)
+
+			# Else, just overwrite or add value
+			else:
+				dict1[key] = value
+
+	def _merge_list(self, list1: list, list2: list) -> None:
+		state: tuple[list, set[str] | None] | None = self.seen.get(id(list1))
+		if state is not None and state[0] is not list1:
+			state = None
+
+		# If there is a dict in any of the lists, just append the new values
+		if (state is None and any(isinstance(x, dict) for x in list1)) \
+			or (state is not None and state[1] is None) \
+			or any(isinstance(x, dict) for x in list2):
+			list1.extend(list2)
+			self.seen[id(list1)] = (list1, None)
+			return
+
+		# Else, append only unique values (removing duplicates of the first list on the first merge)
+		if state is None:
+			list1[:] = stp.unique_list(list1)
+			state = (list1, {str(x) for x in list1})
+			self.seen[id(list1)] = state
+		seen: set[str] = state[1]	# type: ignore
+		for x in list2:
+			x_str: str = str(x)
+			if x_str not in seen:
+				seen.add(x_str)
+				list1.append(x)
+
+	def __str__(self) -> str:
+		if self.text is None:
+			sort_override_model(self.data)	# type: ignore
+			self.text = stp.super_json_dump(self.data)
+		return self.text
+
+class TextFileEntry:
+	""" Text file in the write queue (ex: mcfunction), stored as chunks for O(1) append and prepend.
+
+	The chunks are only joined when the string view is needed (cached until the next append/prepend).
+	"""
+	__slots__ = ("chunks", "digest", "text")
+
+	def __init__(self, text: str = "") -> None:
+		self.chunks: deque[str] = deque((text,)) if text else deque()
+		""" The chunks of the content, in order """
+		self.text: str | None = text
+		""" The string view of the content, None when the chunks need to be joined again """
+		self.digest: tuple[str, int] | None = None
+		""" The content hash and size of the file as written (see content_digest()), None when it needs to be computed again """
+
+	def append(self, content: str) -> None:
+		self.chunks.append(content)
+		self.text = None
+		self.digest = None
+
+	def prepend(self, content: str) -> None:
+		self.chunks.appendleft(content)
+		self.text = None
+		self.digest = None
+
+	def __str__(self) -> str:
+		if self.text is None:
+			self.text = "".join(self.chunks)
+			self.chunks = deque((self.text,))
+		return self.text
+
+class WriteQueue(dict[str, Any]):
+	""" Dictionnary of the files to write (dict[path, content])
+
+	Some entries are not stored as strings (ex: JSON files are kept as live objects),
+	but reading them using queue[path], get(), values() or items() always returns their string view.
+	Use get_entry() to get the stored entry itself.
+
+	Paths are indexed when added or removed, so find() can select files by prefix, suffix
+	or resource type without looking at every path of the queue.
+	The index is thread safe, so build stages running concurrently can write to the queue.
+	"""
+	def __init__(self) -> None:
+		super().__init__()
+		self._lock: threading.Lock = threading.Lock()
+		self.on_write: Callable[[str], None] | None = None
+		""" Function called with the path of every file written to the queue (ex: to check the outputs of the running build stages) """
+		self._reset_index()
+
+	def _reset_index(self) -> None:
+		self._ranks: dict[str, int] = {}
+		""" The insertion rank of each path, to return the results of find() in the queue order """
+		self._next_rank: int = 0
+		self._sorted: list[str] = []
+		""" The indexed paths, sorted (removed paths are kept and filtered out when queried) """
+		self._reversed: list[str] = []
+		""" The indexed paths reversed, sorted (for suffix queries) """
+		self._pending: list[str] = []
+		""" The paths added since the last query, merged into the sorted lists when needed """
+		self._indexed: set[str] = set()
+		""" The paths present in the sorted lists or pending """
+		self._resources: dict[str, dict[str, None]] = {}
+		""" The paths by resource type (ex: "function", "tags", "models"), dicts are used as ordered sets """
+
+	def _index(self, file_path: str) -> None:
+		""" Index a new path of the queue (the lock must be held) """
+		resource: tuple[str, str] | None = path_to_resource(file_path)
+		self._ranks[file_path] = self._next_rank
+		self._next_rank += 1
+		if file_path not in self._indexed:
+			self._indexed.add(file_path)
+			self._pending.append(file_path)
+		if resource is not None:
+			self._resources.setdefault(resource[1], {})[file_path] = None
+
+	def _unindex(self, file_path: str) -> None:
+		""" Remove a path from the index of the queue (the lock must be held) """
+		resource: tuple[str, str] | None = path_to_resource(file_path)
+		del self._ranks[file_path]
+		if resource is not None:
+			self._resources[resource[1]].pop(file_path, None)
+
+	def __setitem__(self, file_path: str, content: Any) -> None:
+		if self.on_write is not None:
+			self.on_write(file_path)
+		with self._lock:
+			if file_path not in self:
+				self._index(file_path)
+			super().__setitem__(file_path, content)
+
+	def __delitem__(self, file_path: str) -> None:
+		with self._lock:
+			super().__delitem__(file_path)
+			self._unindex(file_path)
+
+	def pop(self, file_path: str, *default: Any) -> Any:	# type: ignore
+		if file_path not in self:
+			if default:
+				return default[0]
+			raise KeyError(file_path)
+		content: str = self[file_path]
+		del self[file_path]
+		return content
+
+	def setdefault(self, file_path: str, default: Any = None) -> Any:	# type: ignore
+		if file_path not in self:
+			self[file_path] = default
+		return self[file_path]
+
+	def update(self, *args: Any, **kwargs: Any) -> None:	# type: ignore
+		for file_path, content in dict(*args, **kwargs).items():
+			self[file_path] = content
+
+	def clear(self) -> None:
+		super().clear()
+		self._reset_index()
+
+	def __getitem__(self, file_path: str) -> str:
+		return str(super().__getitem__(file_path))
+
+	def get(self, file_path: str, default: Any = None) -> Any:	# type: ignore
+		if file_path in self:
+			return self[file_path]
+		return default
+
+	def values(self) -> list[str]:	# type: ignore
+		return [str(content) for content in super().values()]
+
+	def items(self) -> list[tuple[str, str]]:	# type: ignore
+		return [(path, str(content)) for path, content in super().items()]
+
+	def get_entry(self, file_path: str) -> Any:
+		""" Get the stored entry of the file (can be a string, a JsonFileEntry or a TextFileEntry) """
+		return super().__getitem__(file_path)
+
+	def get_digest(self, file_path: str) -> tuple[str, int]:
+		""" Get the content hash and size of the file as it will be written (cached by the entry until it changes)
+
+		Args:
+			file_path (str): The path to the file
+		Returns:
+			tuple[str, int]: The content hash and the size in bytes
+		"""
+		entry: Any = super().__getitem__(file_path)
+		if isinstance(entry, str):
+			return content_digest(file_content(entry))
+		if entry.digest is None:
+			entry.digest = content_digest(file_content(str(entry)))
+		return entry.digest
+
+	def find(
+		self,
+		prefix: str = "",
+		suffix: str = "",
+		contains: str = "",
+		resource_type: str | tuple[str, ...] = "",
+		namespace: str = "",
+	) -> list[str]:
+		""" Get the paths of the files in the write queue matching all the given filters, in the queue order
+
+		Only the candidates given by the most selective index are looked at:
+		resource type (ordered sets), then prefix or suffix (bisect in sorted paths), then all the paths.
+
+		Args:
+			prefix			(str):					If set, the path must start with this string
+			suffix			(str):					If set, the path must end with this string
+			contains		(str):					If set, the path must contain this string
+			resource_type	(str|tuple[str, ...]):	If set, the resource type(s) of the file (ex: "function", ("tags", "advancement"), "models")
+			namespace		(str):					If set, the namespace of the file (ex: "minecraft")
+		Returns:
+			list[str]: The paths of the matching files
+		"""
+		candidates: list[str]
+		with self._lock:
+			if resource_type:
+				types: tuple[str, ...] = (resource_type,) if isinstance(resource_type, str) else resource_type
+				candidates = [path for type_ in types for path in self._resources.get(type_, ())]
+			elif prefix:
+				candidates = self._with_prefix(prefix)
+			elif suffix:
+				candidates = [path[::-1] for path in self._with_prefix(suffix[::-1], reverse = True)]
+			else:
+				candidates = list(self.keys())
+
+		# Apply the remaining filters
+		paths: list[str] = [
+			path for path in candidates
+			if path in self and path.startswith(prefix) and path.endswith(suffix) and contains in path
+			and (not namespace or (path_to_resource(path) or ("",))[0] == namespace)
+		]
+		if resource_type or prefix or suffix:
+			ranks: dict[str, int] = self._ranks
+			paths.sort(key = lambda path: ranks.get(path, -1))
+		return paths
+
+	def _with_prefix(self, prefix: str, reverse: bool = False) -> list[str]:
+		""" Get the indexed paths (or reversed paths) starting with the given prefix using a binary search (the lock must be held) """
+
+		# Merge the pending paths into the sorted lists (sorting is linear on two sorted runs)
+		if self._pending:
+			self._pending.sort()
+			self._sorted += self._pending
+			self._sorted.sort()
+			self._reversed += [path[::-1] for path in self._pending]
+			self._reversed.sort()
+			self._pending.clear()
+
+		# Get the paths starting with the prefix
+		sorted_paths: list[str] = self._reversed if reverse else self._sorted
+		paths: list[str] = []
+		for i in range(bisect.bisect_left(sorted_paths, prefix), len(sorted_paths)):
+			if not sorted_paths[i].startswith(prefix):
+				break
+			paths.append(sorted_paths[i])
+		return paths
+
+
 # Variable constants
-INITIAL_FILES: dict[str, str] = {}
-""" The files that have been present before running the program (dict[path, content]) """
+INITIAL_FILES: dict[str, str | None] = {}
+""" The files that have been present before running the program (dict[path, content hash or None if it must be read again]) """
 INITIAL_FILES_SET: set[str] = set()
 """ The files that have been present before running the program (set[path]) """
-FILES_TO_WRITE: dict[str, str] = {}
+FILES_TO_WRITE: WriteQueue = WriteQueue()
 """ The files that have been written to (dict[path, content]) """
+WRITTEN_FILES_HASHES: dict[str, str] = {}
+""" The content hash of the files flushed from the write queue during this build, saved in the build manifest (dict[path, hash]) """
+TEMP_FILE_PREFIX: str = ".pdp_tmp_"
+""" Prefix of the temporary files of write_all_files(), never archived (and deleted by the next build if a write failed) """
+NOT_TEXT_FILES: dict[str, tuple[int, int]] = {}
+""" The files of the build folders that can't be read as text, so they aren't initial files (dict[path, (size, modification time)]) """
+INITIAL_FILES_STATS: dict[str, tuple[int, int, str]] = {}
+""" The files of the build folders whose content hash is known, with the stat it was computed for (dict[path, (size, modification time, content hash)]) """
 DATAPACK_RESOURCE_TYPES: list[str] = [
 	"function",
 	"advancement",
@@ -39,29 +355,165 @@ DATAPACK_RESOURCE_TYPES: list[str] = [
 
 
 # Keeping track of the files that have been present before running the program
-def read_initial_files(folders: list[str]) -> None:
-	""" Read all the files in the given folders and store them in INITIAL_FILES
+def file_content(content: str) -> str:
+	""" Get the content as it is written in the file (always ending with two newlines)
 
 	Args:
-		folders (list[str]): The list of folders to read the files from
+		content (str): The content of the file in the write queue
+	Returns:
+		str: The content to write
+	"""
+	if not content.endswith("\n\n"):
+		content = content.rstrip("\n") + "\n\n"
+	return content
+
+def content_hash(content: str) -> str:
+	""" Get a cheap hash of the given content, used to compare files without keeping their content
+
+	Args:
+		content (str): The content to hash
+	Returns:
+		str: The hexadecimal hash of the content
+	"""
+	return content_digest(content)[0]
+
+def content_digest(content: str) -> tuple[str, int]:
+	""" Get a cheap hash of the given content along with its size in bytes
+
+	Args:
+		content (str): The content to hash
+	Returns:
+		tuple[str, int]: The hexadecimal hash of the content and its size in bytes
 	"""
+	encoded: bytes = content.encode()
+	return hashlib.blake2b(encoded, digest_size=16).hexdigest(), len(encoded)
+
+def read_initial_files(folders: list[str], manifest_path: str = "") -> None:
+	""" Get all the files in the given folders and store their content hash in INITIAL_FILES
+
+	Every file of the folders is listed, so the files that aren't written again are deleted (see delete_old_files()),
+	even if they haven't been written through the write queue (copied files, files added by hand, ...).
+	If the build manifest of the previous build exists, only the files that changed since (size or modification time)
+	or that it doesn't know are read. Else, every file is read to compute its hash.
+
+	Args:
+		folders			(list[str]):	The list of folders to read the files from
+		manifest_path	(str):			The path to the build manifest written by write_build_manifest()
+	"""
+	file_paths: list[str] = [
+		stp.clean_path(os.path.join(root, file))
+		for folder in folders
+		for root, _, files in os.walk(folder)
+		for file in files
+	]
+
+	# Use the build manifest if possible
+	to_read: list[str] = file_paths
+	if manifest_path and os.path.exists(manifest_path):
+		try:
+			with open(manifest_path, encoding="utf-8") as f:
+				manifest: dict[str, list] = json.load(f)["files"]
+			to_read = []
+			for path in file_paths:
+				if path not in manifest:
+					to_read.append(path)
+					continue
+				size, mtime_ns, hash = manifest[path]
+				try:
+					stat: os.stat_result = os.stat(path)
+				except OSError:
+					continue
+				if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+					to_read.append(path)
+				elif hash is None:
+					NOT_TEXT_FILES[path] = (size, mtime_ns)
+				else:
+					INITIAL_FILES[path] = hash
+					INITIAL_FILES_SET.add(path)
+					INITIAL_FILES_STATS[path] = (size, mtime_ns, hash)
+		except (ValueError, KeyError, TypeError) as e:
+			stp.warning(f"Invalid build manifest '{manifest_path}', reading every file of the build folder instead: {e}")
+			INITIAL_FILES.clear()
+			INITIAL_FILES_SET.clear()
+			INITIAL_FILES_STATS.clear()
+			NOT_TEXT_FILES.clear()
+			to_read = file_paths
+
 	def _read_file(path: str) -> None:
 		try:
 			if os.path.exists(path):
-				with open(path) as f:
-					INITIAL_FILES[path] = f.read()
-					INITIAL_FILES_SET.add(path)
+				stat: os.stat_result = os.stat(path)
+				with open(path, encoding="utf-8") as f:
+					hash: str = content_hash(f.read())
+				INITIAL_FILES[path] = hash
+				INITIAL_FILES_SET.add(path)
+				INITIAL_FILES_STATS[path] = (stat.st_size, stat.st_mtime_ns, hash)
 			else:
 				os.remove(path)
+		except UnicodeDecodeError:
+			stat = os.stat(path)
+			NOT_TEXT_FILES[path] = (stat.st_size, stat.st_mtime_ns)
 		except Exception:
 			pass
-	file_paths: list[str] = [
-		stp.clean_path(os.path.join(root, file))
-		for folder in folders
-		for root, _, files in os.walk(folder)
-		for file in files
-	]
-	stp.multithreading(_read_file, file_paths, max_workers=min(32, len(file_paths)))
+	if to_read:
+		stp.multithreading(_read_file, to_read, max_workers=min(32, len(to_read)))
+
+def is_initial_file_unchanged(file_path: str, hash: str) -> bool:
+	""" Check if the file was present before running the program with the same content
+
+	Args:
+		file_path	(str):	The path to the file
+		hash		(str):	The content hash to compare with (see content_hash())
+	Returns:
+		bool: If the file has the same content
+	"""
+	if file_path not in INITIAL_FILES_SET:
+		return False
+	initial_hash: str | None = INITIAL_FILES.get(file_path)
+
+	# If the file changed since the last build, read it again
+	if initial_hash is None:
+		try:
+			with open(file_path, encoding="utf-8") as f:
+				initial_hash = content_hash(f.read())
+		except Exception:
+			return False
+	return initial_hash == hash
+
+def write_build_manifest(manifest_path: str, folders: list[str]) -> None:
+	""" Write the build manifest (path -> size, modification time and content hash) of every file of the build folders
+
+	It is read by read_initial_files() on the next build to avoid reading every file of the build folders.
+	The hash of the files flushed from the write queue is already known, and the hash of the other files is reused
+	from read_initial_files() when their size and modification time didn't change since.
+	Files are only read when they changed (their hash is null if they can't be read as text).
+
+	Args:
+		manifest_path	(str):			The path to the build manifest
+		folders			(list[str]):	The build folders, ex: [config["build_datapack"], config["build_resource_pack"]]
+	"""
+	files: dict[str, list] = {}
+	for folder in folders:
+		for root, _, file_names in os.walk(folder):
+			for file in file_names:
+				path: str = stp.clean_path(os.path.join(root, file))
+				try:
+					stat: os.stat_result = os.stat(path)
+				except OSError:
+					continue
+				hash: str | None = WRITTEN_FILES_HASHES.get(path)
+				known: tuple[int, int, str] | None = INITIAL_FILES_STATS.get(path)
+				if hash is None and known is not None and known[:2] == (stat.st_size, stat.st_mtime_ns):
+					hash = known[2]
+				elif hash is None and NOT_TEXT_FILES.get(path) != (stat.st_size, stat.st_mtime_ns):
+					try:
+						with open(path, encoding="utf-8") as f:
+							hash = content_hash(f.read())
+					except (UnicodeDecodeError, OSError):
+						pass
+				files[path] = [stat.st_size, stat.st_mtime_ns, hash]
+	with stp.super_open(manifest_path, "w") as f:
+		stp.super_json_dump({"version": 1, "files": dict(sorted(files.items()))}, file = f, max_level = 2)
 
 @stp.handle_error(exceptions=KeyError)
 def remove_initial_file(file_path: str) -> None:
@@ -99,6 +551,9 @@ def super_copy(src: str, dst: str, symlink: bool = True) -> str:
 	if os.name == 'nt':
 		symlink = False
 
+	# Remove the trailing slash of a folder destination (a symlink can't be created at such a path)
+	dst = dst.rstrip("/")
+
 	# Make directory
 	os.makedirs(os.path.dirname(dst), exist_ok=True)
 
@@ -217,4 +672,21 @@ def path_to_file_path(config: dict, path: str, folder: Literal["function", "adva
 		extension = ".json"
 	return f"{config['build_datapack']}/data/{namespace}/{folder}/{path}{extension}"
 
+def path_to_resource(file_path: str) -> tuple[str, str] | None:
+	""" Get the namespace and resource type of a file in the build datapack or resource pack
+
+	Args:
+		file_path	(str): The path to the file (ex: "build/datapack/data/namespace/function/load.mcfunction")
+	Returns:
+		tuple[str, str] | None: The namespace and the resource type (ex: ("namespace", "function")), None if the file isn't in a pack
+	"""
+	file_path = "/" + file_path
+	for pack_folder in ("/datapack/data/", "/resource_pack/assets/"):
+		index: int = file_path.find(pack_folder)
+		if index != -1:
+			splitted: list[str] = file_path[index + len(pack_folder):].split("/", 2)
+			if len(splitted) == 3:
+				return splitted[0], splitted[1]
+	return None
+
 
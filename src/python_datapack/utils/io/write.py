@@ -1,6 +1,8 @@
 
 # Imports
-import json
+import os
+import tempfile
+from typing import Any
 
 import stouputils as stp
 
@@ -8,52 +10,100 @@ from .general import (
 	FILES_TO_WRITE,
 	INITIAL_FILES,
 	INITIAL_FILES_SET,
-	is_in_initial_files,
-	remove_initial_file,
-	sort_override_model,
-	super_merge_dict,
+	TEMP_FILE_PREFIX,
+	WRITTEN_FILES_HASHES,
+	JsonFileEntry,
+	TextFileEntry,
+	file_content,
+	is_initial_file_unchanged,
 )
+from ..profiling import PROFILER
+
+
+# Constants
+UMASK: int = os.umask(0o022)
+os.umask(UMASK)
+FILE_MODE: int = 0o666 & ~UMASK
+""" Permissions of the written files, as open() would give them (temporary files are created with 0o600) """
 
 
 # Functions
-def write_all_files(contains: str = "", verbose: int = 0):
+def remove_temp_file(temp_path: str) -> None:
+	""" Remove the temporary file of a failed write, if it is still there """
+	try:
+		os.remove(temp_path)
+	except OSError:
+		pass
+
+def write_all_files(contains: str = "", verbose: int = 0, prefix: str = "") -> tuple[int, int]:
 	""" Write all the files in the write queue to their respective files
 
-	If a file content didn't change, it won't be written
+	If a file content didn't change (same content hash), it won't be written.
+	Files are written to a temporary file (see TEMP_FILE_PREFIX) then renamed, so a reader never sees a half-written file.
 
 	Args:
 		contains (str): If set, only write the files that contains this string in their path
 		verbose (int): If set, turn verbose for multithreading
+		prefix (str): If set, only write the files whose path starts with this string (uses the write queue index)
+	Returns:
+		tuple[int, int]: The number of bytes written and the number of bytes skipped (unchanged files)
 	"""
 	contains = stp.clean_path(contains)
-
-	# Pre-process all contents to have two newlines at the end
-	processed_contents: dict[str, str] = {}
-	for path, content in FILES_TO_WRITE.items():
-		if contains not in path:
-			continue
-
-		if not content.endswith("\n\n"):
-			content = content.rstrip("\n") + "\n\n"
-		processed_contents[path] = content
-
-	# Filter out unchanged files
-	filtered_files: dict[str, str] = {
-		path: content for path, content in processed_contents.items()
-		if path not in INITIAL_FILES_SET or content != INITIAL_FILES[path]
-	}
+	prefix = stp.clean_path(prefix)
+
+	# Filter out unchanged files (compared by hash with the files present before running the program)
+	to_write: list[str] = []
+	files_skipped: int = 0
+	bytes_skipped: int = 0
+	for path in FILES_TO_WRITE.find(prefix = prefix, contains = contains):
+		hash, size = FILES_TO_WRITE.get_digest(path)
+		WRITTEN_FILES_HASHES[path] = hash
+		if is_initial_file_unchanged(path, hash):
+			files_skipped += 1
+			bytes_skipped += size
+		else:
+			to_write.append(path)
 
 	# Write all the files
-	def really_write(file_path: str, content: str):
-		with stp.super_open(file_path, "w") as f:
-			f.write(content)
-	stp.multithreading(
+	def really_write(file_path: str) -> int:
+		content: str = file_content(FILES_TO_WRITE[file_path])
+		if "/" in file_path:
+			os.makedirs(os.path.dirname(file_path), exist_ok=True)
+		fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=os.path.dirname(file_path) or ".")
+		try:
+			with open(fd, "w", encoding="utf-8") as f:
+				f.write(content)
+			os.chmod(temp_path, FILE_MODE)
+			os.replace(temp_path, file_path)
+
+		# If the file can't be replaced (ex: opened without share-delete on Windows), write it in place
+		except PermissionError:
+			remove_temp_file(temp_path)
+			with stp.super_open(file_path, "w") as f:
+				f.write(content)
+		except BaseException:
+			remove_temp_file(temp_path)
+			raise
+		return FILES_TO_WRITE.get_digest(file_path)[1]
+	written_sizes: list[int] = stp.multithreading(
 		really_write,
-		filtered_files.items(),
-		use_starmap=True,
+		to_write,
 		desc="Writing all files" if verbose > 0 else "",
-		max_workers=min(32, len(filtered_files))
+		max_workers=min(32, len(to_write))
 	)
+	bytes_written: int = sum(written_sizes)
+
+	# Written files are now the initial files (to skip them if flushed again)
+	for path in to_write:
+		INITIAL_FILES[path] = WRITTEN_FILES_HASHES[path]
+		INITIAL_FILES_SET.add(path)
+
+	PROFILER.count("files_written", len(to_write))
+	PROFILER.count("bytes_written", bytes_written)
+	PROFILER.cache("unchanged_files", hits = files_skipped, misses = len(to_write))
+	if verbose > 0:
+		stp.debug(f"Wrote {len(to_write)} files ({bytes_written} bytes), skipped {files_skipped} unchanged files ({bytes_skipped} bytes)")
+	return bytes_written, bytes_skipped
 
 def write_file(file_path: str, content: str, overwrite: bool = False, prepend: bool = False) -> None:
 	""" Write the content to the file at the given path.
@@ -75,25 +125,25 @@ def write_file(file_path: str, content: str, overwrite: bool = False, prepend: b
 		content = stp.super_json_dump(content)
 
 	# If file doesn't exists or overwrite is true, made it empty
-	if file_path not in FILES_TO_WRITE or overwrite:
-		if is_in_initial_files(file_path):
-			remove_initial_file(file_path)
-		FILES_TO_WRITE[file_path] = ""
-
-	# If the file already exists as JSON and the content is a dict, merge both dict
-	if not overwrite and file_path in FILES_TO_WRITE and file_path.endswith((".json",".mcmeta")) and FILES_TO_WRITE[file_path] != "":
-		dict_content = json.loads(content)
-		old_content = json.loads(FILES_TO_WRITE[file_path])
-		merged = super_merge_dict(old_content, dict_content)
-		sort_override_model(merged)
-		FILES_TO_WRITE[file_path] = stp.super_json_dump(merged)
-		return
-
-	# Add the content to the file
-	if prepend:
-		FILES_TO_WRITE[file_path] = str(content) + FILES_TO_WRITE[file_path]
+	entry: Any = "" if file_path not in FILES_TO_WRITE or overwrite else FILES_TO_WRITE.get_entry(file_path)
+
+	# If the file is a JSON file, merge the content into the live object (dumped only when needed)
+	if file_path.endswith((".json",".mcmeta")):
+		if not isinstance(entry, JsonFileEntry):
+			entry = JsonFileEntry(str(entry))
+		entry.merge(str(content))
+
+	# Else, add the content to the file (joined only when needed)
 	else:
-		FILES_TO_WRITE[file_path] += str(content)
+		if not isinstance(entry, TextFileEntry):
+			entry = TextFileEntry(str(entry))
+		if prepend:
+			entry.prepend(str(content))
+		else:
+			entry.append(str(content))
+
+	# Always store the entry, so every write goes through the queue (and its on_write check)
+	FILES_TO_WRITE[file_path] = entry
 
 def write_versioned_function(config: dict, relative_path: str, content: str, overwrite: bool = False, prepend: bool = False) -> None:
 	""" Write the content to the versioned function at the given path\n
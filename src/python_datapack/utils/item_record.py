@@ -0,0 +1,126 @@
+
+# Imports
+from collections.abc import Iterator, Mapping, MutableMapping
+from typing import Any
+
+from ..constants import CATEGORY, RESULT_OF_CRAFTING
+
+# Constants
+RECORD_SLOTS: dict[str, str] = {
+	"id": "id", "item_name": "item_name", "lore": "lore", "item_model": "item_model",
+	CATEGORY: "category", "custom_data": "custom_data", RESULT_OF_CRAFTING: "recipes",
+}
+""" The common keys of the items stored in the slots of an ItemRecord, with the name of their slot """
+KEYS_ORDERS: dict[tuple[str, ...], tuple[str, ...]] = {}
+""" Interned keys orders of the records, as most items share the same keys in the same order """
+
+
+# Item records
+class ItemRecord(MutableMapping):
+	""" Compact item of the database, storing the common keys (see RECORD_SLOTS) in slots and the other ones in a spill dict
+
+	It behaves like the dict it replaces for any code reading or modifying it (same keys order, copy() returns a dict),
+	but a record without any other key takes a fraction of the memory of a dict (see scripts/benchmarks/item_records.py).
+	The slots should only be modified through the mapping interface (ex: record["id"] = ...), that keeps the keys order.
+	"""
+	__slots__ = ("id", "item_name", "lore", "item_model", "category", "custom_data", "recipes", "spill", "keys_order")
+
+	def __init__(self, data: Mapping[str, Any] | None = None) -> None:
+		self.spill: dict[str, Any] | None = None
+		self.keys_order: tuple[str, ...] = ()
+		for key, value in (data or {}).items():
+			self[key] = value
+
+	def __getitem__(self, key: str) -> Any:
+		slot: str | None = RECORD_SLOTS.get(key)
+		if slot is not None:
+			try:
+				return getattr(self, slot)
+			except AttributeError:
+				raise KeyError(key) from None
+		if self.spill is None:
+			raise KeyError(key)
+		return self.spill[key]
+
+	def __setitem__(self, key: str, value: Any) -> None:
+		if key not in self.keys_order:
+			self.keys_order = intern_keys((*self.keys_order, key))
+		slot: str | None = RECORD_SLOTS.get(key)
+		if slot is not None:
+			setattr(self, slot, value)
+		else:
+			if self.spill is None:
+				self.spill = {}
+			self.spill[key] = value
+
+	def __delitem__(self, key: str) -> None:
+		if key not in self.keys_order:
+			raise KeyError(key)
+		self.keys_order = intern_keys(tuple(k for k in self.keys_order if k != key))
+		slot: str | None = RECORD_SLOTS.get(key)
+		if slot is not None:
+			delattr(self, slot)
+		elif self.spill is not None:
+			del self.spill[key]
+			if not self.spill:
+				self.spill = None
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.keys_order)
+
+	def __len__(self) -> int:
+		return len(self.keys_order)
+
+	def __contains__(self, key: object) -> bool:
+		return key in self.keys_order
+
+	def get(self, key: str, default: Any = None) -> Any:
+		slot: str | None = RECORD_SLOTS.get(key)
+		if slot is not None:
+			return getattr(self, slot, default)
+		return default if self.spill is None else self.spill.get(key, default)
+
+	def copy(self) -> dict[str, Any]:
+		""" Get a modifiable shallow copy of the record as a dict (like dict.copy()) """
+		return {key: self[key] for key in self.keys_order}
+
+	def __copy__(self) -> "ItemRecord":
+		return ItemRecord(self)
+
+	def __repr__(self) -> str:
+		return f"ItemRecord({self.copy()!r})"
+
+def intern_keys(keys: tuple[str, ...]) -> tuple[str, ...]:
+	""" Get the interned version of a keys order, shared by every record having the same keys in the same order """
+	return KEYS_ORDERS.setdefault(keys, keys)
+
+def compact_database(database: dict[str, Any]) -> dict[str, Any]:
+	""" Replace the items of the database by item records, in place (enabled by the "compact_database" key of the configuration)
+
+	Args:
+		database (dict[str, Any]): The database, ex: config["database"]
+	Returns:
+		dict[str, Any]: The same database, with ItemRecord items
+	"""
+	for item, data in database.items():
+		if isinstance(data, dict):
+			database[item] = ItemRecord(data)
+	return database
+
+def as_dicts(database: Mapping[str, Mapping[str, Any]], exclude: tuple[str, ...] = ()) -> dict[str, dict]:
+	""" Get the database with plain dict items (ex: for JSON dumps), only copying the records and the items having an excluded key
+
+	Args:
+		database	(Mapping):			The database, ex: config["database"]
+		exclude		(tuple[str, ...]):	The keys to remove from the items, ex: ("override_model",)
+	Returns:
+		dict[str, dict]: The database with plain dict items, sharing the items that didn't need a copy
+	"""
+	database_dicts: dict[str, dict] = {}
+	for item, data in database.items():
+		if isinstance(data, dict) and not any(key in data for key in exclude):
+			database_dicts[item] = data
+		else:
+			database_dicts[item] = {k: v for k, v in data.items() if k not in exclude}
+	return database_dicts
+
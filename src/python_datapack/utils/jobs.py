@@ -0,0 +1,139 @@
+
+# Imports
+import multiprocessing
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Literal
+
+import stouputils as stp
+
+
+# Job graph
+class Job:
+	""" A job of a job graph: a function to call once all the jobs it depends on are done """
+	def __init__(self, name: str, function: Callable[..., Any], *args: Any, dependencies: list[str] | None = None, **kwargs: Any) -> None:
+		self.name: str = name
+		""" Unique name of the job, used for dependencies and in the report """
+		self.function: Callable[..., Any] = function
+		""" Function to call (must be picklable, ex: a module level function, when running with processes) """
+		self.args: tuple[Any, ...] = args
+		self.kwargs: dict[str, Any] = kwargs
+		self.dependencies: list[str] = dependencies or []
+		""" Names of the jobs that must be done before this one """
+		self.start: float = 0.0
+		self.end: float = 0.0
+
+	@property
+	def duration(self) -> float:
+		""" Wall time of the job in seconds """
+		return self.end - self.start
+
+def timed_call(function: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> tuple[Any, float, float]:
+	""" Call the function and return its result with the start and end times (time.time() as it is shared between processes) """
+	start: float = time.time()
+	result: Any = function(*args, **kwargs)
+	return result, start, time.time()
+
+FORKED_JOBS: dict[str, Job] = {}
+""" The jobs of the current graph, inherited by the forked workers so the jobs arguments don't have to be pickled """
+
+def run_forked_job(name: str) -> tuple[Any, float, float]:
+	""" Run a job inherited from the parent process (see FORKED_JOBS) """
+	job: Job = FORKED_JOBS[name]
+	return timed_call(job.function, job.args, job.kwargs)
+
+def run_jobs(jobs: list[Job], mode: Literal["threads", "processes", "sequential"] = "threads", verbose: bool = True) -> dict[str, Any]:
+	""" Run a graph of jobs, each job starting as soon as all its dependencies are done
+
+	In "processes" mode, the workers are forked so they share the state of the build (write queue, used libraries, ...)
+	and the jobs arguments aren't pickled, but what the jobs change in memory is lost (only their results come back).
+	If fork isn't available (ex: on Windows), threads are used instead.
+
+	Args:
+		jobs	(list[Job]):	The jobs to run
+		mode	(str):			"threads", "processes" or "sequential"
+		verbose	(bool):			If True, show the wall time of each job and the critical path
+	Returns:
+		dict[str, Any]: The result of each job (by name)
+	"""
+	if not jobs:
+		return {}
+	by_name: dict[str, Job] = {job.name: job for job in jobs}
+	for job in jobs:
+		for dependency in job.dependencies:
+			if dependency not in by_name:
+				stp.error(f"Job '{job.name}' depends on unknown job '{dependency}'")
+	if mode == "processes" and "fork" not in multiprocessing.get_all_start_methods():
+		stp.warning("Running jobs with processes requires fork, using threads instead")
+		mode = "threads"
+
+	# Run the jobs
+	results: dict[str, Any] = {}
+	remaining: list[Job] = list(jobs)
+	if mode == "sequential":
+		while remaining:
+			ready: list[Job] = [job for job in remaining if all(x in results for x in job.dependencies)]
+			if not ready:
+				stp.error(f"Circular dependencies between jobs: {', '.join(job.name for job in remaining)}")
+			for job in ready:
+				results[job.name], job.start, job.end = timed_call(job.function, job.args, job.kwargs)
+				remaining.remove(job)
+	else:
+		executor: Executor
+		if mode == "processes":
+			FORKED_JOBS.clear()
+			FORKED_JOBS.update(by_name)
+			executor = ProcessPoolExecutor(max_workers = len(jobs), mp_context = multiprocessing.get_context("fork"))
+		else:
+			executor = ThreadPoolExecutor(max_workers = len(jobs))
+		with executor:
+			running: dict[Future, Job] = {}
+			while remaining or running:
+
+				# Submit the jobs whose dependencies are done
+				for job in [job for job in remaining if all(x in results for x in job.dependencies)]:
+					if mode == "processes":
+						running[executor.submit(run_forked_job, job.name)] = job
+					else:
+						running[executor.submit(timed_call, job.function, job.args, job.kwargs)] = job
+					remaining.remove(job)
+				if not running:
+					stp.error(f"Circular dependencies between jobs: {', '.join(job.name for job in remaining)}")
+
+				# Wait for at least one job to finish
+				done, _ = wait(running, return_when = FIRST_COMPLETED)
+				for future in done:
+					job = running.pop(future)
+					results[job.name], job.start, job.end = future.result()
+
+	if verbose:
+		for line in jobs_report(jobs).split("\n"):
+			stp.debug(line)
+	return results
+
+def critical_path(jobs: list[Job]) -> list[Job]:
+	""" Get the chain of jobs that determined the total time (each job waiting for the dependency that finished last)
+
+	Args:
+		jobs (list[Job]): The jobs that have been run
+	Returns:
+		list[Job]: The jobs of the critical path, in execution order
+	"""
+	by_name: dict[str, Job] = {job.name: job for job in jobs}
+	path: list[Job] = [max(jobs, key = lambda job: job.end)]
+	while path[-1].dependencies:
+		path.append(max((by_name[x] for x in path[-1].dependencies), key = lambda job: job.end))
+	return path[::-1]
+
+def jobs_report(jobs: list[Job]) -> str:
+	""" Get a report of the wall time of each job and the critical path """
+	first_start: float = min(job.start for job in jobs)
+	lines: list[str] = [
+		f"Job '{job.name}' took {job.duration:.5f}s (started at +{job.start - first_start:.5f}s)"
+		for job in sorted(jobs, key = lambda job: job.start)
+	]
+	path: list[Job] = critical_path(jobs)
+	lines.append(f"Critical path: {' -> '.join(job.name for job in path)} ({path[-1].end - first_start:.5f}s)")
+	return "\n".join(lines)
+
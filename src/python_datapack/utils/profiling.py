@@ -0,0 +1,215 @@
+
+# Imports
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
+from typing import Any
+
+import stouputils as stp
+
+try:
+	import resource
+except ImportError:
+	resource = None	# Not available on Windows, peak RSS won't be reported
+
+
+# Profiling
+def peak_rss() -> int:
+	""" Get the peak resident set size of the process in bytes (0 if not available) """
+	if resource is None:
+		return 0
+	peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == "darwin" else peak * 1024	# Bytes on macOS, kilobytes on Linux
+
+class Span:
+	""" A profiled section of the build (a stage or a sub-step) """
+	__slots__ = ("category", "counters", "cpu", "end", "name", "parent", "peak_rss", "start", "thread")
+
+	def __init__(self, name: str, category: str, parent: "Span | None") -> None:
+		self.name: str = name
+		self.category: str = category
+		self.parent: Span | None = parent
+		self.thread: int = threading.get_ident()
+		self.start: float = time.perf_counter()
+		self.end: float = 0.0
+		self.cpu: float = time.thread_time()
+		""" CPU time of the thread, at the start then spent during the span """
+		self.peak_rss: int = 0
+		""" Peak RSS of the process at the end of the span, in bytes """
+		self.counters: dict[str, float] = {}
+		""" Counters incremented while the span was active on its thread (ex: "files_written", "cache_hits:iso_renders") """
+
+class Profiler:
+	""" Collect the wall time, CPU time, peak RSS and counters (files/bytes written, cache hits and misses) of the build sections
+
+	Sections are profiled using profile() as a context manager or a decorator, and can be nested.
+	Counters incremented with count() are added to the sections active on the current thread and to the totals.
+	"""
+	def __init__(self) -> None:
+		self._lock: threading.Lock = threading.Lock()
+		self._local: threading.local = threading.local()
+		self.reset()
+
+	def reset(self) -> None:
+		""" Forget everything collected, ex: before a new build """
+		with self._lock:
+			self.origin: float = time.perf_counter()
+			self.spans: list[Span] = []
+			self.totals: dict[str, float] = {}
+
+	def _stack(self) -> list[Span]:
+		if not hasattr(self._local, "stack"):
+			self._local.stack = []
+		return self._local.stack
+
+	def start(self, name: str, category: str = "") -> Span:
+		""" Start a section on the current thread (use profile() instead) """
+		stack: list[Span] = self._stack()
+		span: Span = Span(name, category, stack[-1] if stack else None)
+		stack.append(span)
+		return span
+
+	def stop(self, span: Span) -> None:
+		""" Stop a section started on the current thread (use profile() instead) """
+		span.end = time.perf_counter()
+		span.cpu = time.thread_time() - span.cpu
+		span.peak_rss = peak_rss()
+		stack: list[Span] = self._stack()
+		if span in stack:
+			stack.remove(span)
+		with self._lock:
+			self.spans.append(span)
+
+	def count(self, name: str, value: float = 1) -> None:
+		""" Increment a counter for the sections active on the current thread and for the totals
+
+		Args:
+			name	(str):		Name of the counter (ex: "files_written", "bytes_written", "cache_hits:iso_renders")
+			value	(float):	Value to add
+		"""
+		for span in self._stack():
+			span.counters[name] = span.counters.get(name, 0) + value
+		with self._lock:
+			self.totals[name] = self.totals.get(name, 0) + value
+
+	def cache(self, name: str, hits: int = 0, misses: int = 0) -> None:
+		""" Record the hits and misses of a cache (ex: "iso_renders", "manual_pages", "archive_entries") """
+		if hits:
+			self.count(f"cache_hits:{name}", hits)
+		if misses:
+			self.count(f"cache_misses:{name}", misses)
+
+	def report(self) -> dict[str, Any]:
+		""" Get the machine-readable report of the collected sections, totals and cache hit rates """
+		with self._lock:
+			spans: list[Span] = sorted(self.spans, key = lambda span: span.start)
+			totals: dict[str, float] = dict(self.totals)
+
+		# Aggregate the sections by name (ex: the many encode_page calls)
+		by_name: dict[str, dict[str, float]] = {}
+		for span in spans:
+			stats: dict[str, float] = by_name.setdefault(span.name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+			stats["calls"] += 1
+			stats["wall"] += span.end - span.start
+			stats["cpu"] += span.cpu
+
+		# Cache hit rates
+		caches: dict[str, dict[str, float]] = {}
+		for counter, value in totals.items():
+			if counter.startswith(("cache_hits:", "cache_misses:")):
+				kind, name = counter.split(":", 1)
+				caches.setdefault(name, {"hits": 0, "misses": 0})[kind.removeprefix("cache_")] = value
+		for stats in caches.values():
+			stats["hit_rate"] = stats["hits"] / (stats["hits"] + stats["misses"]) if stats["hits"] + stats["misses"] else 0.0
+
+		return {
+			"python_version": sys.version.split()[0],
+			"total_time": max((span.end for span in spans), default = self.origin) - self.origin,
+			"peak_rss": peak_rss(),
+			"totals": totals,
+			"caches": caches,
+			"by_name": by_name,
+			"spans": [
+				{
+					"name": span.name,
+					"category": span.category,
+					"parent": span.parent.name if span.parent else None,
+					"thread": span.thread,
+					"start": span.start - self.origin,
+					"wall": span.end - span.start,
+					"cpu": span.cpu,
+					"peak_rss": span.peak_rss,
+					"counters": span.counters,
+				}
+				for span in spans
+			],
+		}
+
+	def chrome_trace(self) -> dict[str, Any]:
+		""" Get the sections as a Chrome trace (also readable by speedscope and Perfetto) """
+		with self._lock:
+			spans: list[Span] = list(self.spans)
+		pid: int = os.getpid()
+		return {
+			"displayTimeUnit": "ms",
+			"traceEvents": [
+				{
+					"name": span.name,
+					"cat": span.category or "build",
+					"ph": "X",
+					"ts": (span.start - self.origin) * 1e6,
+					"dur": (span.end - span.start) * 1e6,
+					"pid": pid,
+					"tid": span.thread,
+					"args": {"cpu": span.cpu, "peak_rss": span.peak_rss, **span.counters},
+				}
+				for span in sorted(spans, key = lambda span: span.start)
+			],
+		}
+
+	def save(self, report_path: str, trace_path: str = "") -> None:
+		""" Save the JSON report, and the Chrome trace if a path is given
+
+		Args:
+			report_path	(str):	Path of the JSON report (ex: "build/build_profile.json")
+			trace_path	(str):	Path of the Chrome trace (ex: "build/build_trace.json"), not saved if empty
+		"""
+		with stp.super_open(report_path, "w") as f:
+			json.dump(self.report(), f, indent = "\t")
+		if trace_path:
+			with stp.super_open(trace_path, "w") as f:
+				json.dump(self.chrome_trace(), f)
+
+PROFILER: Profiler = Profiler()
+""" The profiler of the build, see profile() """
+
+class profile(ContextDecorator):
+	""" Profile a section of the build, as a context manager or a decorator
+
+	Examples:
+		>>> with profile("headers"):
+		...     pass
+
+		>>> @profile("weld_datapack", "weld")
+		... def weld_datapack(config): ...
+	"""
+	def __init__(self, name: str, category: str = "") -> None:
+		self.name: str = name
+		self.category: str = category
+		self.span: Span | None = None
+
+	def _recreate_cm(self) -> "profile":
+		# A new instance for each call of the decorated function (thread safe and reentrant)
+		return profile(self.name, self.category)
+
+	def __enter__(self) -> "profile":
+		self.span = PROFILER.start(self.name, self.category)
+		return self
+
+	def __exit__(self, *args: Any) -> None:
+		if self.span is not None:
+			PROFILER.stop(self.span)
+
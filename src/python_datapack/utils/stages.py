@@ -0,0 +1,290 @@
+
+# Imports
+import hashlib
+import importlib
+import os
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Literal
+
+import stouputils as stp
+
+from .io import FILES_TO_WRITE
+from .jobs import Job, run_jobs
+from .profiling import profile
+
+
+# Build stages
+class Stage:
+	""" A stage of the build process, declaring what it reads and writes so independent stages can run concurrently
+
+	Inputs and outputs are either shared states of the build (ex: "database", "official_libs"),
+	or path prefixes in the write queue formatted with the configuration (ex: "{build_datapack}/data/{namespace}/loot_table/").
+	"""
+	def __init__(
+		self,
+		name: str,
+		function: Callable[[dict], Any],
+		inputs: list[str] | None = None,
+		outputs: list[str] | None = None,
+		condition: Callable[[dict], Any] | None = None,
+	) -> None:
+		self.name: str = name
+		""" Unique name of the stage, used in the reports """
+		self.function: Callable[[dict], Any] = function
+		""" Function of the stage, called with the configuration """
+		self.inputs: list[str] = inputs or []
+		""" Shared states and path prefixes read by the stage """
+		self.outputs: list[str] = outputs or []
+		""" Shared states and path prefixes written by the stage """
+		self.condition: Callable[[dict], Any] | None = condition
+		""" If set, the stage only runs if the condition is true for the configuration """
+
+	def resolve(self, config: dict) -> "Stage":
+		""" Get a copy of the stage with its path prefixes formatted with the configuration """
+		return Stage(
+			self.name,
+			self.function,
+			[format_path(x, config) if is_path(x) else x for x in self.inputs],
+			[format_path(x, config) if is_path(x) else x for x in self.outputs],
+			self.condition,
+		)
+
+def lazy(module: str, name: str = "main") -> Callable[..., Any]:
+	""" Get a function importing its module on the first call, so the heavy dependencies of a stage (ex: PIL, beet, model_resolver)
+	are only imported when the stage runs, not when importing python_datapack
+
+	Args:
+		module	(str):	Module of the function, relative to python_datapack (ex: ".manual.main")
+		name	(str):	Name of the function in the module
+	Returns:
+		Callable: The function, calling the imported one
+	"""
+	def function(*args: Any, **kwargs: Any) -> Any:
+		return getattr(importlib.import_module(module, "python_datapack"), name)(*args, **kwargs)
+	function.__name__ = name
+	function.__qualname__ = f"{module.lstrip('.')}.{name}"
+	return function
+
+def is_path(resource: str) -> bool:
+	""" Check if a resource of a stage is a path prefix (else it's a shared state) """
+	return "/" in resource
+
+def format_path(resource: str, config: dict) -> str:
+	""" Format a path prefix with the configuration (left as is if a key is missing, so it never matches a real path) """
+	try:
+		return resource.format(**config)
+	except KeyError:
+		return resource
+
+def overlaps(resources_1: list[str], resources_2: list[str]) -> bool:
+	""" Check if two lists of resources overlap (same shared state, or a path prefix containing the other) """
+	for x in resources_1:
+		for y in resources_2:
+			if x == y or (is_path(x) and is_path(y) and (x.startswith(y) or y.startswith(x))):
+				return True
+	return False
+
+def stage_dependencies(stages: list[Stage]) -> dict[str, list[str]]:
+	""" Get the previous stages each stage must wait for, so running them concurrently gives the same result as running them in order:
+	the ones writing what it reads, reading what it writes, or writing the same things.
+
+	Args:
+		stages (list[Stage]): The stages, in the order they would run sequentially
+	Returns:
+		dict[str, list[str]]: The names of the stages each stage depends on
+	"""
+	return {
+		stage.name: [
+			previous.name for previous in stages[:i]
+			if overlaps(previous.outputs, stage.inputs) or overlaps(previous.inputs, stage.outputs) or overlaps(previous.outputs, stage.outputs)
+		]
+		for i, stage in enumerate(stages)
+	}
+
+class WriteTracker:
+	""" Check the files written to the queue while stages are running (see WriteQueue.on_write)
+
+	A file written by a stage outside of its own outputs is a write conflict:
+	the stage wrote it without declaring it, so a concurrent stage could write the same file at the same time.
+	The stage of each write is the one running on the writing thread, writes from other threads (ex: a thread pool of a stage)
+	are checked against the outputs of every running stage.
+	"""
+	def __init__(self) -> None:
+		self.running: dict[str, tuple[str, ...]] = {}
+		""" The path outputs of each running stage """
+		self.state: tuple[tuple[str, ...], tuple[str, ...]] = ((), ())
+		""" The path outputs and the names of the running stages, replaced as a whole so writes can read it without locking """
+		self.conflicts: dict[tuple[str, ...], list[str]] = {}
+		""" The files written outside of the declared outputs, by running stages names """
+		self.current: threading.local = threading.local()
+		""" The path outputs and the name of the stage running on each thread (current.stage), in the same format as state """
+		self._lock: threading.Lock = threading.Lock()
+
+	def start(self, stage: Stage) -> None:
+		outputs: tuple[str, ...] = tuple(x for x in stage.outputs if is_path(x))
+		self.current.stage = (outputs, (stage.name,))
+		with self._lock:
+			self.running[stage.name] = outputs
+			self.state = (tuple(x for outputs in self.running.values() for x in outputs), tuple(self.running))
+
+	def stop(self, stage: Stage) -> None:
+		self.current.stage = None
+		with self._lock:
+			del self.running[stage.name]
+			self.state = (tuple(x for outputs in self.running.values() for x in outputs), tuple(self.running))
+
+	def __call__(self, file_path: str) -> None:
+		prefixes, names = getattr(self.current, "stage", None) or self.state
+		if not file_path.startswith(prefixes):
+			with self._lock:
+				paths: list[str] = self.conflicts.setdefault(tuple(sorted(names)), [])
+				if file_path not in paths:
+					paths.append(file_path)
+
+STAGES_CACHE: dict[str, Any] = {}
+""" The states hashes and the write queue outputs of the stages of the previous build, kept in memory by the build daemon to skip untouched stages """
+CANCEL_EVENT: threading.Event = threading.Event()
+""" Set to cancel the running build before its next stage (ex: by the watcher when files change during a build of the daemon) """
+
+class BuildCancelled(Exception):
+	""" Raised when a stage is about to start while CANCEL_EVENT is set """
+
+def absolute(resource: str) -> str:
+	""" Get the absolute path of a path prefix (keeping the trailing slash), to compare it with changed files """
+	if not is_path(resource):
+		return resource
+	return stp.clean_path(os.path.abspath(resource)) + ("/" if resource.endswith("/") else "")
+
+def state_hashes(config: dict) -> dict[str, str]:
+	""" Get the hashes of the configuration and the databases, that stages read without declaring precisely which parts """
+	def sha1(value: Any) -> str:
+		return hashlib.sha1(repr(value).encode()).hexdigest()
+	return {
+		"config": sha1({k: v for k, v in config.items() if k not in ("database", "external_database")}),
+		"database": sha1(config.get("database")),
+		"external_database": sha1(config.get("external_database")),
+	}
+
+def select_stages(stages: list[Stage], states: dict[str, str], changed: list[str]) -> tuple[list[Stage], list[Stage]]:
+	""" Select the stages to run again after some source files changed, the other ones are restored from the previous build (see STAGES_CACHE)
+
+	A stage runs again if one of its inputs was touched (changed files or databases, or outputs of a stage touched in turn),
+	if it changes a shared state (only kept in memory, so it must be produced again),
+	or if it writes files also written by a stage running again.
+	Everything runs again if the configuration changed.
+
+	Args:
+		stages	(list[Stage]):		The resolved stages, in the order they would run sequentially
+		states	(dict[str, str]):	The hashes of the configuration and the databases before running the stages (see state_hashes())
+		changed	(list[str]):		The paths of the source files that changed since the previous build
+	Returns:
+		tuple[list[Stage], list[Stage]]: The stages to run and the stages to restore
+	"""
+	previous: dict[str, str] | None = STAGES_CACHE.get("states")
+	outputs: dict[str, dict[str, str]] = STAGES_CACHE.get("outputs", {})
+	if previous is None or previous["config"] != states["config"]:
+		return stages, []
+
+	# Stages whose inputs were touched (their outputs are touched in turn), or that change a shared state
+	touched: list[str] = [absolute(path) for path in changed] + [x for x in ("database", "external_database") if previous[x] != states[x]]
+	to_run: set[str] = set()
+	for stage in stages:
+		if overlaps([absolute(x) for x in stage.inputs], touched):
+			to_run.add(stage.name)
+			touched += [absolute(x) for x in stage.outputs]
+		elif stage.name not in outputs or not all(is_path(x) for x in stage.outputs):
+			to_run.add(stage.name)
+
+	# Stages writing the same files as a stage running again
+	while True:
+		running: list[Stage] = [stage for stage in stages if stage.name in to_run]
+		added: set[str] = {
+			stage.name for stage in stages
+			if stage.name not in to_run and any(overlaps(stage.outputs, other.outputs) for other in running)
+		}
+		if not added:
+			break
+		to_run |= added
+	return [stage for stage in stages if stage.name in to_run], [stage for stage in stages if stage.name not in to_run]
+
+def run_stage(stage: Stage, config: dict, tracker: WriteTracker) -> Any:
+	""" Run a stage, tracking the files it writes """
+	if CANCEL_EVENT.is_set():
+		raise BuildCancelled(f"Build cancelled before the '{stage.name}' stage")
+	tracker.start(stage)
+	try:
+		with profile(stage.name, "stage"):
+			return stage.function(config)
+	finally:
+		tracker.stop(stage)
+
+def run_stages(
+	stages: list[Stage],
+	config: dict,
+	mode: Literal["threads", "sequential"] = "threads",
+	changed: list[str] | None = None,
+) -> dict[str, Any]:
+	""" Run the stages of the build process, each stage starting as soon as the stages it depends on are done (see stage_dependencies())
+
+	Stages share the configuration and the write queue, so they run on threads of the main process.
+	Files written outside of the declared outputs of the running stages are reported as write conflicts.
+
+	Args:
+		stages	(list[Stage]):		The stages, in the order they would run sequentially
+		config	(dict):				The configuration, given to each stage
+		mode	(str):				"threads" to run independent stages concurrently, or "sequential"
+		changed	(list[str]|None):	The source files changed since the previous build of this process (build daemon),
+			to only run the stages they touch and restore the others (see select_stages()), None to run every stage
+	Returns:
+		dict[str, Any]: The result of each stage (by name)
+	"""
+	if mode not in ("threads", "sequential"):
+		stp.warning(f"Invalid stages mode '{mode}', expected \"threads\" or \"sequential\", using threads instead")
+		mode = "threads"
+	stages = [stage.resolve(config) for stage in stages if stage.condition is None or stage.condition(config)]
+	all_stages: list[Stage] = stages
+
+	# Restore the outputs of the stages untouched since the previous build
+	states: dict[str, str] = state_hashes(config) if changed is not None else {}
+	if changed is not None:
+		stages, restored = select_stages(all_stages, states, changed)
+		for stage in restored:
+			for file_path, content in STAGES_CACHE["outputs"][stage.name].items():
+				FILES_TO_WRITE[file_path] = content
+		if restored:
+			stp.info(f"Restored {len(restored)} untouched stage(s) from the previous build: {', '.join(stage.name for stage in restored)}")
+	dependencies: dict[str, list[str]] = stage_dependencies(stages)
+	tracker: WriteTracker = WriteTracker()
+	jobs: list[Job] = [Job(stage.name, run_stage, stage, config, tracker, dependencies = dependencies[stage.name]) for stage in stages]
+
+	# Run the stages while tracking the writes
+	start_time: float = time.perf_counter()
+	FILES_TO_WRITE.on_write = tracker
+	try:
+		results: dict[str, Any] = run_jobs(jobs, mode = mode)
+	finally:
+		FILES_TO_WRITE.on_write = None
+	total_time: float = time.perf_counter() - start_time
+
+	# Report the write conflicts and the achieved parallelism
+	for names, paths in tracker.conflicts.items():
+		examples: str = ", ".join(f"'{path}'" for path in paths[:3]) + (", ..." if len(paths) > 3 else "")
+		stp.warning(
+			f"Write conflict: {len(paths)} file(s) written outside of the declared outputs of the running stages ({', '.join(names)}): {examples}\n"
+			"Declare them in the outputs of the stage writing them, so they can't be written concurrently by another stage"
+		)
+	if jobs:
+		work_time: float = sum(job.duration for job in jobs)
+		stp.info(f"Build stages done in {total_time:.5f}s ({work_time:.5f}s of work, achieved parallelism: {work_time / total_time:.2f}x)")
+
+	# Keep the outputs of the stages that only write files, to restore them if they are untouched on the next build
+	if changed is not None:
+		STAGES_CACHE["states"] = states
+		STAGES_CACHE["outputs"] = {
+			stage.name: {path: FILES_TO_WRITE[path] for prefix in stage.outputs for path in FILES_TO_WRITE.find(prefix = prefix)}
+			for stage in all_stages if all(is_path(x) for x in stage.outputs)
+		}
+	return results
+
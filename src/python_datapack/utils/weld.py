@@ -1,50 +1,118 @@
 
 # Imports
+import hashlib
 import os
 import time
+from glob import glob
 from pathlib import Path
-from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+from typing import Literal
+from zipfile import ZIP_DEFLATED, ZipFile
 
 import stouputils as stp
-from smithed.weld.toolchain.cli import weld
 
 from ..dependencies.main import OFFICIAL_LIBS, OFFICIAL_LIBS_PATH
+from .archive import HashingFile, copy_entry, write_entry, zip_date_time
+from .compression import CompressionPolicy
+from .destinations import replace_file
+from .profiling import PROFILER, profile
+
+
+# Libraries
+def get_libs_to_merge(config: dict, pack_type: Literal["datapack", "resource_pack"]) -> list[str]:
+	""" Get the paths of the libraries zip files to merge with the pack (user libs then used official libs)
+
+	Args:
+		config		(dict):	The main configuration
+		pack_type	(str):	"datapack" or "resource_pack"
+	Returns:
+		list[str]: The paths of the libraries zip files, in merge order
+	"""
+	libs: list[str] = []
+	if config.get("libs_folder", ""):
+		libs += sorted(stp.clean_path(path) for path in glob(f"{config['libs_folder']}/{pack_type}/*.zip"))
+
+	# Add the used official libs
+	for lib in OFFICIAL_LIBS.values():
+		if lib["is_used"]:
+			name: str = lib["name"]
+			path: str = f"{OFFICIAL_LIBS_PATH}/{pack_type}/{name}.zip"
+			if os.path.exists(path):
+				libs.append(path)
+	return libs
+
+def get_libs_layer(config: dict, pack_type: Literal["datapack", "resource_pack"], libs: list[str]) -> str:
+	""" Get the libraries welded together into one zip file (the library layer), cached in the build folder
+
+	The cache key is made of the path, size and modification time of every library zip (in merge order) and the weld version,
+	so the libraries are only welded again when one of them changes (without reading them on every build).
+
+	Args:
+		config		(dict):			The main configuration
+		pack_type	(str):			"datapack" or "resource_pack"
+		libs		(list[str]):	The paths of the libraries zip files, in merge order
+	Returns:
+		str: The path to the library layer zip file (the library itself if there is only one)
+	"""
+	if len(libs) == 1:
+		return libs[0]
+
+	# Get the cache key (Smithed Weld is only imported when packs are welded, it's slow to import)
+	from smithed.weld import __version__ as weld_version
+	key = hashlib.sha1(weld_version.encode())
+	for lib in libs:
+		stat: os.stat_result = os.stat(lib)
+		key.update(f"{lib}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode())
+	cache_folder: str = f"{config['build_folder']}/.weld_cache"
+	layer_path: str = f"{cache_folder}/{pack_type}_libs_{key.hexdigest()[:16]}.zip"
+	if os.path.exists(layer_path):
+		PROFILER.cache("weld_libs_layer", hits = 1)
+		return layer_path
+
+	# Remove the outdated layers and weld the libraries
+	PROFILER.cache("weld_libs_layer", misses = 1)
+	from smithed.weld.toolchain.cli import weld
+	os.makedirs(cache_folder, exist_ok = True)
+	for file in os.listdir(cache_folder):
+		if file.startswith(f"{pack_type}_libs_"):
+			os.remove(f"{cache_folder}/{file}")
+	temp_path: str = layer_path.replace(".zip", "_temporary.zip")
+	weld(libs, Path(cache_folder), Path(os.path.basename(temp_path)), log = "error")
+	os.replace(temp_path, layer_path)
+	return layer_path
 
 
 # Weld datapack
 @stp.handle_error()
 @stp.silent
-def weld_datapack(config: dict, dest_path: str) -> float:
+@profile("weld_datapack", "weld")
+def weld_datapack(config: dict, dest_path: str, policy: CompressionPolicy | None = None) -> tuple[float, str]:
 	""" Merge the datapack and libs into one file using Weld
 	Args:
 		dest_path (str): The path to the destination file
+		policy (CompressionPolicy | None): The compression policy to follow (default: the one from the config)
 	Returns:
-		float: The time it took to merge the datapack and libs
+		tuple[float, str]: The time it took to merge the datapack and libs, and the SHA1 of the merged file
 	"""
 	start_time: float = time.perf_counter()
+	if policy is None:
+		policy = CompressionPolicy.from_config(config)
 
-	# Get all paths to merge
+	# Get all paths to merge (the libraries are welded once into a cached layer)
 	datapacks_to_merge = [
 		f"{config['build_folder']}/{config['project_name_simple']}_datapack.zip"
 	]
-	if config.get("libs_folder", ""):
-		datapacks_to_merge.append(config["libs_folder"] + "/datapack/*.zip")
-
-	# Add the used official libs
-	for lib in OFFICIAL_LIBS.values():
-		if lib["is_used"]:
-			name: str = lib["name"]
-			path: str = f"{OFFICIAL_LIBS_PATH}/datapack/{name}.zip"
-			if os.path.exists(path):
-				datapacks_to_merge.append(path)
+	libs: list[str] = get_libs_to_merge(config, "datapack")
+	if libs:
+		datapacks_to_merge.append(get_libs_layer(config, "datapack", libs))
 
 	# Weld all datapacks
+	from smithed.weld.toolchain.cli import weld
 	output_dir = os.path.dirname(dest_path)
 	output = os.path.basename(dest_path.replace(".zip", "_temporary.zip"))
 	weld(datapacks_to_merge, Path(output_dir), Path(output), log = "error")
 
 	# Get the constant time for the archive
-	constant_time: tuple = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
+	constant_time: tuple[int, int, int, int, int, int] = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
 	mcmeta_path: str = f"{config['build_datapack']}/pack.mcmeta"
 	if os.path.exists(mcmeta_path):
 
@@ -60,78 +128,75 @@ def weld_datapack(config: dict, dest_path: str) -> float:
 			time_float: float = os.path.getmtime(assets_folder)
 		else:
 			time_float: float = os.path.getmtime(mcmeta_path)
-		constant_time = time.localtime(time_float)[:6]
+		constant_time = zip_date_time(time_float)
 
 	# Make the new zip file with fixed pack.mcmeta and pack.png
-	with ZipFile(dest_path.replace(".zip", "_temporary.zip"), "r") as temp_zip:
+	temp_path: str = dest_path.replace(".zip", "_temporary.zip")
+	with ZipFile(temp_path, "r") as temp_zip, open(temp_path, "rb") as temp_file:
 		# Open the final destination zip file for writing
-		with ZipFile(dest_path, "w", compression=ZIP_DEFLATED) as zip:
-			# Iterate through all files in the temporary zip, and exclude pack.mcmeta and pack.png
-			for file in temp_zip.namelist():
-				if file not in ["pack.mcmeta", "pack.png"]:
-					info: ZipInfo = ZipInfo(file)
-					info.compress_type = ZIP_DEFLATED
-					info.date_time = constant_time
-					zip.writestr(info, temp_zip.read(file))
-
-			# Add the fixed pack.mcmeta to the final zip with constant_time
-			info: ZipInfo = ZipInfo("pack.mcmeta")
-			info.compress_type = ZIP_DEFLATED
-			info.date_time = constant_time
-			with open(mcmeta_path, "rb") as f:
-				zip.writestr(info, f.read())
-
-			# Check if pack.png exists and add it to the final zip if it does
-			if os.path.exists(f"{config['build_datapack']}/pack.png"):
-				pack_png_path = f"{config['build_datapack']}/pack.png"
-
-				# Copy the file with the same timestamp as mcmeta
-				info: ZipInfo = ZipInfo("pack.png")
-				info.compress_type = ZIP_DEFLATED
-				info.date_time = constant_time
-				with open(pack_png_path, "rb") as f:
-					zip.writestr(info, f.read())
-
-	# Remove temp file
-	os.remove(dest_path.replace(".zip","_temporary.zip"))
-
-	# Return the time it took to merge the datapack and libs
-	return time.perf_counter() - start_time
+		with open(f"{dest_path}.tmp", "wb") as dest_file:
+			hashing_file: HashingFile = HashingFile(dest_file)
+			with ZipFile(hashing_file, "w", compression=ZIP_DEFLATED) as zip:	# type: ignore
+				zip.comment = policy.signature
+
+				# Copy all the compressed files of the temporary zip (with constant time), and exclude pack.mcmeta and pack.png
+				for info in temp_zip.infolist():
+					if info.filename not in ["pack.mcmeta", "pack.png"]:
+						copy_entry(zip, temp_zip, temp_file, info, constant_time, policy)
+
+				# Add the fixed pack.mcmeta to the final zip with constant_time
+				with open(mcmeta_path, "rb") as f:
+					write_entry(zip, "pack.mcmeta", f.read(), constant_time, policy)
+
+				# Check if pack.png exists and add it to the final zip if it does
+				if os.path.exists(f"{config['build_datapack']}/pack.png"):
+					pack_png_path = f"{config['build_datapack']}/pack.png"
+
+					# Copy the file with the same timestamp as mcmeta
+					with open(pack_png_path, "rb") as f:
+						write_entry(zip, "pack.png", f.read(), constant_time, policy)
+
+	# Replace the previous merged file and remove temp file (failing the weld if the merged file is locked)
+	try:
+		replace_file(f"{dest_path}.tmp", dest_path)
+	finally:
+		os.remove(temp_path)
+
+	# Return the time it took to merge the datapack and libs, and the SHA1 computed while writing
+	return time.perf_counter() - start_time, hashing_file.hexdigest()
 
 # Weld resource pack
 @stp.handle_error()
 @stp.silent
-def weld_resource_pack(config: dict, dest_path: str) -> float:
+@profile("weld_resource_pack", "weld")
+def weld_resource_pack(config: dict, dest_path: str, policy: CompressionPolicy | None = None) -> tuple[float, str]:
 	""" Merge the resource pack and libs into one file using Weld
 	Args:
 		dest_path (str): The path to the destination file
+		policy (CompressionPolicy | None): The compression policy to follow (default: the one from the config)
 	Returns:
-		float: The time it took to merge the resource pack and libs
+		tuple[float, str]: The time it took to merge the resource pack and libs, and the SHA1 of the merged file
 	"""
 	start_time: float = time.perf_counter()
+	if policy is None:
+		policy = CompressionPolicy.from_config(config)
 
-	# Get all paths to merge
+	# Get all paths to merge (the libraries are welded once into a cached layer)
 	resource_packs_to_merge = [
 		f"{config['build_folder']}/{config['project_name_simple']}_resource_pack.zip"
 	]
-	if config.get("libs_folder", ""):
-		resource_packs_to_merge.append(config["libs_folder"] + "/resource_pack/*.zip")
-
-	# Add the used official libs
-	for lib in OFFICIAL_LIBS.values():
-		if lib["is_used"]:
-			name: str = lib["name"]
-			path: str = f"{OFFICIAL_LIBS_PATH}/resource_pack/{name}.zip"
-			if os.path.exists(path):
-				resource_packs_to_merge.append(path)
+	libs: list[str] = get_libs_to_merge(config, "resource_pack")
+	if libs:
+		resource_packs_to_merge.append(get_libs_layer(config, "resource_pack", libs))
 
 	# Weld all resource packs
+	from smithed.weld.toolchain.cli import weld
 	output_dir = os.path.dirname(dest_path)
 	output = os.path.basename(dest_path.replace(".zip", "_temporary.zip"))
 	weld(resource_packs_to_merge, Path(output_dir), Path(output), log = "error")
 
 	# Get the constant time for the archive
-	constant_time: tuple = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
+	constant_time: tuple[int, int, int, int, int, int] = (2024, 1, 1, 0, 0, 0)	# default time: 2024-01-01 00:00:00
 	mcmeta_path: str = f"{config['build_resource_pack']}/pack.mcmeta"
 	if os.path.exists(mcmeta_path):
 
@@ -147,41 +212,40 @@ def weld_resource_pack(config: dict, dest_path: str) -> float:
 			time_float: float = os.path.getmtime(assets_folder)
 		else:
 			time_float: float = os.path.getmtime(mcmeta_path)
-		constant_time = time.localtime(time_float)[:6]
+		constant_time = zip_date_time(time_float)
 
 	# Make the new zip file with fixed pack.mcmeta and pack.png
-	with ZipFile(dest_path.replace(".zip", "_temporary.zip"), "r") as temp_zip:
+	temp_path: str = dest_path.replace(".zip", "_temporary.zip")
+	with ZipFile(temp_path, "r") as temp_zip, open(temp_path, "rb") as temp_file:
 		# Open the final destination zip file for writing
-		with ZipFile(dest_path, "w", compression=ZIP_DEFLATED) as zip:
-			# Iterate through all files in the temporary zip, and exclude pack.mcmeta and pack.png
-			for file in temp_zip.namelist():
-				if file not in ["pack.mcmeta", "pack.png"]:
-					info: ZipInfo = ZipInfo(file)
-					info.compress_type = ZIP_DEFLATED
-					info.date_time = constant_time
-					zip.writestr(info, temp_zip.read(file))
-
-			# Add the fixed pack.mcmeta to the final zip with constant_time
-			info: ZipInfo = ZipInfo("pack.mcmeta")
-			info.compress_type = ZIP_DEFLATED
-			info.date_time = constant_time
-			with open(mcmeta_path, "rb") as f:
-				zip.writestr(info, f.read())
-
-			# Check if pack.png exists and add it to the final zip if it does
-			if os.path.exists(f"{config['build_resource_pack']}/pack.png"):
-				pack_png_path = f"{config['build_resource_pack']}/pack.png"
-
-				# Copy the file with the same timestamp as mcmeta
-				info: ZipInfo = ZipInfo("pack.png")
-				info.compress_type = ZIP_DEFLATED
-				info.date_time = constant_time
-				with open(pack_png_path, "rb") as f:
-					zip.writestr(info, f.read())
-
-	# Remove temp file
-	os.remove(dest_path.replace(".zip","_temporary.zip"))
-
-	# Return the time it took to merge the resource pack and libs
-	return time.perf_counter() - start_time
+		with open(f"{dest_path}.tmp", "wb") as dest_file:
+			hashing_file: HashingFile = HashingFile(dest_file)
+			with ZipFile(hashing_file, "w", compression=ZIP_DEFLATED) as zip:	# type: ignore
+				zip.comment = policy.signature
+
+				# Copy all the compressed files of the temporary zip (with constant time), and exclude pack.mcmeta and pack.png
+				for info in temp_zip.infolist():
+					if info.filename not in ["pack.mcmeta", "pack.png"]:
+						copy_entry(zip, temp_zip, temp_file, info, constant_time, policy)
+
+				# Add the fixed pack.mcmeta to the final zip with constant_time
+				with open(mcmeta_path, "rb") as f:
+					write_entry(zip, "pack.mcmeta", f.read(), constant_time, policy)
+
+				# Check if pack.png exists and add it to the final zip if it does
+				if os.path.exists(f"{config['build_resource_pack']}/pack.png"):
+					pack_png_path = f"{config['build_resource_pack']}/pack.png"
+
+					# Copy the file with the same timestamp as mcmeta
+					with open(pack_png_path, "rb") as f:
+						write_entry(zip, "pack.png", f.read(), constant_time, policy)
+
+	# Replace the previous merged file and remove temp file (failing the weld if the merged file is locked)
+	try:
+		replace_file(f"{dest_path}.tmp", dest_path)
+	finally:
+		os.remove(temp_path)
+
+	# Return the time it took to merge the resource pack and libs, and the SHA1 computed while writing
+	return time.perf_counter() - start_time, hashing_file.hexdigest()
 
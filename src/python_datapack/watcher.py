@@ -1,6 +1,7 @@
 
 # Imports
 import os
+import subprocess
 import sys
 import threading
 import time
@@ -9,36 +10,119 @@ import stouputils as stp
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
+from .daemon import run_build
+from .utils.stages import CANCEL_EVENT
+
+
+# Change queue
+class ChangeQueue:
+	""" Thread safe queue of the changed files, coalesced by path (keeping the time of the first change of each path) """
+	def __init__(self) -> None:
+		self.changes: dict[str, float] = {}
+		""" The time.time() of the first change of each changed path """
+		self.last_change: float = 0.0
+		""" The time.monotonic() of the last change, for the debounce window """
+		self.condition: threading.Condition = threading.Condition()
+
+	def put(self, file_path: str, change_time: float | None = None) -> None:
+		""" Add a changed file (or keep the time of its first change if already queued) """
+		with self.condition:
+			self.changes.setdefault(file_path, change_time or time.time())
+			self.last_change = time.monotonic()
+			self.condition.notify_all()
+
+	def __len__(self) -> int:
+		with self.condition:
+			return len(self.changes)
+
+	def get_batch(self, debounce: float, stop: threading.Event) -> dict[str, float]:
+		""" Wait for changes, then until no change happened during the debounce window, and take them all
+
+		Args:
+			debounce	(float):			Seconds without any new change before returning the batch
+			stop		(threading.Event):	Return an empty batch as soon as it is set
+		Returns:
+			dict[str, float]: The changed paths with the time of their first change
+		"""
+		with self.condition:
+			while not stop.is_set():
+				if not self.changes:
+					self.condition.wait(0.5)
+					continue
+				remaining: float = self.last_change + debounce - time.monotonic()
+				if remaining <= 0:
+					batch: dict[str, float] = self.changes
+					self.changes = {}
+					return batch
+				self.condition.wait(remaining)
+			return {}
 
 # Build processor
 class BuildProcessor(threading.Thread):
-	def __init__(self, build_script: str):
+	def __init__(self, build_script: str, daemon_mode: bool = False, debounce: float = 0.5):
+		""" Thread running a build for each batch of changes (see ChangeQueue)
+
+		A build still running when new changes arrive is superseded: the build process is terminated,
+		or in daemon mode the build is cancelled before its next stage, then a new build runs with all the changes.
+
+		Args:
+			build_script	(str):		Path to the build script
+			daemon_mode		(bool):		If True, run the builds in this process (see daemon.run_build())
+			debounce		(float):	Seconds without any new change before starting a build
+		"""
 		super().__init__()
-		self.queue: list[str] = []
-		self.running = True
-		self.build_script = build_script
-	
+		self.queue: ChangeQueue = ChangeQueue()
+		self.stopping: threading.Event = threading.Event()
+		self.building: threading.Event = threading.Event()
+		self.build_script: str = build_script
+		self.daemon_mode: bool = daemon_mode
+		self.debounce: float = debounce
+
 	def run(self):
-		while self.running:
-			if len(self.queue) > 0:
-				# Clear the queue and get the latest change
-				latest_change = None
-				while len(self.queue) > 0:
-					latest_change = self.queue.pop(0)
-					self.queue = []
-				
-				if latest_change:
-					print(f"Processing changes... (Latest: {latest_change})")
-					os.system(f"{sys.executable} {self.build_script}")
-			
-			# Wait a bit before processing more changes
-			time.sleep(1)
-	
+		while not self.stopping.is_set():
+			changes: dict[str, float] = self.queue.get_batch(self.debounce, self.stopping)
+			if not changes:
+				continue
+			latest_change: str = max(changes, key = lambda path: changes[path])
+			print(f"Processing {len(changes)} change(s)... (Latest: {latest_change})")
+
+			# Run the build, and give the changes back to the queue if it has been superseded
+			self.building.set()
+			try:
+				completed: bool = self.build_in_daemon(changes) if self.daemon_mode else self.build_in_process()
+			finally:
+				self.building.clear()
+			if not completed:
+				for path, change_time in changes.items():
+					self.queue.put(path, change_time)
+
+	def build_in_daemon(self, changes: dict[str, float]) -> bool:
+		""" Run the build in this process, return False if it has been cancelled by new changes """
+		latency: float | None = run_build(self.build_script, list(changes), min(changes.values()))
+
+		# A failed build is not given back to the queue (it would fail again until the next change, which runs every stage)
+		return latency is not None or not CANCEL_EVENT.is_set()
+
+	def build_in_process(self) -> bool:
+		""" Run the build script in a new process, return False if it has been terminated because of new changes """
+		process: subprocess.Popen = subprocess.Popen([sys.executable, self.build_script])
+		while process.poll() is None:
+			if self.stopping.is_set() or len(self.queue) > 0:
+				process.terminate()
+				process.wait()
+				stp.warning("Build superseded by new changes")
+				return False
+			time.sleep(0.1)
+		return True
+
 	def stop(self):
-		self.running = False
-	
+		self.stopping.set()
+		CANCEL_EVENT.set()
+
 	def add_to_queue(self, file_path: str):
-		self.queue.append(file_path)
+		self.queue.put(file_path)
+		if self.daemon_mode and self.building.is_set():
+			CANCEL_EVENT.set()
 
 # File change handler
 class ChangeHandler(FileSystemEventHandler):
@@ -50,37 +134,89 @@ class ChangeHandler(FileSystemEventHandler):
 			to_ignore	(list[str]):	List of paths to ignore (contains)
 			processor	(BuildProcessor):	Thread that processes the builds
 		"""
-		self.to_watch: list[str] = to_watch
+		self.to_watch: tuple[str, ...] = tuple(to_watch)
 		self.to_ignore: list[str] = to_ignore
 		self.processor = processor
 		super().__init__()
 
+	def handle(self, path: str | bytes):
+		""" Queue the path if it is watched and not ignored """
+		source_path: str = os.path.abspath(os.fsdecode(path)).replace("\\", "/")
+		if source_path.startswith(self.to_watch) and not any(x in source_path for x in self.to_ignore):
+			self.processor.add_to_queue(source_path)
+
 	def on_modified(self, event: FileSystemEvent):
 		""" Function called when a file is modified
 
 		Args:
 			event	(FileSystemEvent):	Watchdog event
 		"""
-		source_path: str = os.path.abspath(str(event.src_path)).replace("\\", "/")
-		if not event.is_directory and not any(x in source_path for x in self.to_ignore) and any(source_path.startswith(x) for x in self.to_watch):
-			self.processor.add_to_queue(source_path)
+		if not event.is_directory:
+			self.handle(event.src_path)
+
+	def on_created(self, event: FileSystemEvent):
+		if not event.is_directory:
+			self.handle(event.src_path)
+
+	def on_moved(self, event: FileSystemEvent):
+		# Editors often save by writing a temporary file then renaming it
+		if not event.is_directory:
+			self.handle(event.dest_path)
+
+def watched_roots(to_watch: list[str]) -> list[tuple[str, bool]]:
+	""" Get the folders to observe for the watched paths (folders recursively, the parent folder of files), without nested ones
+
+	Watched paths are prefixes: a path that is neither a folder nor a file (not created yet, or the start of file names)
+	is observed through its closest existing parent folder, recursively.
+
+	Args:
+		to_watch (list[str]): List of absolute paths to watch
+	Returns:
+		list[tuple[str, bool]]: The folders to observe, and if they are observed recursively
+	"""
+	roots: dict[str, bool] = {}
+	for path in to_watch:
+		if os.path.isdir(path):
+			roots[path.rstrip("/")] = True
+		elif os.path.isfile(path):
+			roots.setdefault(os.path.dirname(path) or ".", False)
+		else:
+			parent: str = os.path.dirname(path.rstrip("/")) or "."
+			while not os.path.isdir(parent) and os.path.dirname(parent) != parent:
+				parent = os.path.dirname(parent) or "."
+			roots[parent] = True
+	recursive: list[str] = [root for root, is_recursive in roots.items() if is_recursive]
+	return [
+		(root, is_recursive) for root, is_recursive in sorted(roots.items())
+		if not any(root != other and root.startswith(f"{other}/") for other in recursive)
+	]
 
 # Main watcher
-def watcher(to_watch: list[str], to_ignore: list[str], build_script: str):
+def watcher(to_watch: list[str], to_ignore: list[str], build_script: str, daemon: bool = False, debounce: float = 0.5):
 	""" Start a watcher to monitor file changes and automatically build the datapack
 
+	Only the watched paths are observed, so the writes of the build (ex: in the build folder) never reach Python.
+
 	Args:
 		to_watch		(list[str]):	List of paths to watch (starts with)
 		to_ignore		(list[str]):	List of paths to ignore (contains)
 		build_script	(str):			Path to the build script
+		daemon			(bool):			If True, run the builds in this process, keeping the imports, caches and previous build in memory:
+			only the build stages touched by the changed files run again, and the latency from save to zip is reported
+		debounce		(float):		Seconds without any new change before starting a build (changes are coalesced by path)
 	"""
-	# Start the build processor thread
-	processor = BuildProcessor(build_script)
+	to_watch = [stp.clean_path(os.path.abspath(path)) for path in to_watch]
+
+	# Start the build processor thread (the daemon builds once at startup to warm up)
+	processor = BuildProcessor(build_script, daemon, debounce)
+	if daemon:
+		run_build(build_script, [])
 	processor.start()
-	
+
 	event_handler: ChangeHandler = ChangeHandler(to_watch, to_ignore, processor)
 	observer = Observer()
-	observer.schedule(event_handler, ".", recursive=True)
+	for root, recursive in watched_roots(to_watch):
+		observer.schedule(event_handler, root, recursive=recursive)
 	observer.start()
 	stp.warning("Watching for file changes... (Press Ctrl+C to stop)")
 